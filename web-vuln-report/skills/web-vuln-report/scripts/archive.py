@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+archive.py - 巡回応答のコンテンツアドレス型アーカイブと再生（オフライン受動チェック用）
+
+crawl が取得した応答（status / ヘッダ / 本文）をディスクに保存し、checks の受動チェック
+（ヘッダ・CSP・SRI・冗長エラー・混在コンテンツ・Cookie）を**再取得なし**で実行できるようにする。
+旧実装は run_checks が巡回済みページを全件 GET し直し、mixed-content がさらにもう一度取得して
+いたため、対象システムへの負荷が巡回の 2〜3 倍になっていた。
+
+レイアウト（WARC 風・行指向）:
+    <dir>/index.jsonl              1 行 1 応答 {url, status, headers[[k, v]...], body, size, fetched_at}
+    <dir>/objects/ab/abcdef...     本文（sha256 でアドレス付け。同一本文は 1 回だけ保存）
+                                   圧縮時は拡張子 .gz（標準 gzip）/ .zst（zstandard・任意依存）
+
+同一 URL が複数回記録された場合は後勝ち。ヘッダは生の順序・重複（Set-Cookie 等）を保持する。
+本文は httpx が Content-Encoding を復号した後のバイト列を保存する。
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - 記録/再生とも httpx.Response を扱う
+    httpx = None
+
+COMPRESSIONS = ("gzip", "zstd", "none")
+DEFAULT_COMPRESSION = "gzip"
+_SUFFIX = {"gzip": ".gz", "zstd": ".zst", "none": ""}
+# 再生時に落とすヘッダ（本文は復号済みで保存しているため、そのまま付けると二重復号になる）
+_REPLAY_DROP_HEADERS = {"content-encoding", "transfer-encoding"}
+
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except Exception:
+        return None
+
+
+def available_compressions() -> list[str]:
+    return [c for c in COMPRESSIONS if c != "zstd" or _zstd() is not None]
+
+
+def resolve_compression(name: str | None) -> str:
+    """zstandard 未導入なら gzip にフォールバックする（標準ライブラリのみで動作させる）。"""
+    name = name or DEFAULT_COMPRESSION
+    return name if name in available_compressions() else "gzip"
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        return gzip.compress(data, mtime=0)
+    if compression == "zstd":
+        return _zstd().ZstdCompressor().compress(data)
+    return data
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        return gzip.decompress(data)
+    if compression == "zstd":
+        z = _zstd()
+        if z is None:
+            raise RuntimeError("zstd 圧縮のアーカイブの再生には zstandard が必要です")
+        return z.ZstdDecompressor().decompress(data)
+    return data
+
+
+class ArchiveMiss(LookupError):
+    """再生対象の URL がアーカイブに無い（オフライン再生では取得し直さない）。"""
+
+
+class ResponseArchive:
+    """応答アーカイブ。crawl（記録）と checks（再生）が同じクラスを使う。
+
+    compression は記録時のみ使う。再生時は各本文ファイルの拡張子から判別するため、
+    圧縮方式の異なる記録が混在していても読める。"""
+
+    def __init__(self, root: str | Path, compression: str = DEFAULT_COMPRESSION,
+                 store_bodies: bool = True):
+        self.root = Path(root)
+        self.compression = resolve_compression(compression)
+        self.store_bodies = store_bodies
+        self._index: dict[str, dict] | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / "index.jsonl"
+
+    def _object_path(self, digest: str, compression: str) -> Path:
+        return self.root / "objects" / digest[:2] / (digest + _SUFFIX[compression])
+
+    # ---- 記録 ----
+
+    def put(self, url: str, resp: "httpx.Response") -> dict:
+        """応答を 1 件記録して index エントリを返す。本文は未保存の場合のみ書き込む。"""
+        body = resp.content if self.store_bodies else b""
+        digest = hashlib.sha256(body).hexdigest() if self.store_bodies else None
+        entry = {
+            "url": url,
+            "status": resp.status_code,
+            "headers": [[k, v] for k, v in resp.headers.multi_items()],
+            "body": digest,
+            "size": len(body),
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+        }
+        with self._lock:
+            if digest is not None:
+                obj = self._object_path(digest, self.compression)
+                if self._find_object(digest) is None:
+                    obj.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = obj.with_name(obj.name + ".tmp")
+                    tmp.write_bytes(_compress(body, self.compression))
+                    tmp.replace(obj)
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.index_path, "a", encoding="utf-8") as fp:
+                fp.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            if self._index is not None:
+                self._index[url] = entry
+        return entry
+
+    # ---- 再生 ----
+
+    def _load(self) -> dict[str, dict]:
+        if self._index is None:
+            index: dict[str, dict] = {}
+            if self.index_path.exists():
+                with open(self.index_path, encoding="utf-8") as fp:
+                    for line in fp:
+                        line = line.strip()
+                        if line:
+                            rec = json.loads(line)
+                            index[rec["url"]] = rec
+            self._index = index
+        return self._index
+
+    def load(self) -> None:
+        """索引を今の内容で読み込んでおく（以降に同じディレクトリへ put しても前回分の索引は保つ）。"""
+        self._load()
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._load()
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def entry(self, url: str) -> dict | None:
+        return self._load().get(url)
+
+    def _find_object(self, digest: str) -> tuple[Path, str] | None:
+        for comp in COMPRESSIONS:
+            p = self._object_path(digest, comp)
+            if p.exists():
+                return p, comp
+        return None
+
+    def body(self, entry: dict) -> bytes:
+        if not entry.get("body"):
+            return b""
+        found = self._find_object(entry["body"])
+        if found is None:
+            return b""
+        path, comp = found
+        return _decompress(path.read_bytes(), comp)
+
+    def validators(self, url: str) -> dict[str, str]:
+        """前回応答の ETag / Last-Modified から条件付き GET のヘッダを作る。
+
+        304 を受けたら本文をここから復元するため、本文を保存していない記録では空を返す。"""
+        entry = self.entry(url)
+        if entry is None or not entry.get("body") or entry.get("status") != 200:
+            return {}
+        out = {}
+        for k, v in entry["headers"]:
+            low = k.lower()
+            if low == "etag":
+                out["If-None-Match"] = v
+            elif low == "last-modified":
+                out["If-Modified-Since"] = v
+        return out
+
+    def response(self, url: str) -> "httpx.Response | None":
+        """記録済み応答を httpx.Response として組み立てる（通信はしない）。未記録は None。"""
+        entry = self.entry(url)
+        if entry is None:
+            return None
+        headers = [(k, v) for k, v in entry["headers"] if k.lower() not in _REPLAY_DROP_HEADERS]
+        return httpx.Response(entry["status"], headers=headers, content=self.body(entry),
+                              request=httpx.Request("GET", url))
+
+
+class ReplayClient:
+    """アーカイブを _SafeClient と同じ get() 形で引く読み取り専用クライアント。
+
+    未記録 URL は取得し直さず ArchiveMiss を送出する（各チェックの例外処理で当該 URL を飛ばす）。"""
+
+    def __init__(self, archive: ResponseArchive):
+        self.archive = archive
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url: str, **kwargs) -> "httpx.Response":
+        if kwargs.get("headers"):
+            raise ArchiveMiss(url)  # ヘッダ依存のプローブは再生できない
+        r = self.archive.response(url)
+        if r is None:
+            self.misses += 1
+            raise ArchiveMiss(url)
+        self.hits += 1
+        return r
+
+
+def open_archive(archive: "ResponseArchive | str | Path | None") -> ResponseArchive | None:
+    """パス / ResponseArchive / None を受けて ResponseArchive を返す（run_checks の replay 用）。"""
+    if archive is None or isinstance(archive, ResponseArchive):
+        return archive
+    return ResponseArchive(archive)
@@ -28,12 +28,19 @@ _HERE = Path(__file__).resolve().parent
 if str(_HERE) not in sys.path:
     sys.path.insert(0, str(_HERE))
 
+import checkpoint as checkpoint_mod  # noqa: E402
 import crawl as crawl_mod       # noqa: E402
 import checks as checks_mod     # noqa: E402
 import scoring as scoring_mod   # noqa: E402
 import external_tools           # noqa: E402
+import jscache                  # noqa: E402
 import render_report            # noqa: E402
 from catalog import get_check   # noqa: E402
+from archive import COMPRESSIONS, DEFAULT_COMPRESSION, ResponseArchive  # noqa: E402
+from ratelimit import AdaptiveRateLimiter  # noqa: E402
+from siteindex import SiteIndex  # noqa: E402
+from crawlstream import CrawlStream, JsonlWriter, load_crawl, write_json  # noqa: E402
+from inventory import build_inventory  # noqa: E402
 from dataclasses import asdict  # noqa: E402
 
 # 外部ツール由来所見を統一スキーマへ正規化する際の代表 CVSS 4.0 ベクタ（重大度帯）と
@@ -79,6 +86,20 @@ def _normalize_external(ext_findings: list[dict], start_seq: int) -> list[dict]:
     return out
 
 
+STATE_FILE = "state.json"
+# チェック完了時の結果（所見・台帳・信頼性メタ）。"checks" 完了後の --resume はここから復元する
+CHECKS_RESULT_FILE = "checks.result.json"
+# --resume 時に前回の値を引き継がない引数（再開操作そのものに関わるもの）
+_RESUME_KEEP_ARGS = {"resume", "skip_pdf", "narrative", "assessor"}
+
+
+def _mark_phase(out_dir: Path, state: dict, phase: str) -> None:
+    """完了フェーズを state.json に記録する（--resume はここから続きを判断する）。"""
+    if phase not in state["completed"]:
+        state["completed"].append(phase)
+    checkpoint_mod.write_atomic(out_dir / STATE_FILE, state)
+
+
 def run(args) -> int:
     if not args.authorized_by or not args.authorized_by.strip():
         print("[assess] Phase 0 認可ゲート: --authorized-by が空です。診断を中止します。\n"
@@ -88,46 +109,125 @@ def run(args) -> int:
 
     out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
+    # 中断再開: 巡回は N ページごと、チェックはグループ完了ごとに out-dir へチェックポイントを残し、
+    # 完了したフェーズは state.json に記録する。--resume はそれらから続きだけを実行する。
+    state = {"args": {k: v for k, v in vars(args).items() if k not in _RESUME_KEEP_ARGS},
+             "completed": []}
+    if args.resume:
+        state["completed"] = (checkpoint_mod.read(out_dir / STATE_FILE) or {}).get("completed", [])
+    checkpoint_mod.write_atomic(out_dir / STATE_FILE, state)
+    done = set(state["completed"])
+    crawl_out = out_dir / ("crawl.jsonl" if args.stream else "crawl.json")
 
     # Phase 1: 巡回
     print(f"[assess] Phase 1 巡回: {args.target}")
-    crawl_result = crawl_mod.crawl(
+    # 巡回応答を out-dir/archive に記録し、Phase 2 の受動チェックはそこから再生する
+    # （巡回済みページを再取得しないため、対象への受動チェック分のリクエストが無くなる）
+    archive = None
+    if not args.no_archive:
+        archive = ResponseArchive(out_dir / "archive", args.archive_compression)
+    # 巡回とチェックで 1 つの AIMD レート制御を共有する（--rate は天井。429/503 で減速した
+    # 状態をチェック側が引き継ぎ、対象が回復するまで天井へ戻さない）
+    limiter = AdaptiveRateLimiter(args.rate)
+    # robots.txt / sitemap はオリジン単位で 1 回だけ取得し、巡回（候補投入・Crawl-delay）と
+    # チェック（auth-routes の追加パス）で共有する
+    site = SiteIndex(crawl_mod.USER_AGENT, timeout=args.timeout, limiter=limiter)
+    crawl_kwargs = dict(
         target=args.target, authorized_by=args.authorized_by,
         max_pages=args.max_pages, max_depth=args.max_depth, rate=args.rate,
         timeout=args.timeout, respect_robots=not args.ignore_robots,
-        extra_hosts=args.extra_host,
+        extra_hosts=args.extra_host, concurrency=args.concurrency, parser=args.parser,
+        max_per_template=args.max_per_template, archive=archive,
+        previous=ResponseArchive(Path(args.incremental) / "archive") if args.incremental else None,
+        checkpoint=out_dir / "crawl.checkpoint.json", checkpoint_every=args.checkpoint_every,
+        resume=args.resume, limiter=limiter, max_body_bytes=args.max_body_bytes,
+        site=site, seed_sitemap=not args.no_sitemap_seed,
     )
-    crawl_dict = asdict(crawl_result)
-    (out_dir / "crawl.json").write_text(
-        json.dumps(crawl_dict, ensure_ascii=False, indent=2), encoding="utf-8")
-    print(f"         {len(crawl_dict['pages'])} ページ / {len(crawl_dict['forms'])} フォーム")
+    if "crawl" in done:
+        print("         前回の巡回結果を再利用（--resume）")
+        crawl_data = load_crawl(crawl_out)
+        counts = {k: len(crawl_data[k]) for k in ("pages", "forms")}
+    elif args.stream:
+        # --stream: crawl.jsonl へ逐次書き出し、チェックはそれを遅延読み込みする（ピークメモリが
+        # ページ数に比例しない）。crawl.json は後方互換のため jsonl から要素単位で書き出す。
+        with JsonlWriter(out_dir / "crawl.jsonl") as sink:
+            crawl_mod.crawl(**crawl_kwargs, sink=sink)
+            counts = dict(sink.counts)
+        crawl_data = CrawlStream(out_dir / "crawl.jsonl")
+        write_json(crawl_data, out_dir / "crawl.json")
+    else:
+        crawl_data = asdict(crawl_mod.crawl(**crawl_kwargs))
+        (out_dir / "crawl.json").write_text(
+            json.dumps(crawl_data, ensure_ascii=False, indent=2), encoding="utf-8")
+        counts = {k: len(crawl_data[k]) for k in ("pages", "forms")}
+    _mark_phase(out_dir, state, "crawl")
+    print(f"         {counts['pages']} ページ / {counts['forms']} フォーム")
+    xfer = crawl_data["scope"].get("transfer")
+    if xfer:
+        print(f"         転送 {xfer['bytes_downloaded']} bytes / 本文省略 {xfer['bodies_skipped']} 件"
+              f"・上限打切 {xfer['bodies_truncated']} 件（未取得 {xfer['bytes_skipped']} bytes）")
+    inc = crawl_data["scope"].get("incremental")
+    if inc:
+        print(f"         差分巡回: 未変更(304) {inc['unchanged']} / 再取得 {inc['refetched']} / "
+              f"新規 {inc['new']}（節約 {inc['bytes_saved']} bytes・sitemap 優先 "
+              f"{inc['sitemap_prioritized']}）")
 
     # Phase 2: 非破壊チェック
     print("[assess] Phase 2 チェック")
-    if args.active_auth and not args.authorized_active.strip():
-        print("[assess] --active-auth が指定されましたが --authorized-active（書面認可）が空です。"
-              "能動認証テストは実行しません（非破壊のまま続行）。", file=sys.stderr)
-    ledger = checks_mod.Ledger()
-    findings = checks_mod.run_checks(
-        crawl_dict, timeout=args.timeout, active=not args.passive_only, ledger=ledger,
-        active_auth=args.active_auth, active_auth_url=args.login_url,
-        active_auth_authorized=args.authorized_active, max_login_attempts=args.max_login_attempts,
-        active_auth_reset_url=args.reset_url)
+    checks_ckpt = out_dir / "checks.checkpoint.json"
+    checked = checkpoint_mod.read(out_dir / CHECKS_RESULT_FILE) if "checks" in done else None
+    if checked is not None:
+        print("         前回のチェック結果を再利用（--resume）")
+        site.close()
+    else:
+        if args.active_auth and not args.authorized_active.strip():
+            print("[assess] --active-auth が指定されましたが --authorized-active（書面認可）が空です。"
+                  "能動認証テストは実行しません（非破壊のまま続行）。", file=sys.stderr)
+        ledger = checks_mod.Ledger()
+        inventory = build_inventory(crawl_data["pages"])   # ライブラリ系チェックと sbom.json で共有
+        findings = checks_mod.run_checks(
+            crawl_data, timeout=args.timeout, active=not args.passive_only, ledger=ledger,
+            active_auth=args.active_auth, active_auth_url=args.login_url,
+            active_auth_authorized=args.authorized_active,
+            max_login_attempts=args.max_login_attempts,
+            active_auth_reset_url=args.reset_url, replay=archive,
+            checkpoint=checks_ckpt, resume=args.resume, limiter=limiter,
+            site=site, workers=args.check_workers, cache_size=args.cache_size,
+            js_cache=None if args.no_js_cache else args.js_cache, inventory=inventory,
+            probe_budget=args.probe_budget, soft404_cache=args.soft404_cache,
+            profile_dir=out_dir / "profile" if args.profile else None)
+        site.close()
+        (out_dir / "sbom.json").write_text(
+            json.dumps(inventory.to_cyclonedx(args.target, checks_mod._now_iso()),
+                       ensure_ascii=False, indent=2), encoding="utf-8")
+        checked = {"findings": findings, "coverage": ledger.rows(),
+                   "coverage_summary": ledger.summary(), "assessment": ledger.assessment}
+        checkpoint_mod.write_atomic(out_dir / CHECKS_RESULT_FILE, checked)
+        _mark_phase(out_dir, state, "checks")
+        # 完了後はグループ単位の途中状態は不要（次の --resume は結果ファイルから復元する）
+        checks_ckpt.unlink(missing_ok=True)
+    findings = checked["findings"]
 
     # Phase 2b: 外部ツール併用（任意）
     tools_used: list[str] = []
     if not args.no_external:
         print("[assess] Phase 2b 外部ツール検出")
-        ext = external_tools.collect(args.target, timeout=args.external_timeout)
+        if "external" in done:
+            ext = json.loads((out_dir / "ext_findings.json").read_text(encoding="utf-8"))
+        else:
+            ext = external_tools.collect(args.target, timeout=args.external_timeout)
+            (out_dir / "ext_findings.json").write_text(
+                json.dumps(ext, ensure_ascii=False, indent=2), encoding="utf-8")
+            _mark_phase(out_dir, state, "external")
         tools_used = ext.get("tools_used", [])
         findings.extend(_normalize_external(ext.get("findings", []), start_seq=len(findings)))
-        (out_dir / "ext_findings.json").write_text(
-            json.dumps(ext, ensure_ascii=False, indent=2), encoding="utf-8")
 
     findings_doc = {
-        "target": args.target, "scope": crawl_dict["scope"], "findings": findings,
-        "coverage": ledger.rows(), "coverage_summary": ledger.summary(),
-        "assessment": ledger.assessment,  # G1: 採点ゲート用の信頼性メタ
+        "target": args.target, "findings": findings,
+        # rate_control は巡回＋チェック通算のレート変更記録（crawl.json 側は巡回分のみ）
+        "scope": {**crawl_data["scope"], "rate_control": limiter.summary()},
+        "coverage": checked["coverage"], "coverage_summary": checked["coverage_summary"],
+        "assessment": checked["assessment"],  # G1: 採点ゲート用の信頼性メタ
     }
     (out_dir / "findings.json").write_text(
         json.dumps(findings_doc, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -136,7 +236,7 @@ def run(args) -> int:
     # Phase 3: 採点
     print("[assess] Phase 3 CVSS 採点")
     scored = scoring_mod.score_all(findings_doc)
-    scored["pages"] = crawl_dict["pages"]
+    scored["pages"] = list(crawl_data["pages"])  # 報告書の巡回一覧（ここでのみ実体化）
     (out_dir / "scored.json").write_text(
         json.dumps(scored, ensure_ascii=False, indent=2), encoding="utf-8")
     s = scored["summary"]
@@ -170,20 +270,56 @@ def run(args) -> int:
 
 def build_parser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser(description="脆弱性診断オーケストレータ（認可必須・非破壊）")
-    ap.add_argument("--target", required=True, help="診断対象の起点 URL")
-    ap.add_argument("--authorized-by", required=True,
-                    help="認可の根拠（部署/書面番号等）。空なら実行拒否。")
+    ap.add_argument("--target", help="診断対象の起点 URL（--resume 時は不要）")
+    ap.add_argument("--authorized-by",
+                    help="認可の根拠（部署/書面番号等）。空なら実行拒否。（--resume 時は前回の値）")
     ap.add_argument("--out-dir", default="./vuln-out")
+    ap.add_argument("--resume", default=None, metavar="OUT_DIR",
+                    help="中断した診断の out-dir。state.json の引数とチェックポイントから続きを実行する")
+    ap.add_argument("--checkpoint-every", type=int, default=50,
+                    help="巡回のチェックポイント保存間隔（ページ数）")
     ap.add_argument("--assessor", default="", help="実施者名（任意）")
     ap.add_argument("--narrative", help="narrative.json（Claude 加筆のエグゼクティブ総括等）")
     ap.add_argument("--max-pages", type=int, default=50)
     ap.add_argument("--max-depth", type=int, default=3)
     ap.add_argument("--rate", type=float, default=2.0)
+    ap.add_argument("--concurrency", type=int, default=4,
+                    help="巡回の同時取得ワーカー数（レートは --rate が上限）")
+    ap.add_argument("--stream", action="store_true",
+                    help="巡回結果を crawl.jsonl へ逐次書き出し、チェックも遅延読み込みする（大規模サイト向け）")
+    ap.add_argument("--max-per-template", type=int, default=10,
+                    help="同一 URL テンプレート（/item?id=N 等）の巡回上限（0 で無制限）")
     ap.add_argument("--timeout", type=float, default=15.0)
+    ap.add_argument("--max-body-bytes", type=int, default=crawl_mod.DEFAULT_MAX_BODY_BYTES,
+                    help="巡回で取得する HTML 本文の上限（バイト）。非 HTML は本文を取得しない")
+    ap.add_argument("--parser", choices=crawl_mod.BACKENDS, default=crawl_mod.DEFAULT_BACKEND,
+                    help="巡回の HTML 解析バックエンド（html.parser / lxml / stream）")
+    ap.add_argument("--incremental", default=None, metavar="PREV_OUT_DIR",
+                    help="前回の out-dir。そのアーカイブで条件付き GET を行い未変更ページの再取得を省く")
+    ap.add_argument("--no-archive", action="store_true",
+                    help="応答アーカイブを作らない（受動チェックは巡回済みページを再取得する）")
+    ap.add_argument("--archive-compression", choices=COMPRESSIONS, default=DEFAULT_COMPRESSION,
+                    help="アーカイブ本文の圧縮（zstd は zstandard 未導入なら gzip）")
     ap.add_argument("--external-timeout", type=int, default=600)
     ap.add_argument("--ignore-robots", action="store_true")
+    ap.add_argument("--no-sitemap-seed", action="store_true",
+                    help="sitemap の URL を巡回候補に投入しない（リンクのみを辿る）")
     ap.add_argument("--extra-host", action="append", default=[])
     ap.add_argument("--passive-only", action="store_true", help="能動プローブを無効化")
+    ap.add_argument("--check-workers", type=int, default=4,
+                    help="能動チェック群の並行数（送信レートは --rate が上限のまま。1 で逐次）")
+    ap.add_argument("--cache-size", type=int, default=checks_mod.DEFAULT_CACHE_SIZE,
+                    help="チェック実行内の応答キャッシュの件数上限（同じ要求を 1 回の送信にまとめる。0 で無効）")
+    ap.add_argument("--probe-budget", type=int, default=checks_mod.DEFAULT_PROBE_BUDGET,
+                    help="機微ファイル・一覧表示・認証ルートの存在確認の要求数上限（ルート直下は常に実施）")
+    ap.add_argument("--soft404-cache", default=None,
+                    help="接頭辞ごとの soft-404 指紋の保存先（JSON。指定時は 1 日以内の指紋を診断間で再利用）")
+    ap.add_argument("--profile", action="store_true",
+                    help="チェックのグループごとの cProfile を <out>/profile/<グループ ID>.prof に保存（能動群も逐次に実行）")
+    ap.add_argument("--js-cache", default=str(jscache.default_path()),
+                    help="外部 JS の解析結果キャッシュ（内容ハッシュ単位・診断間で共有）の保存先")
+    ap.add_argument("--no-js-cache", action="store_true",
+                    help="外部 JS の解析結果を保存しない（実行内の重複排除のみ）")
     # Phase 3 能動認証テスト（既定 OFF・非破壊・login への POST 限定）。--authorized-active が
     # 空なら能動認証は実行されない（二重ゲート）。--login-url でエンドポイントを明示する。
     ap.add_argument("--active-auth", action="store_true",
@@ -201,7 +337,20 @@ def build_parser() -> argparse.ArgumentParser:
 
 
 def main(argv: list[str] | None = None) -> int:
-    return run(build_parser().parse_args(argv))
+    ap = build_parser()
+    args = ap.parse_args(argv)
+    if args.resume:
+        prev = checkpoint_mod.read(Path(args.resume) / STATE_FILE)
+        if prev is None:
+            ap.error(f"--resume: {args.resume} に {STATE_FILE} がありません")
+        # 認可・対象・巡回条件は前回の値を使う（再開で範囲が変わらないように）
+        for k, v in prev["args"].items():
+            setattr(args, k, v)
+        args.out_dir = args.resume
+        args.resume = True
+    elif not args.target or args.authorized_by is None:
+        ap.error("--target と --authorized-by は必須です（--resume 時を除く）")
+    return run(args)
 
 
 if __name__ == "__main__":
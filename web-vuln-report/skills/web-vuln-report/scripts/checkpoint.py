@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+checkpoint.py - 長時間の巡回・診断の中断再開用チェックポイント（アトミックな JSON 保存）
+
+crawl はフロンティア・取得済み集合・途中結果を N ページごとに、checks は完了した台帳グループと
+所見をグループ完了ごとに保存する。assess.py --resume <out-dir> はこれらと state.json
+（完了フェーズと実行引数）から再開し、対象サーバへ同じリクエストを送り直さない。
+
+書き込みは一時ファイル→rename で行い、保存途中で落ちても直前のチェックポイントが壊れない。
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+VERSION = 1
+
+
+def write_atomic(path: str | Path, data: dict) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fp:
+        json.dump({"version": VERSION, **data}, fp, ensure_ascii=False)
+        fp.flush()
+        os.fsync(fp.fileno())
+    tmp.replace(path)
+
+
+def read(path: str | Path | None) -> dict | None:
+    """チェックポイントを読む。無い・壊れている・版が違う場合は None（最初からやり直す）。"""
+    if path is None:
+        return None
+    try:
+        with open(path, encoding="utf-8") as fp:
+            data = json.load(fp)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != VERSION:
+        return None
+    return data
+
+
+def remove(path: str | Path | None) -> None:
+    if path is None:
+        return
+    try:
+        Path(path).unlink()
+    except OSError:
+        pass
@@ -7,39 +7,61 @@ Licensed under the MIT License.
 
 認可済み・単一組織スコープの防御的診断専用。以下を必ずコードで強制する:
   - same-origin（スコープ内ホストのみ）
-  - robots.txt 尊重（--ignore-robots で明示解除可能だが既定は尊重）
-  - レート制御（--rate req/s）・件数/深さ上限・タイムアウト
+  - robots.txt 尊重（--ignore-robots で明示解除可能だが既定は尊重）。Crawl-delay はホストの
+    レート天井として反映し、sitemap の URL は深さ 1 の候補として投入する（取得は siteindex.py）
+  - レート制御（--rate req/s を天井とするホスト単位の AIMD。429/503/Retry-After で減速し、
+    健全な間は天井まで戻す）・件数/深さ上限・タイムアウト
+  - 並行取得は --concurrency 本の有界ワーカーに限定（httpx.AsyncClient）
+  - URL は正規化して 1 度だけ投入し、同一テンプレートの取得は --max-per-template 件まで
+    （フォーム/新規パラメータ/新規 script を持つページを優先。frontier.py を参照）
+  - 応答はヘッダを先に読み、本文は HTML のときだけ --max-body-bytes まで取得する（PDF・動画・
+    アーカイブ等のリンク先は本文を読まずに接続を閉じる。ページごとに bytes_downloaded /
+    bytes_skipped を記録）
   - スキャナを名乗る User-Agent（透明性）
 
 出力: crawl.json（scope, pages[], forms[], params[], cookies[]）
+      --out に .jsonl を指定すると crawl.jsonl（1 行 1 レコード）へ逐次書き出し、
+      ページ数に比例して結果をメモリに溜めない（形式は crawlstream.py を参照）
+      --archive DIR で応答（status/ヘッダ/本文）を保存し、checks の受動チェックを再取得なしで
+      実行できる（形式は archive.py を参照）
+      --incremental PREV_ARCHIVE で前回アーカイブの ETag / Last-Modified による条件付き GET を
+      行い、304 のページは前回本文から同じレコードを再構成する（sitemap の lastmod で変更ページを優先）
 
 Usage:
     uv run --with httpx --with beautifulsoup4 crawl.py \
         --target https://example.com --authorized-by "運用部/書面認可#123" \
-        --out crawl.json --max-pages 50 --max-depth 3 --rate 2
+        --out crawl.json --max-pages 50 --max-depth 3 --rate 2 --concurrency 4
 """
 from __future__ import annotations
 
 import argparse
+import asyncio
 import json
 import re
 import sys
 import time
-import urllib.robotparser
-from collections import deque
 from dataclasses import dataclass, field, asdict
 from datetime import datetime, timezone
+from pathlib import Path
 from urllib.parse import urljoin, urlparse, urldefrag
 
 try:
     import httpx
-    from bs4 import BeautifulSoup
+    import bs4  # noqa: F401  既定の HTML バックエンド（htmlview 経由で使用）
 except ImportError as e:  # pragma: no cover - 実行時の依存不足を明示
     print(f"[crawl] 依存パッケージが不足しています: {e}\n"
           f"  uv run --with httpx --with beautifulsoup4 crawl.py ... で実行してください。",
           file=sys.stderr)
     raise
 
+import checkpoint as checkpoint_mod
+from archive import COMPRESSIONS, DEFAULT_COMPRESSION, ResponseArchive
+from crawlstream import JsonlWriter
+from frontier import Frontier, dedupe_key
+from htmlview import DEFAULT_BACKEND, BACKENDS, HtmlView, parse_html, resolve_backend
+from ratelimit import AdaptiveRateLimiter
+from siteindex import SiteIndex, origin_of, parse_lastmod
+
 USER_AGENT = "web-vuln-report/0.1 (authorized security assessment; +non-destructive)"
 
 # 技術フィンガープリント（ヘッダ/HTML の弱いシグナル。CVE 断定には使わない）
@@ -68,30 +90,29 @@ _MAX_ROUTES = 400
 _MAX_API_PATHS = 200
 
 
-def _extract_client_markers(soup: BeautifulSoup, html: str, base_url: str) -> dict:
+def _extract_client_markers(view: HtmlView, html: str, base_url: str) -> dict:
     """`<script src>` URL 群とルート blob マーカー、クライアント FW 指紋を構造化して返す。
 
-    soup は既にパース済みのため追加コストは小さい。本文は保持せず必要マーカーのみ抽出する。"""
+    view は既にパース済みのため追加コストは小さい。本文は保持せず必要マーカーのみ抽出する。"""
     h = html or ""
     script_srcs: list[str] = []
-    for s in soup.find_all("script", src=True):
-        src = (s.get("src") or "").strip()
+    for s in view.scripts:
+        src = (s["src"] or "").strip()
         if src:
             script_srcs.append(urljoin(base_url, src))
-    inline = "\n".join((s.get_text() or "") for s in soup.find_all("script") if not s.get("src"))
+    inline = "\n".join(s["text"] for s in view.scripts if not s["src"])
 
     route_markers = {"ziggy": [], "next_data": False, "inertia_url": None, "api_paths": []}
     if _ZIGGY_DEF_RE.search(inline):
         for name, uri in _ZIGGY_ROUTE_RE.findall(inline)[:_MAX_ROUTES]:
             route_markers["ziggy"].append({"name": name, "uri": uri})
-    app = soup.find(attrs={"data-page": True})
-    if app and app.get("data-page"):
+    if view.data_page:
         try:
-            dp = json.loads(app["data-page"])
+            dp = json.loads(view.data_page)
             route_markers["inertia_url"] = dp.get("url")
         except Exception:
             route_markers["inertia_url"] = None
-    if soup.find("script", id="__NEXT_DATA__") or "__NEXT_DATA__" in h:
+    if view.next_data or "__NEXT_DATA__" in h:
         route_markers["next_data"] = True
     api: list[str] = []
     for m in _JS_API_RE.findall(inline):
@@ -101,17 +122,17 @@ def _extract_client_markers(soup: BeautifulSoup, html: str, base_url: str) -> di
             break
     route_markers["api_paths"] = api
 
-    client_fw = _detect_client_fw(soup, h, script_srcs)
+    client_fw = _detect_client_fw(view, h, script_srcs)
     return {"script_srcs": _dedupe_str(script_srcs), "route_markers": route_markers,
             "client_fw": client_fw}
 
 
-def _detect_client_fw(soup: BeautifulSoup, h: str, script_srcs: list[str]) -> list[str]:
+def _detect_client_fw(view: HtmlView, h: str, script_srcs: list[str]) -> list[str]:
     """DOM/メタ/スクリプトパスからクライアント FW を弱く指紋する（情報カテゴリ・CVE 断定はしない）。"""
     fw: set[str] = set()
     if "data-reactroot" in h:
         fw.add("react")
-    if soup.find("script", id="__NEXT_DATA__") or "/_next/static/" in h:
+    if view.next_data or "/_next/static/" in h:
         fw.add("next")
     if "__NUXT__" in h or "/_nuxt/" in h:
         fw.add("nuxt")
@@ -119,7 +140,7 @@ def _detect_client_fw(soup: BeautifulSoup, h: str, script_srcs: list[str]) -> li
         fw.add("vue")
     if _NG_VERSION_RE.search(h) or "_nghost" in h or "_ngcontent" in h:
         fw.add("angular")
-    if soup.find("meta", attrs={"name": "csrf-token"}):
+    if view.meta("csrf-token") is not None:
         fw.add("laravel-csrf-meta")
     if "api.w.org" in h:
         fw.add("wordpress")
@@ -161,19 +182,20 @@ def _same_scope(url: str, allowed_hosts: set[str]) -> bool:
     return host.lower() in allowed_hosts
 
 
-def _fingerprint(headers: httpx.Headers, html: str | None) -> list[str]:
+def _fingerprint(headers: httpx.Headers, view: HtmlView | None) -> list[str]:
     techs = []
     for key, label in _TECH_HEADER_HINTS.items():
         if key in headers:
             techs.append(f"{label}: {headers[key]}")
-    if html:
-        soup = BeautifulSoup(html, "html.parser")
-        gen = soup.find("meta", attrs={"name": "generator"})
+    if view is not None:
+        gen = view.meta("generator")
         if gen and gen.get("content"):
             techs.append(f"generator: {gen['content']}")
         # JS ライブラリのパスからの弱いバージョン推定
-        for script in soup.find_all("script", src=True):
+        for script in view.scripts:
             src = script["src"]
+            if src is None:
+                continue
             for lib in ("jquery", "bootstrap", "angular", "react", "vue"):
                 if lib in src.lower():
                     techs.append(f"js: {src}")
@@ -187,10 +209,10 @@ def _fingerprint(headers: httpx.Headers, html: str | None) -> list[str]:
     return out
 
 
-def _extract_links(base_url: str, soup: BeautifulSoup) -> list[str]:
+def _extract_links(base_url: str, view: HtmlView) -> list[str]:
     links = []
-    for a in soup.find_all("a", href=True):
-        href = a["href"].strip()
+    for href in view.links:
+        href = href.strip()
         if not href or href.startswith(("mailto:", "tel:", "javascript:", "#")):
             continue
         absolute, _ = urldefrag(urljoin(base_url, href))
@@ -198,17 +220,12 @@ def _extract_links(base_url: str, soup: BeautifulSoup) -> list[str]:
     return links
 
 
-def _extract_forms(base_url: str, soup: BeautifulSoup) -> list[dict]:
+def _extract_forms(base_url: str, view: HtmlView) -> list[dict]:
     forms = []
-    for form in soup.find_all("form"):
-        action = urljoin(base_url, form.get("action", "").strip() or base_url)
-        method = (form.get("method") or "GET").upper()
-        inputs = []
-        for tag in form.find_all(("input", "textarea", "select")):
-            name = tag.get("name")
-            if not name:
-                continue
-            inputs.append({"name": name, "type": tag.get("type", tag.name)})
+    for form in view.forms:
+        action = urljoin(base_url, form["action"].strip() or base_url)
+        method = (form["method"] or "GET").upper()
+        inputs = [dict(i) for i in form["inputs"]]
         forms.append({"url": base_url, "action": action, "method": method, "inputs": inputs})
     return forms
 
@@ -243,26 +260,338 @@ def _collect_cookies(url: str, resp: httpx.Response) -> list[dict]:
     return out
 
 
-def _load_robots(base: str, respect: bool) -> urllib.robotparser.RobotFileParser | None:
-    if not respect:
+def _changed_since_previous(sitemap: dict[str, datetime | None],
+                            previous: ResponseArchive) -> list[str]:
+    """sitemap の lastmod が前回取得時刻より新しい（または前回未取得の）URL を返す。"""
+    changed = []
+    for url, lastmod in sitemap.items():
+        entry = previous.entry(url)
+        if entry is None:
+            changed.append(url)
+            continue
+        fetched = parse_lastmod(entry.get("fetched_at"))
+        if lastmod is not None and fetched is not None and lastmod > fetched:
+            changed.append(url)
+    return sorted(changed)
+
+
+def _revalidated(resp: httpx.Response, previous: ResponseArchive, url: str
+                 ) -> httpx.Response | None:
+    """304 応答を前回の記録で補完した 200 応答にする（304 が運ぶヘッダで前回ヘッダを更新）。"""
+    cached = previous.response(url)
+    if cached is None:
         return None
-    rp = urllib.robotparser.RobotFileParser()
-    robots_url = urljoin(base, "/robots.txt")
-    try:
-        with httpx.Client(timeout=10, headers={"User-Agent": USER_AGENT}) as c:
-            r = c.get(robots_url)
-            if r.status_code == 200:
-                rp.parse(r.text.splitlines())
-            else:
-                rp.parse([])  # robots が無ければ全許可
-    except Exception:
-        rp.parse([])
-    return rp
+    fresh = {k.lower() for k in resp.headers.keys()}
+    headers = [(k, v) for k, v in cached.headers.multi_items() if k.lower() not in fresh]
+    headers += [(k, v) for k, v in resp.headers.multi_items()
+                if k.lower() not in ("content-length", "content-encoding", "transfer-encoding")]
+    return httpx.Response(cached.status_code, headers=headers, content=cached.content,
+                          request=cached.request)
+
+
+# 本文を取得する Content-Type（それ以外はヘッダだけ読んで接続を閉じる）
+_BODY_CTYPES = ("text/html", "application/xhtml+xml")
+DEFAULT_MAX_BODY_BYTES = 5 * 1024 * 1024
+_HTML_SNIFF_PREFIXES = (b"<!doctype html", b"<html", b"<head", b"<body")
+
+
+def _wants_body(ctype: str) -> bool:
+    ctype = ctype.lower()
+    return any(t in ctype for t in _BODY_CTYPES)
+
+
+def _looks_like_html(head: bytes) -> bool:
+    """Content-Type の無い応答の先頭チャンクが HTML らしいか（本文を読み続けるかの判定）。"""
+    return head[:512].lstrip().lower().startswith(_HTML_SNIFF_PREFIXES)
+
+
+def _is_html(ctype: str, body: bytes) -> bool:
+    """解析する HTML か。_fetch_streamed が本文を読む条件（_wants_body と先頭の推定）と同じ。"""
+    return _wants_body(ctype) if ctype else _looks_like_html(body)
+
+
+async def _fetch_streamed(client: httpx.AsyncClient, url: str, headers: dict | None,
+                          max_body_bytes: int) -> tuple[httpx.Response, dict]:
+    """ヘッダを先に受け取り、本文は HTML のときだけ max_body_bytes まで読む。
+
+    非 HTML（および上限超過分）は読まずに応答を閉じる。返す Response は読んだ分だけを本文に持つ
+    （Content-Encoding は復号済みのため落とす）。2 つ目の返り値はページに載せる転送量の記録で、
+    bytes_skipped は Content-Length が分かる場合のみ数値（不明なら None）。"""
+    async with client.stream("GET", url, headers=headers) as resp:
+        ctype = resp.headers.get("content-type", "")
+        chunks: list[bytes] = []
+        size = 0
+        truncated = complete = False
+        if not ctype or _wants_body(ctype):
+            complete = True
+            async for chunk in resp.aiter_bytes():
+                if not ctype and not chunks and not _looks_like_html(chunk):
+                    complete = False
+                    break
+                if size + len(chunk) > max_body_bytes:
+                    chunks.append(chunk[:max_body_bytes - size])
+                    truncated, complete = True, False
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+        downloaded = resp.num_bytes_downloaded
+        length = resp.headers.get("content-length", "")
+    if complete or resp.status_code in (204, 304):
+        skipped: int | None = 0
+    else:
+        skipped = max(0, int(length) - downloaded) if length.isdigit() else None
+    transfer = {"bytes_downloaded": downloaded, "bytes_skipped": skipped}
+    if truncated:
+        transfer["body_truncated"] = True
+    kept = [(k, v) for k, v in resp.headers.multi_items()
+            if k.lower() not in ("content-encoding", "transfer-encoding")]
+    return httpx.Response(resp.status_code, headers=kept, content=b"".join(chunks),
+                          request=resp.request), transfer
+
+
+def _analyze_response(url: str, resp: httpx.Response, parser: str = DEFAULT_BACKEND
+                      ) -> tuple[dict, list, list, list, list[str]]:
+    """1 応答を page レコードと forms/params/cookies/リンクに分解する（通信は行わない）。
+
+    HTML は 1 回だけ解析し、指紋・title・マーカー・フォーム・リンクの各抽出器で共有する。"""
+    ctype = resp.headers.get("content-type", "")
+    is_html = _is_html(ctype, resp.content)
+    html = resp.text if is_html else None
+    view = parse_html(html, parser) if html else None
+    page = {
+        "url": url,
+        "status": resp.status_code,
+        "content_type": ctype,
+        "server": resp.headers.get("server", ""),
+        "technologies": _fingerprint(resp.headers, view),
+    }
+    cookies = _collect_cookies(url, resp)
+    params = _extract_params(url)
+    forms: list[dict] = []
+    links: list[str] = []
+    if is_html and resp.status_code < 400:
+        view = view or HtmlView()
+        page["title"] = view.title
+        markers = _extract_client_markers(view, html, url)
+        page["script_srcs"] = markers["script_srcs"]
+        page["route_markers"] = markers["route_markers"]
+        page["client_fw"] = markers["client_fw"]
+        forms = _extract_forms(url, view)
+        links = _extract_links(url, view)
+    return page, forms, params, cookies, links
+
+
+async def _crawl_async(result: CrawlResult, target: str, allowed_hosts: set[str],
+                       robots: SiteIndex | None, max_pages: int,
+                       max_depth: int, rate: float, timeout: float, concurrency: int,
+                       parser: str = DEFAULT_BACKEND, sink: JsonlWriter | None = None,
+                       archive: ResponseArchive | None = None,
+                       previous: ResponseArchive | None = None,
+                       priority_urls: list[str] | None = None,
+                       frontier: Frontier | None = None,
+                       checkpoint: Path | None = None, checkpoint_every: int = 50,
+                       restored: dict | None = None,
+                       limiter: AdaptiveRateLimiter | None = None,
+                       max_body_bytes: int = DEFAULT_MAX_BODY_BYTES) -> None:
+    """有界ワーカープールでフロンティアを並行に消化する。
+
+    取り出しは深さ順（同じ深さの中は優先度順）。ホスト単位トークンバケットで送出時刻を
+    予約するため、同時接続数に関わらず同一ホストへのレートは厳密に --rate 以下となる。
+    所要時間は「遅延 × ページ数」から概ね「ページ数 / rate」に縮む。
+    sink 指定時は 1 ページ取得ごとに書き出して result には溜めない（行順は取得完了順）。
+    previous 指定時は条件付き GET を送り、304 は前回本文から再構成して同じ抽出を行う
+    （リンクも前回本文から辿れるため巡回範囲は変わらない）。priority_urls は起点直後に投入する。
+    checkpoint 指定時は checkpoint_every ページ完了ごとにフロンティア・取得数・途中結果を保存し、
+    restored（読み込んだチェックポイント）からは取得中だった URL を戻して続きを巡回する。
+    limiter（AIMD）には各応答の status / Retry-After / 応答時間を渡して送出レートを調整させる。
+    本文は HTML だけを max_body_bytes まで読み、転送量を page と scope["transfer"] に記録する。"""
+    limiter = limiter if limiter is not None else AdaptiveRateLimiter(rate)
+    frontier = frontier if frontier is not None else Frontier()
+    cond = asyncio.Condition()
+    in_flight = 0
+    claimed = 0
+    order: dict[str, tuple[int, int]] = {}   # url -> (depth, 取得完了順)。最終ソート用
+    collected: list[tuple[dict, list, list, list]] = []
+    active: dict[str, int] = {}   # 取得中の url -> depth（チェックポイントでは未完了として戻す）
+    completed = 0
+    inc = result.scope.get("incremental")
+    xfer = result.scope["transfer"]
+
+    def enqueue(url: str, depth: int, score: int = 0) -> None:
+        # 深さ・スコープ・robots は投入前に判定し、フロンティアには取得候補だけを積む
+        if depth > max_depth or not _same_scope(url, allowed_hosts):
+            return
+        if url in frontier:
+            frontier.push(url, depth)  # 重複として数えるだけ（O(1)）
+            return
+        if robots is not None and not robots.can_fetch(url):
+            return
+        frontier.push(url, depth, score)
+
+    async def prefetch_robots(urls, depth: int) -> None:
+        # 未取得オリジンの robots.txt は同期の取得（レート待ちの sleep を含む）になるため、
+        # enqueue の前にスレッドで取っておき、イベントループ（他のワーカー）を止めない
+        if robots is None or depth > max_depth:
+            return
+        origins = {origin_of(u): u for u in urls
+                   if _same_scope(u, allowed_hosts) and not robots.has_robots(u)}
+        for url in origins.values():
+            await asyncio.to_thread(robots.robots, url)
+
+    if restored is not None:
+        claimed = completed = restored["claimed"]
+        for url, depth in restored["in_flight"]:
+            frontier.requeue(url, depth)
+        if sink is None:
+            collected = [tuple(c) for c in restored["collected"]]
+            order = {u: tuple(v) for u, v in restored["order"].items()}
+    else:
+        await prefetch_robots([target], 0)
+        await prefetch_robots(priority_urls or [], 1)
+        enqueue(target, 0)
+        for u in priority_urls or []:
+            enqueue(u, 1)
+
+    def save_checkpoint() -> None:
+        data = {"scope": result.scope, "frontier": frontier.to_state(),
+                "claimed": claimed - len(active),
+                "in_flight": [[u, d] for u, d in active.items()]}
+        if sink is not None:
+            data["sink_offset"] = sink.checkpoint()   # 以降の行は再開時に切り捨てる
+        else:
+            data["collected"] = collected
+            data["order"] = order
+        checkpoint_mod.write_atomic(checkpoint, data)
+
+    def emit(page: dict, forms: list, params: list, cookies: list) -> None:
+        if sink is not None:
+            sink.add(page, forms, params, cookies)
+        else:
+            collected.append((page, forms, params, cookies))
+
+    async def fetch(client: httpx.AsyncClient, url: str, depth: int) -> None:
+        await limiter.acquire_async(url)
+        if sink is None:
+            order[url] = (depth, len(order))
+        cond_headers = previous.validators(url) if previous is not None else {}
+        t0 = time.monotonic()
+        try:
+            resp, transfer = await _fetch_streamed(client, url, cond_headers or None,
+                                                   max_body_bytes)
+        except Exception as exc:
+            limiter.observe(url, timed_out=isinstance(exc, httpx.TimeoutException))
+            emit({"url": url, "error": str(exc)}, [], [], [])
+            return
+        limiter.observe(url, resp.status_code, resp.headers, time.monotonic() - t0)
+        xfer["bytes_downloaded"] += transfer["bytes_downloaded"]
+        xfer["bytes_skipped"] += transfer["bytes_skipped"] or 0
+        if transfer["bytes_skipped"] != 0:
+            xfer["bodies_truncated" if transfer.get("body_truncated") else "bodies_skipped"] += 1
+        if inc is not None:
+            state = "new" if previous.entry(url) is None else "refetched"
+            if resp.status_code == 304 and cond_headers:
+                cached = _revalidated(resp, previous, url)
+                if cached is not None:
+                    resp, state = cached, "unchanged"
+                    inc["bytes_saved"] += len(resp.content)
+            inc[state] += 1
+        if archive is not None:
+            try:
+                archive.put(url, resp)
+            except OSError:
+                pass  # 記録失敗は巡回を止めない（checks は未記録 URL を再生しないだけ）
+        page, forms, params, cookies, links = _analyze_response(url, resp, parser)
+        page.update(transfer)
+        if inc is not None:
+            page["revalidation"] = state
+        await prefetch_robots(links, depth + 1)   # emit 以降は await を挟まない
+        emit(page, forms, params, cookies)
+        bonus = frontier.link_bonus(forms, page.get("script_srcs", []))
+        for link in links:
+            enqueue(link, depth + 1, bonus)
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal claimed, in_flight, completed
+        while True:
+            async with cond:
+                # 取得中のページがリンクを投入しうる間は待つ。空かつ取得中ゼロで終了
+                while True:
+                    item = frontier.pop() if claimed < max_pages else None
+                    if item is not None or not in_flight or claimed >= max_pages:
+                        break
+                    await cond.wait()
+                if item is None:
+                    cond.notify_all()
+                    return
+                claimed += 1  # 取得前に枠を確保（並行時も max_pages を超えない）
+                in_flight += 1
+                active[item[0]] = item[1]
+            try:
+                await fetch(client, *item)
+                # emit から active 解除・保存までは await を挟まない（途中結果と取得中が重ならない）
+                active.pop(item[0], None)
+                completed += 1
+                if checkpoint is not None and completed % max(1, checkpoint_every) == 0:
+                    save_checkpoint()
+            finally:
+                active.pop(item[0], None)
+                async with cond:
+                    in_flight -= 1
+                    cond.notify_all()
+
+    async with httpx.AsyncClient(timeout=timeout, headers={"User-Agent": USER_AGENT},
+                                 follow_redirects=False) as client:
+        workers = [asyncio.create_task(worker(client)) for _ in range(max(1, concurrency))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for w in workers:
+                w.cancel()
+
+    # 並行取得で完了順は揺らぐため、(深さ, URL) で安定ソートして出力順を決定的にする。
+    # forms/params/cookies はページ順に従属させ、ページ内の順序は抽出順を保つ。
+    collected.sort(key=lambda c: (order.get(c[0]["url"], (0, 0))[0], c[0]["url"]))
+    for page, forms, params, cookies in collected:
+        result.pages.append(page)
+        result.forms.extend(forms)
+        result.params.extend(params)
+        result.cookies.extend(cookies)
 
 
 def crawl(target: str, authorized_by: str, max_pages: int = 50, max_depth: int = 3,
           rate: float = 2.0, timeout: float = 15.0, respect_robots: bool = True,
-          extra_hosts: list[str] | None = None) -> CrawlResult:
+          extra_hosts: list[str] | None = None, concurrency: int = 4,
+          parser: str = DEFAULT_BACKEND, sink: JsonlWriter | None = None,
+          archive: ResponseArchive | None = None,
+          previous: ResponseArchive | None = None,
+          max_per_template: int = 10, checkpoint: str | Path | None = None,
+          checkpoint_every: int = 50, resume: bool = False,
+          limiter: AdaptiveRateLimiter | None = None,
+          max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+          site: SiteIndex | None = None, seed_sitemap: bool = True) -> CrawlResult:
+    """同一オリジン巡回を実行する。
+
+    sink（JsonlWriter）を渡すとレコードを逐次書き出し、返り値の pages/forms/params/cookies は
+    空のまま scope（件数入り）だけを返す。archive を渡すと取得した応答をすべて記録する。
+
+    previous（前回の ResponseArchive）を渡すと差分巡回になる。scope["incremental"] に
+    304/未変更・再取得・新規の件数と節約バイト数を記録する。
+
+    URL は正規化してから投入し、同一テンプレート（/item?id=N 等）の取得は max_per_template
+    件まで（0 で無制限）。フロンティアの統計は scope["frontier"] に記録する。
+
+    checkpoint（ファイルパス）を渡すと checkpoint_every ページごとに途中状態を保存し、
+    resume=True ならそこから再開する（正常終了時にチェックポイントは削除する）。
+
+    limiter を渡すと checks と同じ AIMD レート制御を共有する（省略時は rate を天井に新規作成）。
+    レート変更の記録は scope["rate_control"] に残す。
+
+    本文は HTML のみ max_body_bytes まで取得し、非 HTML はヘッダだけで接続を閉じる。
+    転送量の合計は scope["transfer"]、ページ単位は page の bytes_downloaded / bytes_skipped。
+
+    robots.txt / sitemap は site（SiteIndex。checks と共有）からオリジン単位で 1 回だけ取得する。
+    respect_robots 時は Disallow と Crawl-delay（ホストの天井）に従い、seed_sitemap=True なら
+    sitemap の URL を深さ 1 の候補として投入する（差分巡回時は変更ページのみ優先投入）。"""
     parsed = urlparse(target)
     if parsed.scheme not in ("http", "https"):
         raise ValueError("target は http(s) URL である必要があります")
@@ -271,71 +600,95 @@ def crawl(target: str, authorized_by: str, max_pages: int = 50, max_depth: int =
     for h in (extra_hosts or []):
         allowed_hosts.add(h.lower())
 
-    rp = _load_robots(target, respect_robots)
+    parser = resolve_backend(parser)
+    limiter = limiter if limiter is not None else AdaptiveRateLimiter(rate)
+    own_site = site is None
+    if own_site:
+        site = SiteIndex(USER_AGENT, timeout=timeout, limiter=limiter)
+    robots = site if respect_robots else None
     result = CrawlResult(scope={
         "target": target,
         "hosts": sorted(allowed_hosts),
         "authorized_by": authorized_by,
         "respect_robots": respect_robots,
         "rate_per_sec": rate,
+        "concurrency": concurrency,
+        "html_parser": parser,
         "max_pages": max_pages,
         "max_depth": max_depth,
+        "max_per_template": max_per_template,
+        "max_body_bytes": max_body_bytes,
+        "transfer": {"bytes_downloaded": 0, "bytes_skipped": 0,
+                     "bodies_skipped": 0, "bodies_truncated": 0},
         "started_at": _now_iso(),
         "user_agent": USER_AGENT,
     })
 
-    seen: set[str] = set()
-    queue: deque[tuple[str, int]] = deque([(target, 0)])
-    delay = 1.0 / rate if rate > 0 else 0
-
-    with httpx.Client(timeout=timeout, headers={"User-Agent": USER_AGENT},
-                      follow_redirects=False) as client:
-        while queue and len(result.pages) < max_pages:
-            url, depth = queue.popleft()
-            if url in seen or depth > max_depth:
-                continue
-            seen.add(url)
-            if not _same_scope(url, allowed_hosts):
-                continue
-            if rp is not None and not rp.can_fetch(USER_AGENT, url):
-                continue
-            try:
-                resp = client.get(url)
-            except Exception as exc:
-                result.pages.append({"url": url, "error": str(exc)})
-                continue
-
-            ctype = resp.headers.get("content-type", "")
-            is_html = "text/html" in ctype
-            html = resp.text if is_html else None
-            page = {
-                "url": url,
-                "status": resp.status_code,
-                "content_type": ctype,
-                "server": resp.headers.get("server", ""),
-                "technologies": _fingerprint(resp.headers, html),
-            }
-            result.cookies.extend(_collect_cookies(url, resp))
-            result.params.extend(_extract_params(url))
-
-            if is_html and resp.status_code < 400:
-                soup = BeautifulSoup(html, "html.parser")
-                title = soup.title.string.strip() if soup.title and soup.title.string else ""
-                page["title"] = title
-                markers = _extract_client_markers(soup, html, url)
-                page["script_srcs"] = markers["script_srcs"]
-                page["route_markers"] = markers["route_markers"]
-                page["client_fw"] = markers["client_fw"]
-                result.forms.extend(_extract_forms(url, soup))
-                for link in _extract_links(url, soup):
-                    if link not in seen and _same_scope(link, allowed_hosts):
-                        queue.append((link, depth + 1))
-            result.pages.append(page)
-
+    checkpoint = Path(checkpoint) if checkpoint else None
+    restored = checkpoint_mod.read(checkpoint) if (resume and checkpoint) else None
+    priority: list[str] = []
+    if restored is not None:
+        result.scope = restored["scope"]
+        result.scope["resumed_at"] = _now_iso()
+    elif previous is not None:
+        # 索引は巡回前に読み込んでおく（archive と同じディレクトリでも前回分だけを検証子に使う）
+        previous.load()
+        # sitemap の lastmod で変更ページを先頭へ（max_pages 内で確実に再取得される）
+        sitemap = site.sitemap(target)
+        # 起点は常に最初に取得するため除く（正規化後の重複判定キーで同一視）
+        priority = [u for u in _changed_since_previous(sitemap, previous)
+                    if dedupe_key(u) != dedupe_key(target)
+                    and (robots is None or robots.can_fetch(u))][:max_pages]
+        result.scope["incremental"] = {"previous": str(previous.root), "unchanged": 0,
+                                       "refetched": 0, "new": 0, "bytes_saved": 0,
+                                       "sitemap_prioritized": len(priority)}
+    elif seed_sitemap:
+        # sitemap の <loc> を深さ 1 で投入する（リンクから辿れないページも候補にする）。
+        # スコープ・robots・テンプレート上限は通常のリンクと同じく投入時に判定される
+        priority = [u for u in sorted(site.sitemap(target))
+                    if dedupe_key(u) != dedupe_key(target)][:max_pages]
+        result.scope["sitemap_seeded"] = len(priority)
+    if robots is not None:
+        # robots.txt の Crawl-delay をホストの天井に反映（--rate より緩い値は無視される）
+        for host in sorted(allowed_hosts):
+            origin = (f"{parsed.scheme}://{parsed.netloc}" if host == parsed.hostname.lower()
+                      else f"{parsed.scheme}://{host}")
+            delay = robots.crawl_delay(origin)
             if delay:
-                time.sleep(delay)
+                limiter.limit_host(host, 1.0 / delay)
+    if restored is not None:
+        frontier = Frontier.from_state(restored["frontier"])
+        if sink is not None:
+            sink.start(resume_at=restored.get("sink_offset", 0))
+    else:
+        frontier = Frontier(max_per_template)
+        if sink is not None:
+            sink.write_scope(result.scope)
+    asyncio.run(_crawl_async(result, target, allowed_hosts, robots, max_pages, max_depth,
+                             rate, timeout, concurrency, parser, sink, archive,
+                             previous, priority, frontier, checkpoint, checkpoint_every,
+                             restored, limiter, max_body_bytes))
+    checkpoint_mod.remove(checkpoint)
+    if own_site:
+        site.close()
 
     result.scope["finished_at"] = _now_iso()
+    result.scope["frontier"] = frontier.summary()
+    result.scope["rate_control"] = limiter.summary()
+    result.scope["robots_sitemap"] = site.summary()
+    if sink is not None:
+        result.scope["pages_crawled"] = sink.counts["pages"]
+        final = {"finished_at": result.scope["finished_at"],
+                 "pages_crawled": result.scope["pages_crawled"],
+                 "frontier": result.scope["frontier"],
+                 "rate_control": result.scope["rate_control"],
+                 "transfer": result.scope["transfer"],
+                 "robots_sitemap": result.scope["robots_sitemap"]}
+        for key in ("incremental", "sitemap_seeded", "resumed_at"):
+            if key in result.scope:
+                final[key] = result.scope[key]
+        sink.write_scope(final)
+        return result
     result.scope["pages_crawled"] = len(result.pages)
     # cookies / params の重複除去
     result.cookies = _dedupe(result.cookies, key=lambda c: (c["name"], c["url"]))
@@ -358,13 +711,34 @@ def main(argv: list[str] | None = None) -> int:
     ap.add_argument("--target", required=True, help="起点 URL（http/https）")
     ap.add_argument("--authorized-by", required=True,
                     help="認可の根拠（担当部署/書面番号等）。未指定は実行拒否。")
-    ap.add_argument("--out", default="crawl.json")
+    ap.add_argument("--out", default="crawl.json",
+                    help="出力先。拡張子 .jsonl ならレコードを逐次書き出す（省メモリ）")
     ap.add_argument("--max-pages", type=int, default=50)
     ap.add_argument("--max-depth", type=int, default=3)
     ap.add_argument("--rate", type=float, default=2.0, help="1秒あたりの最大リクエスト数")
+    ap.add_argument("--concurrency", type=int, default=4,
+                    help="同時取得ワーカー数（レートは --rate がホスト単位で厳密に上限）")
+    ap.add_argument("--max-per-template", type=int, default=10,
+                    help="同一 URL テンプレート（/item?id=N 等）の取得上限（0 で無制限）")
     ap.add_argument("--timeout", type=float, default=15.0)
+    ap.add_argument("--max-body-bytes", type=int, default=DEFAULT_MAX_BODY_BYTES,
+                    help="HTML 本文の取得上限（バイト）。非 HTML は本文を取得しない")
+    ap.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND,
+                    help="HTML 解析バックエンド（stream が最速・lxml は任意依存）")
+    ap.add_argument("--archive", default=None,
+                    help="応答アーカイブの保存先ディレクトリ（checks.py --replay で再生）")
+    ap.add_argument("--archive-compression", choices=COMPRESSIONS, default=DEFAULT_COMPRESSION,
+                    help="アーカイブ本文の圧縮（zstd は zstandard 未導入なら gzip）")
+    ap.add_argument("--incremental", default=None, metavar="PREV_ARCHIVE",
+                    help="前回の --archive ディレクトリ。条件付き GET で未変更ページの再取得を省く")
+    ap.add_argument("--checkpoint", default=None,
+                    help="途中状態の保存先（N ページごとに保存し、--resume で続きから再開）")
+    ap.add_argument("--checkpoint-every", type=int, default=50, help="チェックポイントの間隔（ページ数）")
+    ap.add_argument("--resume", action="store_true", help="--checkpoint から巡回を再開する")
     ap.add_argument("--ignore-robots", action="store_true",
                     help="robots.txt を無視（認可範囲で必要な場合のみ）")
+    ap.add_argument("--no-sitemap-seed", action="store_true",
+                    help="sitemap の URL を巡回候補に投入しない（リンクのみを辿る）")
     ap.add_argument("--extra-host", action="append", default=[],
                     help="スコープに含める追加ホスト（複数指定可）")
     args = ap.parse_args(argv)
@@ -373,20 +747,46 @@ def main(argv: list[str] | None = None) -> int:
         print("[crawl] 認可の根拠（--authorized-by）が空です。実行を中止します。", file=sys.stderr)
         return 2
 
-    result = crawl(
-        target=args.target,
-        authorized_by=args.authorized_by,
-        max_pages=args.max_pages,
-        max_depth=args.max_depth,
-        rate=args.rate,
-        timeout=args.timeout,
-        respect_robots=not args.ignore_robots,
-        extra_hosts=args.extra_host,
-    )
-    with open(args.out, "w", encoding="utf-8") as f:
-        json.dump(asdict(result), f, ensure_ascii=False, indent=2)
-    print(f"[crawl] {len(result.pages)} ページ / {len(result.forms)} フォーム / "
-          f"{len(result.cookies)} Cookie を {args.out} に保存しました。")
+    streaming = args.out.endswith(".jsonl")
+    sink = JsonlWriter(args.out) if streaming else None
+    try:
+        result = crawl(
+            target=args.target,
+            authorized_by=args.authorized_by,
+            max_pages=args.max_pages,
+            max_depth=args.max_depth,
+            rate=args.rate,
+            timeout=args.timeout,
+            respect_robots=not args.ignore_robots,
+            extra_hosts=args.extra_host,
+            concurrency=args.concurrency,
+            max_per_template=args.max_per_template,
+            parser=args.parser,
+            sink=sink,
+            archive=(ResponseArchive(args.archive, args.archive_compression)
+                     if args.archive else None),
+            previous=ResponseArchive(args.incremental) if args.incremental else None,
+            checkpoint=args.checkpoint,
+            checkpoint_every=args.checkpoint_every,
+            resume=args.resume,
+            max_body_bytes=args.max_body_bytes,
+            seed_sitemap=not args.no_sitemap_seed,
+        )
+    finally:
+        if sink is not None:
+            sink.close()
+    if streaming:
+        counts = sink.counts
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(asdict(result), f, ensure_ascii=False, indent=2)
+        counts = {k: len(getattr(result, k)) for k in ("pages", "forms", "cookies")}
+    print(f"[crawl] {counts['pages']} ページ / {counts['forms']} フォーム / "
+          f"{counts['cookies']} Cookie を {args.out} に保存しました。")
+    inc = result.scope.get("incremental")
+    if inc:
+        print(f"[crawl] 差分巡回: 未変更(304) {inc['unchanged']} / 再取得 {inc['refetched']} / "
+              f"新規 {inc['new']}（節約 {inc['bytes_saved']} bytes）")
     return 0
 
 
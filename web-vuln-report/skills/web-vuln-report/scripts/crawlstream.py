@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+crawlstream.py - 巡回結果のストリーミング入出力（crawl.jsonl）
+
+crawl.json は結果全体をメモリに保持してから書き出すため、ページ数に比例してピークメモリが
+伸びる。crawl.jsonl は 1 行 1 レコードで逐次書き出し、読み手も必要なときに先頭から読み直す。
+
+レコード（各行の "type" で区別。type 以外のキーは crawl.json の各要素と同一）:
+  - scope  : 巡回開始時に 1 行、終了時に finished_at / pages_crawled を含む 1 行（後勝ちでマージ）
+  - page / form / param / cookie
+
+params / cookies の重複除去は (name, url) のキー集合だけを保持して書き出し時に行う
+（先着優先で crawl.json と同じ結果）。並行巡回時の行順は取得完了順（crawl.json は深さ・URL 順）。
+
+標準ライブラリのみで動作する（checks.py / assess.py からも import する）。
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import IO, Iterator
+
+SECTIONS = {"pages": "page", "forms": "form", "params": "param", "cookies": "cookie"}
+_SECTION_OF = {kind: key for key, kind in SECTIONS.items()}
+
+
+class JsonlWriter:
+    """crawl.jsonl への逐次書き出し。crawl() の sink として渡す。"""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._fp: IO[str] | None = None
+        self._param_keys: set[tuple[str, str]] = set()
+        self._cookie_keys: set[tuple[str, str]] = set()
+        self.counts = {"pages": 0, "forms": 0, "params": 0, "cookies": 0}
+
+    def start(self, resume_at: int | None = None) -> None:
+        """書き出しを始める。ファイルは最初の書き込みまで開かない（再開時に既存分を消さないため）。
+
+        resume_at（checkpoint() が返したバイト位置）を渡すと、そこまでを残して追記を再開する。"""
+        if resume_at is None:
+            self._fp = open(self.path, "w", encoding="utf-8")
+            return
+        # チェックポイント以降に書かれた行（再開後に取り直すページ）を切り捨てる
+        with open(self.path, "r+b") as raw:
+            raw.truncate(resume_at)
+        for rec in _iter_records(self.path):
+            kind = rec.get("type")
+            if kind == "param":
+                self._param_keys.add((rec["name"], rec["url"]))
+            elif kind == "cookie":
+                self._cookie_keys.add((rec["name"], rec["url"]))
+            if kind in _SECTION_OF:
+                self.counts[_SECTION_OF[kind]] += 1
+        self._fp = open(self.path, "a", encoding="utf-8")
+
+    def _write(self, kind: str, rec: dict) -> None:
+        if self._fp is None:
+            self.start()
+        self._fp.write(json.dumps({"type": kind, **rec}, ensure_ascii=False) + "\n")
+
+    def write_scope(self, scope: dict) -> None:
+        self._write("scope", scope)
+        self._fp.flush()
+
+    def add(self, page: dict, forms: list, params: list, cookies: list) -> None:
+        """1 ページ分のレコードを書き出す（params / cookies はここで重複除去）。"""
+        self._write("page", page)
+        self.counts["pages"] += 1
+        for fo in forms:
+            self._write("form", fo)
+            self.counts["forms"] += 1
+        for p in params:
+            k = (p["name"], p["url"])
+            if k not in self._param_keys:
+                self._param_keys.add(k)
+                self._write("param", p)
+                self.counts["params"] += 1
+        for c in cookies:
+            k = (c["name"], c["url"])
+            if k not in self._cookie_keys:
+                self._cookie_keys.add(k)
+                self._write("cookie", c)
+                self.counts["cookies"] += 1
+
+    def checkpoint(self) -> int:
+        """ここまでを書き出して現在のバイト位置を返す（再開時に resume_at へ渡す）。"""
+        if self._fp is None:
+            self.start()
+        self._fp.flush()
+        return self._fp.tell()
+
+    def close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class RecordView:
+    """1 種類のレコードを遅延列挙する再走査可能なビュー（list の代わりに checks へ渡す）。
+
+    反復のたびにファイルを先頭から読み直すため、保持するのは 1 行分だけ。"""
+
+    def __init__(self, path: Path, kind: str):
+        self._path = path
+        self._kind = kind
+
+    def __iter__(self) -> Iterator[dict]:
+        for rec in _iter_records(self._path):
+            if rec.get("type") == self._kind:
+                rec.pop("type", None)
+                yield rec
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __bool__(self) -> bool:
+        return next(iter(self), None) is not None
+
+
+class CrawlStream:
+    """crawl.jsonl を dict 互換（get / []）で読むリーダー。run_checks にそのまま渡せる。"""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._scope: dict | None = None
+
+    @property
+    def scope(self) -> dict:
+        if self._scope is None:
+            scope: dict = {}
+            for rec in _iter_records(self.path):
+                if rec.get("type") == "scope":
+                    rec.pop("type")
+                    scope.update(rec)
+            self._scope = scope
+        return self._scope
+
+    def get(self, key: str, default=None):
+        if key == "scope":
+            return self.scope
+        if key in SECTIONS:
+            return RecordView(self.path, SECTIONS[key])
+        return default
+
+    def __getitem__(self, key: str):
+        if key != "scope" and key not in SECTIONS:
+            raise KeyError(key)
+        return self.get(key)
+
+    def to_dict(self) -> dict:
+        """crawl.json と同じ構造の dict を組み立てる（全件をメモリに載せる。後方互換用）。"""
+        return {"scope": self.scope, **{k: list(self.get(k)) for k in SECTIONS}}
+
+
+def _iter_records(path: Path) -> Iterator[dict]:
+    with open(path, encoding="utf-8") as fp:
+        for line in fp:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def write_json(stream: CrawlStream, path: str | Path) -> None:
+    """crawl.jsonl から crawl.json を要素単位で書き出す（全件を保持しない後方互換出力）。"""
+    with open(path, "w", encoding="utf-8") as fp:
+        fp.write('{\n  "scope": ')
+        fp.write(json.dumps(stream.scope, ensure_ascii=False))
+        for key in SECTIONS:
+            fp.write(f',\n  "{key}": [')
+            first = True
+            for rec in stream.get(key):
+                fp.write("\n    " if first else ",\n    ")
+                fp.write(json.dumps(rec, ensure_ascii=False))
+                first = False
+            fp.write("]" if first else "\n  ]")
+        fp.write("\n}\n")
+
+
+def load_crawl(path: str | Path) -> dict | CrawlStream:
+    """拡張子で crawl.json（dict）/ crawl.jsonl（CrawlStream）を読み分ける。"""
+    path = Path(path)
+    if path.suffix == ".jsonl":
+        return CrawlStream(path)
+    with open(path, encoding="utf-8") as fp:
+        return json.load(fp)
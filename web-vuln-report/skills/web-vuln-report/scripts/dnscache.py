@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+dnscache.py - DNS 照会の実行内キャッシュと並行解決（check_dns / check_dnssec / テイクオーバーで共有）
+
+旧実装では各チェックが dns.resolver.resolve を 1 件ずつ同期で呼んでいた（lifetime 8 秒）。
+check_subdomain_takeover は最大 40 ホスト × CNAME 5 段を直列にたどり、check_dns と
+check_dnssec は同じ登録ドメインを別々に照会する。ここでは
+
+  - (名前, 型) ごとの結果を TTL に従ってメモリに保持する（TTL は応答の rrset から、
+    NXDOMAIN / NoAnswer は SOA の minimum から。取れなければ既定値）
+  - レコード不在（[]）も負のキャッシュとして保持し、同じ不在を照会し直さない
+  - 同時の同一照会は先行の照会の結果を共有する（ネットワーク障害の例外は保持しない）
+  - resolve_many で複数の照会を workers 本のスレッドで並行に解決する
+
+DnsResolver は (name, rdtype) -> list[str] の呼び出し可能で、チェックの query= にそのまま
+渡せる（テスト用のフェイク query を包んでも同じ形）。
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 8
+# TTL の既定値と上下限（秒）。既定値は TTL の分からない query（フェイク等）と負の応答に使う
+DEFAULT_TTL = 300
+_MIN_TTL = 1
+_MAX_TTL = 3600
+_LIFETIME = 8.0
+
+
+def _records(ans) -> list[str]:
+    out = []
+    for r in ans:
+        strings = getattr(r, "strings", None)
+        if strings is not None:  # TXT: 分割文字列を結合
+            out.append(b"".join(strings).decode("utf-8", "replace"))
+        else:
+            out.append(str(r))
+    return out
+
+
+def _negative_ttl(exc) -> int | None:
+    """NXDOMAIN / NoAnswer の応答の SOA から負の TTL（min(SOA の TTL, minimum)）を取る。"""
+    import dns.rdatatype
+    try:
+        responses = exc.responses().values() if hasattr(exc, "responses") else \
+            [exc.kwargs.get("response")]
+    except Exception:
+        return None
+    for resp in responses:
+        for rrset in getattr(resp, "authority", None) or []:
+            if rrset.rdtype == dns.rdatatype.SOA and len(rrset):
+                return min(rrset.ttl, rrset[0].minimum)
+    return None
+
+
+def dnspython_lookup(name: str, rdtype: str) -> tuple[list[str], int | None]:
+    """dnspython で照会し (レコード文字列のリスト, TTL) を返す。レコード不在は []、
+    ネットワーク等の障害は例外送出。"""
+    import dns.resolver
+    try:
+        ans = dns.resolver.resolve(name, rdtype, lifetime=_LIFETIME)
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer) as e:
+        return [], _negative_ttl(e)
+    return _records(ans), ans.rrset.ttl if ans.rrset is not None else None
+
+
+class _Pending:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: list[str] | None = None
+        self.error: BaseException | None = None
+
+
+class DnsResolver:
+    """TTL 付きの照会キャッシュ。lookup は (name, rdtype) -> (records, ttl|None)、query は
+    (name, rdtype) -> records（TTL は DEFAULT_TTL とみなす）。どちらも省略なら dnspython。"""
+
+    def __init__(self, query=None, lookup=None, workers: int = DEFAULT_WORKERS,
+                 default_ttl: int = DEFAULT_TTL, clock=time.monotonic):
+        if lookup is None:
+            lookup = (lambda n, t: (query(n, t), None)) if query is not None else dnspython_lookup
+        self._lookup = lookup
+        self.workers = max(1, workers)
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._entries: dict[tuple[str, str], tuple[float, list[str]]] = {}
+        self._pending: dict[tuple[str, str], _Pending] = {}
+        self._lock = threading.Lock()
+        self.counts = {"queries": 0, "hits": 0, "negative_hits": 0, "coalesced": 0, "errors": 0}
+
+    def __call__(self, name: str, rdtype: str) -> list[str]:
+        key = ((name or "").rstrip(".").lower(), rdtype.upper())
+        with self._lock:
+            got = self._entries.get(key)
+            if got is not None and got[0] > self._clock():
+                self.counts["negative_hits" if not got[1] else "hits"] += 1
+                return list(got[1])
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = _Pending()
+                self.counts["queries"] += 1
+            else:
+                self.counts["coalesced"] += 1
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return list(pending.value)
+        try:
+            records, ttl = self._lookup(key[0], key[1])
+            records = list(records or [])
+        except BaseException as e:   # 障害は保持せず、待っている同一照会にだけ伝える
+            pending.error = e
+            with self._lock:
+                self.counts["errors"] += 1
+                del self._pending[key]
+            pending.done.set()
+            raise
+        ttl = self.default_ttl if ttl is None else min(_MAX_TTL, max(_MIN_TTL, ttl))
+        pending.value = records
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, records)
+            del self._pending[key]
+        pending.done.set()
+        return list(records)
+
+    def resolve_many(self, pairs) -> dict[tuple[str, str], "list[str] | Exception"]:
+        """(name, rdtype) の列を並行に解決する。値はレコードのリストか、障害時の例外。"""
+        pairs = list(dict.fromkeys(pairs))
+
+        def _one(pair):
+            try:
+                return self(*pair)
+            except Exception as e:
+                return e
+
+        if len(pairs) <= 1 or self.workers == 1:
+            return {p: _one(p) for p in pairs}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(pairs)),
+                                thread_name_prefix="vwr-dns") as pool:
+            return dict(zip(pairs, pool.map(_one, pairs)))
+
+    def summary(self) -> dict:
+        """findings.json の assessment["dns"] に載せる記録。"""
+        with self._lock:
+            return {**self.counts, "entries": len(self._entries)}
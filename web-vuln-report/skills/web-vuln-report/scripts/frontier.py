@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+frontier.py - テンプレート認識型の巡回フロンティア（URL 正規化・投入時重複除去・優先度・上限）
+
+旧実装の BFS キューは `seen` に無いリンクを毎回積むため、全ページから張られた人気リンクが
+キューに何度も入り、`/item?id=1..100000` のようなカタログ URL が max_pages を同一テンプレートで
+使い切っていた。ここでは:
+
+  - canonicalize(): スキーム/ホスト小文字化・既定ポート除去・空パス→"/"・フラグメント除去・
+    クエリのキー順整列。末尾スラッシュは取得 URL では保持し（/files/ と /files は応答が異なりうる）、
+    重複判定キー（dedupe_key）でのみ同一視する
+  - 投入時に重複判定キーの集合で O(1) 除去（同じ URL はキューに 1 度しか入らない）
+  - template_of(): 数値/16 進/UUID のパス片を {id} に、クエリ値を落としたテンプレートに集約し、
+    テンプレートごとの取得上限（max_per_template）を課す
+  - 優先度: 同じ深さの中で、フォームや新しい script を持つページからのリンク、未知のパラメータ名・
+    未知のテンプレートを持つ URL を先に取り出す（深さ順の巡回自体は維持）
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import heapq
+import re
+from urllib.parse import parse_qsl, urlparse, urlunparse
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_ID_SEGMENT_RE = re.compile(
+    r"^(?:\d+|[0-9a-f]{8,}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$", re.I)
+
+# 優先度の加点（大きいほど先に取り出す）
+SCORE_NEW_PARAM = 2       # 未知のクエリパラメータ名を持つ URL（反射/リダイレクト検査の母集団が増える）
+SCORE_NEW_TEMPLATE = 1    # まだ見ていないテンプレート
+SCORE_PARENT_FORMS = 1    # フォームを持つページからのリンク
+SCORE_PARENT_SCRIPTS = 1  # 新しい script バンドルを持ち込んだページからのリンク
+
+
+def canonicalize(url: str) -> str:
+    """取得に使う正規 URL を返す（意味を変えない範囲の正規化のみ）。"""
+    p = urlparse(url)
+    scheme = p.scheme.lower()
+    host = (p.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 リテラル
+    port = p.port
+    # URL 内の資格情報（user:pass@）は落とす（出力 JSON やログに載せない）
+    netloc = host if port is None or _DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    path = p.path or "/"
+    # キー順に安定ソートするだけで値は再エンコードしない（同一キーの並びも保持）
+    query = "&".join(sorted((q for q in p.query.split("&") if q),
+                            key=lambda q: q.split("=", 1)[0]))
+    return urlunparse((scheme, netloc, path, p.params, query, ""))
+
+
+def dedupe_key(url: str) -> str:
+    """重複判定キー。正規 URL から末尾スラッシュ（ルート以外）を落とす。"""
+    c = canonicalize(url)
+    p = urlparse(c)
+    if p.path != "/" and p.path.endswith("/"):
+        c = urlunparse(p._replace(path=p.path.rstrip("/") or "/"))
+    return c
+
+
+def template_of(url: str) -> str:
+    """URL をパス/クエリのテンプレートに集約する（例: /item/42?id=7&x=1 → /item/{id}?id&x）。"""
+    p = urlparse(canonicalize(url))
+    segs = ["{id}" if _ID_SEGMENT_RE.match(s) else s for s in p.path.split("/")]
+    keys = sorted({k for k, _ in parse_qsl(p.query, keep_blank_values=True)})
+    return f"{p.netloc}{'/'.join(segs).rstrip('/') or '/'}" + (("?" + "&".join(keys)) if keys else "")
+
+
+def _param_names(url: str) -> set[str]:
+    return {k for k, _ in parse_qsl(urlparse(url).query, keep_blank_values=True)}
+
+
+class Frontier:
+    """優先度付きの巡回待ち行列。asyncio の単一スレッドから使う前提（ロックなし）。
+
+    取り出し順は (深さ, -優先度, 投入順)。max_per_template=0 はテンプレート上限なし。"""
+
+    def __init__(self, max_per_template: int = 0):
+        self.max_per_template = max(0, int(max_per_template or 0))
+        self._heap: list[tuple[int, int, int, str]] = []
+        self._known: set[str] = set()
+        self._seq = 0
+        self._template_counts: dict[str, int] = {}
+        self._templates_queued: set[str] = set()
+        self._params_seen: set[str] = set()
+        self._scripts_seen: set[str] = set()
+        self.stats = {"enqueued": 0, "duplicates": 0, "template_capped": 0}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, url: str) -> bool:
+        return dedupe_key(url) in self._known
+
+    def push(self, url: str, depth: int, score: int = 0) -> bool:
+        """未知の URL だけを投入する（投入済み・取得済みは O(1) で弾く）。投入したら True。"""
+        key = dedupe_key(url)
+        if key in self._known:
+            self.stats["duplicates"] += 1
+            return False
+        self._known.add(key)
+        names = _param_names(url)
+        if names - self._params_seen:
+            score += SCORE_NEW_PARAM
+            self._params_seen |= names
+        tpl = template_of(url)
+        if tpl not in self._templates_queued:
+            score += SCORE_NEW_TEMPLATE
+            self._templates_queued.add(tpl)
+        self._seq += 1
+        heapq.heappush(self._heap, (depth, -score, self._seq, canonicalize(url)))
+        self.stats["enqueued"] += 1
+        return True
+
+    def pop(self) -> tuple[str, int] | None:
+        """次に取得する (URL, 深さ) を返す。テンプレート上限に達した URL は捨てて次を見る。"""
+        while self._heap:
+            depth, _neg, _seq, url = heapq.heappop(self._heap)
+            tpl = template_of(url)
+            n = self._template_counts.get(tpl, 0)
+            if self.max_per_template and n >= self.max_per_template:
+                self.stats["template_capped"] += 1
+                continue
+            self._template_counts[tpl] = n + 1
+            return url, depth
+        return None
+
+    def link_bonus(self, forms: list, script_srcs: list[str]) -> int:
+        """取得したページから張られたリンクへの加点（フォーム有り・新しい script バンドル）。"""
+        bonus = SCORE_PARENT_FORMS if forms else 0
+        new_scripts = [s for s in script_srcs if s not in self._scripts_seen]
+        if new_scripts:
+            self._scripts_seen.update(new_scripts)
+            bonus += SCORE_PARENT_SCRIPTS
+        return bonus
+
+    def requeue(self, url: str, depth: int) -> None:
+        """取り出し済みで未完了だった URL を戻す（チェックポイントからの再開用）。"""
+        tpl = template_of(url)
+        if self._template_counts.get(tpl, 0) > 0:
+            self._template_counts[tpl] -= 1
+        self._seq += 1
+        heapq.heappush(self._heap, (depth, 0, self._seq, url))
+
+    def to_state(self) -> dict:
+        """JSON 化できる状態（チェックポイント用）。"""
+        return {
+            "max_per_template": self.max_per_template,
+            "heap": [list(e) for e in self._heap],
+            "known": sorted(self._known),
+            "seq": self._seq,
+            "template_counts": self._template_counts,
+            "templates_queued": sorted(self._templates_queued),
+            "params_seen": sorted(self._params_seen),
+            "scripts_seen": sorted(self._scripts_seen),
+            "stats": self.stats,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "Frontier":
+        fr = cls(state.get("max_per_template", 0))
+        fr._heap = [tuple(e) for e in state["heap"]]
+        heapq.heapify(fr._heap)
+        fr._known = set(state["known"])
+        fr._seq = state["seq"]
+        fr._template_counts = dict(state["template_counts"])
+        fr._templates_queued = set(state["templates_queued"])
+        fr._params_seen = set(state["params_seen"])
+        fr._scripts_seen = set(state["scripts_seen"])
+        fr.stats = dict(state["stats"])
+        return fr
+
+    def summary(self) -> dict:
+        return {**self.stats, "templates": len(self._template_counts),
+                "max_per_template": self.max_per_template}
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+groupstats.py - 台帳グループごとの実行コスト（時間・要求数・転送量・キャッシュ）の計測
+
+Ledger はグループごとに状態・所見数・備考を記録するが、コストは残していなかった。
+どのチェックが要求の大半を出し、どこで時間を使っているかを診断ごとに比べられるよう、
+run_checks はグループ（_safe / 並行ジョブ）の実行を measure() で包み、
+
+  - 経過時間（wall）と、そのグループを実行したスレッドの CPU 時間
+  - _SafeClient / _ActiveAuthClient が実際に送信した要求数・送受信バイト数
+  - 応答キャッシュで済んだ要求数、クライアント層の再送（Range 非対応時の送り直し等）、
+    429 / 503 の応答数
+
+を GroupStats に集める。計測中のグループは contextvars で引き継ぎ、並行ジョブでも各ワーカー
+スレッドの送信が自分のグループに計上される（DNS / TLS の内部スレッドの CPU 時間は含まない）。
+profile_dir を渡すと、グループごとの cProfile を <profile_dir>/<グループ ID>.prof に保存する。
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import contextvars
+import cProfile
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+_CURRENT: contextvars.ContextVar["GroupStats | None"] = contextvars.ContextVar(
+    "vwr_group_stats", default=None)
+_COUNTERS = ("requests", "bytes_sent", "bytes_received", "cache_hits", "retries", "throttled")
+
+
+class GroupStats:
+    """グループ 1 つ分の計測値（送信系の加算はスレッド安全）。"""
+
+    def __init__(self, group_id: str):
+        self.group_id = group_id
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(_COUNTERS, 0)
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for k, v in counts.items():
+                self._counts[k] += v
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {"wall_s": round(self.wall_s, 4), "cpu_s": round(self.cpu_s, 4),
+                    **self._counts}
+
+
+def current() -> GroupStats | None:
+    return _CURRENT.get()
+
+
+def note_request(sent: int, received: int, status: int | None = None) -> None:
+    """計測中のグループに実送信 1 件を計上する（計測外なら何もしない）。"""
+    st = _CURRENT.get()
+    if st is not None:
+        st.add(requests=1, bytes_sent=sent, bytes_received=received,
+               throttled=int(status in (429, 503)))
+
+
+def note(**counts: int) -> None:
+    """計測中のグループに cache_hits / retries 等を加算する。"""
+    st = _CURRENT.get()
+    if st is not None:
+        st.add(**counts)
+
+
+def _profile_name(group_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", group_id) + ".prof"
+
+
+@contextmanager
+def measure(group_id: str, profile_dir: str | Path | None = None):
+    """with の間をグループ group_id として計測する（GroupStats を返す）。"""
+    st = GroupStats(group_id)
+    token = _CURRENT.set(st)
+    prof = cProfile.Profile() if profile_dir else None
+    wall0, cpu0 = time.perf_counter(), time.thread_time()
+    if prof is not None:
+        prof.enable()
+    try:
+        yield st
+    finally:
+        if prof is not None:
+            prof.disable()
+        st.wall_s = time.perf_counter() - wall0
+        st.cpu_s = time.thread_time() - cpu0
+        _CURRENT.reset(token)
+        if prof is not None:
+            try:
+                Path(profile_dir).mkdir(parents=True, exist_ok=True)
+                prof.dump_stats(str(Path(profile_dir) / _profile_name(group_id)))
+            except OSError:
+                pass
+
+
+def totals(stats: dict[str, dict]) -> dict:
+    """グループ別の as_dict() の合計（findings.json の assessment["perf"]["total"]）。"""
+    out = {"wall_s": 0.0, "cpu_s": 0.0, **dict.fromkeys(_COUNTERS, 0)}
+    for row in stats.values():
+        for k in out:
+            out[k] += row.get(k, 0)
+    out["wall_s"] = round(out["wall_s"], 4)
+    out["cpu_s"] = round(out["cpu_s"], 4)
+    return out
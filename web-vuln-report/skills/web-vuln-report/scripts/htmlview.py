@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+htmlview.py - 1 ページ 1 回パースの HTML ビュー（crawl の抽出器が共有する）
+
+crawl は 1 ページにつき title / リンク / フォーム / script / meta / data-page だけを使う。
+旧実装は指紋用と抽出用で BeautifulSoup を 2 回構築していたため、ここで 1 回だけ解析して
+抽出器が共有する軽量ビュー（HtmlView）に落とす。バックエンドは差し替え可能:
+
+  - "html.parser": BeautifulSoup + 標準 html.parser（既定・従来挙動と同一）
+  - "lxml":        BeautifulSoup + lxml（任意依存。未導入なら html.parser へフォールバック）
+  - "stream":      標準 HTMLParser のタグイベントのみ（木を作らない・最速）。
+                   a / form / input / textarea / select / script / meta / title と data-page 属性だけを拾う
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:  # pragma: no cover - stream バックエンドは bs4 不要
+    BeautifulSoup = None
+
+BACKENDS = ("html.parser", "lxml", "stream")
+DEFAULT_BACKEND = "html.parser"
+
+# BeautifulSoup の html.parser ツリービルダと同じ空要素（閉じタグを持たない）集合
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link",
+              "menuitem", "meta", "param", "source", "track", "wbr", "basefont", "bgsound",
+              "command", "frame", "image", "isindex", "nextid", "spacer"}
+_FIELD_TAGS = ("input", "textarea", "select")
+
+
+@dataclass
+class HtmlView:
+    """抽出器が必要とする要素だけを保持する解析結果。属性値は生値（URL 解決は抽出器側）。"""
+    title: str = ""
+    links: list[str] = field(default_factory=list)          # <a href> の生値
+    forms: list[dict] = field(default_factory=list)         # {action, method, inputs[{name,type}]}
+    scripts: list[dict] = field(default_factory=list)       # {src(None=属性なし), id, text}
+    metas: list[dict] = field(default_factory=list)         # <meta> の属性 dict
+    data_page: str | None = None                            # 最初の data-page 属性（Inertia）
+    next_data: bool = False                                 # <script id="__NEXT_DATA__"> の有無
+
+    def meta(self, name: str) -> dict | None:
+        return next((m for m in self.metas if m.get("name") == name), None)
+
+
+def _lxml_available() -> bool:
+    try:
+        import lxml  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+
+def available_backends() -> list[str]:
+    out = ["stream"]
+    if BeautifulSoup is not None:
+        out.insert(0, "html.parser")
+        if _lxml_available():
+            out.insert(1, "lxml")
+    return out
+
+
+def resolve_backend(name: str | None) -> str:
+    """要求バックエンドが使えなければ html.parser（bs4 も無ければ stream）に落とす。"""
+    name = name or DEFAULT_BACKEND
+    avail = available_backends()
+    if name in avail:
+        return name
+    return "html.parser" if "html.parser" in avail else "stream"
+
+
+def _attr(v) -> str:
+    """bs4 の複数値属性（list）や値なし属性（None）を文字列に正規化する。"""
+    if v is None:
+        return ""
+    if isinstance(v, list):
+        return " ".join(v)
+    return v
+
+
+def _view_from_soup(soup) -> HtmlView:
+    view = HtmlView()
+    view.title = soup.title.string.strip() if soup.title and soup.title.string else ""
+    view.links = [_attr(a["href"]) for a in soup.find_all("a", href=True)]
+    for form in soup.find_all("form"):
+        inputs = []
+        for tag in form.find_all(_FIELD_TAGS):
+            name = tag.get("name")
+            if not name:
+                continue
+            inputs.append({"name": _attr(name), "type": _attr(tag.get("type", tag.name))})
+        view.forms.append({"action": _attr(form.get("action", "")),
+                           "method": _attr(form.get("method")) or None, "inputs": inputs})
+    for s in soup.find_all("script"):
+        src = s.get("src")
+        view.scripts.append({"src": None if src is None else _attr(src),
+                             "id": _attr(s.get("id")) or None,
+                             "text": "" if src else (s.get_text() or "")})
+        if s.get("id") == "__NEXT_DATA__":
+            view.next_data = True
+    view.metas = [{k: _attr(v) for k, v in m.attrs.items()} for m in soup.find_all("meta")]
+    app = soup.find(attrs={"data-page": True})
+    if app is not None and app.get("data-page"):
+        view.data_page = _attr(app.get("data-page"))
+    return view
+
+
+class _StreamParser(HTMLParser):
+    """タグイベントだけで HtmlView を組み立てる（DOM を作らない）。
+
+    フォームの入れ子範囲だけは BeautifulSoup と同じく「対応する閉じタグまで開いている要素を
+    閉じる」規則で追跡し、フォーム外の input を拾わないようにする。"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.view = HtmlView()
+        self._stack: list[str] = []
+        self._open_forms: list[dict] = []
+        self._form_depth: list[int] = []
+        self._in_title = False
+        self._title_parts: list[str] = []
+        self._script: dict | None = None
+
+    def handle_starttag(self, tag, attrs):
+        a = {k: ("" if v is None else v) for k, v in attrs}
+        if self.view.data_page is None and a.get("data-page"):
+            self.view.data_page = a["data-page"]
+        if tag == "a" and "href" in a:
+            self.view.links.append(a["href"])
+        elif tag == "form":
+            form = {"action": a.get("action", ""), "method": a.get("method") or None, "inputs": []}
+            self.view.forms.append(form)
+            self._open_forms.append(form)
+            self._form_depth.append(len(self._stack))
+        elif tag in _FIELD_TAGS:
+            if a.get("name"):
+                for form in self._open_forms:
+                    form["inputs"].append({"name": a["name"], "type": a.get("type", tag)})
+        elif tag == "script":
+            src = a.get("src") if "src" in a else None
+            self._script = {"src": src, "id": a.get("id") or None, "text": ""}
+            self.view.scripts.append(self._script)
+            if a.get("id") == "__NEXT_DATA__":
+                self.view.next_data = True
+        elif tag == "meta":
+            self.view.metas.append(a)
+        elif tag == "title" and not self.view.title and not self._in_title:
+            self._in_title = True
+        if tag not in _VOID_TAGS:
+            self._stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS and self._stack and self._stack[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in self._stack:
+            return  # 対応する開きタグが無い閉じタグは無視（bs4 と同じ）
+        while self._stack:
+            top = self._stack.pop()
+            self._close(top)
+            if top == tag:
+                break
+        while self._form_depth and self._form_depth[-1] >= len(self._stack):
+            self._form_depth.pop()
+            self._open_forms.pop()
+
+    def _close(self, tag: str) -> None:
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self.view.title = "".join(self._title_parts).strip()
+        elif tag == "script":
+            self._script = None
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+        elif self._script is not None and not self._script["src"]:
+            self._script["text"] += data
+
+    def close(self):
+        super().close()
+        if self._in_title:
+            self._close("title")
+
+
+def parse_html(html: str | None, backend: str = DEFAULT_BACKEND) -> HtmlView:
+    """HTML を 1 回だけ解析して HtmlView を返す。空入力は空ビュー。"""
+    if not html:
+        return HtmlView()
+    backend = resolve_backend(backend)
+    if backend == "stream":
+        p = _StreamParser()
+        try:
+            p.feed(html)
+            p.close()
+        except Exception:
+            pass  # 壊れた HTML でもそこまでに拾えた要素は使う
+        return p.view
+    return _view_from_soup(BeautifulSoup(html, backend))
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+inventory.py - 巡回結果から作るクライアント側コンポーネント台帳（SBOM）
+
+旧実装では check_outdated_libraries / check_js_known_cve / check_framework_fingerprint /
+check_eol_runtime がそれぞれ全ページの technologies と script_srcs を走査し、重なる正規表現
+（_LIB_VER_RE / _JS_CVE_LIB_RE / EOL の banner 表）を独自に当てていた。大規模サイトでは全ページに
+同じ script_srcs が載るため、同じ文字列に同じ正規表現を何度も当てることになる。ここでは
+
+  - 全ページを 1 回だけ走査し、JS ライブラリ（名前・版数・出所 URL・出現ページ）、banner の
+    ランタイム（PHP / Apache httpd / OpenSSL / nginx）、DOM 由来のクライアント FW の目印、
+    ヘッダ由来の technologies を重複なしの台帳にまとめる
+  - 正規表現は出所の文字列ごとに 1 回だけ当てる（同じ script src が何ページに載っても 1 回）
+  - ライブラリ関連の 4 チェックは台帳を読むだけにする
+  - 台帳を CycloneDX 1.5 形式の JSON（sbom.json）として書き出す（診断間の差分比較用）
+
+判定（危殆版下限・署名DB・EOL 表・FW ラベル）は checks 側に残し、ここは抽出と集約だけを行う。
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import re
+import uuid
+from dataclasses import dataclass, field
+
+# 長い名前を先に置く（jquery-ui は jquery の前・angularjs/angular.js は angular の前）。
+_LIB_RE = re.compile(
+    r"(jquery-ui|jquery\.ui|jqueryui|jquery|bootstrap|vue|react|angularjs|angular\.js|angular|"
+    r"lodash|moment|axios|handlebars|dompurify)"
+    r"[.\-/]?v?(\d+)\.(\d+)(?:\.(\d+))?", re.I)
+# banner のランタイム（製品名, 抽出正規表現）。版数は 2〜3 要素
+_RUNTIME_RES = [
+    ("PHP", re.compile(r"PHP/(\d+)\.(\d+)(?:\.(\d+))?", re.I)),
+    ("Apache httpd", re.compile(r"Apache/(\d+)\.(\d+)(?:\.(\d+))?", re.I)),
+    ("OpenSSL", re.compile(r"OpenSSL/(\d+)\.(\d+)\.(\d+)", re.I)),
+    ("nginx", re.compile(r"nginx/(\d+)\.(\d+)(?:\.(\d+))?", re.I)),
+]
+# CycloneDX の purl（npm のパッケージ名。AngularJS 1.x の npm 名は angular）
+_NPM_NAMES = {"angularjs": "angular", "angular": "%40angular/core"}
+
+
+def canonical_library(raw: str, ver: tuple) -> str:
+    """抽出した lib 名を台帳の名前へ正規化する（jquery-ui の表記揺れ・AngularJS 1.x と Angular 2+）。"""
+    n = raw.lower()
+    if n in ("jquery-ui", "jquery.ui", "jqueryui"):
+        return "jquery-ui"
+    if n in ("angular", "angular.js", "angularjs"):
+        return "angularjs" if ver[0] == 1 else "angular"
+    return n
+
+
+@dataclass
+class Component:
+    """台帳の 1 件。kind は library / runtime / framework、version は数値タプル（不明は ()）。
+    sources（出所の文字列）と pages（出現ページ）は出現順の集合（dict のキー）。"""
+    kind: str
+    name: str
+    version: tuple = ()
+    sources: dict[str, None] = field(default_factory=dict)
+    pages: dict[str, None] = field(default_factory=dict)
+
+    @property
+    def version_str(self) -> str:
+        return ".".join(str(n) for n in self.version)
+
+    @property
+    def purl(self) -> str:
+        if self.kind == "library":
+            name = _NPM_NAMES.get(self.name, self.name)
+            return f"pkg:npm/{name}@{self.version_str}" if self.version else f"pkg:npm/{name}"
+        name = self.name.lower().replace(" ", "-")
+        return f"pkg:generic/{name}@{self.version_str}" if self.version else f"pkg:generic/{name}"
+
+    def _note(self, source: str | None, page: str | None) -> None:
+        if source:
+            self.sources.setdefault(source)
+        if page:
+            self.pages.setdefault(page)
+
+
+class ComponentInventory:
+    """巡回 1 回分の台帳。build_inventory() で作り、各チェックは読むだけにする。"""
+
+    def __init__(self):
+        self._components: dict[tuple, Component] = {}
+        # ページ URL -> そのページで見つけた JS ライブラリのキー（出現順・重複なし）
+        self.page_libraries: list[tuple[str, list[tuple]]] = []
+        # 以下は出現順の集合（dict のキー）
+        self.technologies: dict[str, None] = {}  # ヘッダ由来の technologies
+        self.client_fw: dict[str, None] = {}     # DOM 由来のクライアント FW の目印
+        self.banners: dict[str, None] = {}       # ページごとの server + Server:/X-Powered-By:
+        self.first_page = ""
+        self.pages_seen = 0
+        # 出所の文字列 -> 抽出したキー（同じ文字列に正規表現を 2 回当てない）
+        self._libs_in: dict[str, list[tuple]] = {}
+        self._runtimes_in: dict[str, list[tuple]] = {}
+
+    def __len__(self) -> int:
+        return len(self._components)
+
+    def add(self, kind: str, name: str, version: tuple = (), source: str | None = None,
+            page: str | None = None) -> Component:
+        key = (kind, name, version)
+        comp = self._components.get(key)
+        if comp is None:
+            comp = self._components[key] = Component(kind, name, version)
+        comp._note(source, page)
+        return comp
+
+    def get(self, key: tuple) -> Component:
+        return self._components[key]
+
+    def components(self, kind: str | None = None) -> list[Component]:
+        return [c for c in self._components.values() if kind is None or c.kind == kind]
+
+    def libraries_in(self, text: str) -> list[tuple]:
+        """text（script src や js: technology）から抽出した JS ライブラリのキー（1 文字列 1 回）。"""
+        keys = self._libs_in.get(text)
+        if keys is None:
+            keys = []
+            for m in _LIB_RE.finditer(text):
+                ver = (int(m.group(2)), int(m.group(3)), int(m.group(4) or 0))
+                keys.append(("library", canonical_library(m.group(1), ver), ver))
+            self._libs_in[text] = keys
+        return keys
+
+    def add_page(self, page: dict) -> None:
+        url = page.get("url", "")
+        if not self.pages_seen:
+            self.first_page = url
+        self.pages_seen += 1
+        techs = page.get("technologies", [])
+        hay = [t for t in techs if t.lower().startswith("js:")]
+        hay.extend(page.get("script_srcs", []))
+        found: dict[tuple, None] = {}
+        for s in hay:
+            for key in self.libraries_in(s):
+                self.add(*key, source=s, page=url)
+                found.setdefault(key)
+        if found:
+            self.page_libraries.append((url, list(found)))
+        for t in techs:
+            self.technologies.setdefault(t)
+        for m in page.get("client_fw", []):
+            self.client_fw.setdefault(m)
+            self.add("framework", m, page=url)
+        banner = page.get("server", "") or ""
+        for t in techs:
+            if t.lower().startswith(("server:", "x-powered-by:")):
+                banner += " " + t.split(":", 1)[1]
+        banner = banner.strip()
+        if banner:
+            self.banners.setdefault(banner)
+            for key in self.runtimes_in(banner):
+                self.add(*key, source=banner, page=url)
+
+    def runtimes_in(self, banner: str) -> list[tuple]:
+        """banner から抽出したランタイムのキー（1 文字列 1 回）。"""
+        keys = self._runtimes_in.get(banner)
+        if keys is None:
+            keys = []
+            for product, rx in _RUNTIME_RES:
+                for m in rx.finditer(banner):
+                    keys.append(("runtime", product,
+                                 tuple(int(x) for x in m.groups() if x is not None)))
+            self._runtimes_in[banner] = keys
+        return keys
+
+    def to_cyclonedx(self, target: str = "", timestamp: str = "", tool_version: str = "") -> dict:
+        """CycloneDX 1.5 形式（JSON）の SBOM。出所は evidence.occurrences、出現ページは properties。"""
+        comps = []
+        for c in self._components.values():
+            entry = {"type": c.kind if c.kind in ("library", "framework") else "application",
+                     "bom-ref": c.purl, "name": c.name}
+            if c.version:
+                entry["version"] = c.version_str
+            entry["purl"] = c.purl
+            if c.sources:
+                entry["evidence"] = {"occurrences": [{"location": s} for s in c.sources]}
+            entry["properties"] = ([{"name": "web-vuln-report:kind", "value": c.kind}]
+                                   + [{"name": "web-vuln-report:page", "value": p} for p in c.pages])
+            comps.append(entry)
+        tool = {"type": "application", "name": "web-vuln-report"}
+        if tool_version:
+            tool["version"] = tool_version
+        metadata: dict = {"tools": {"components": [tool]}}
+        if timestamp:
+            metadata["timestamp"] = timestamp
+        if target:
+            metadata["component"] = {"type": "application", "bom-ref": target, "name": target}
+        return {"bomFormat": "CycloneDX", "specVersion": "1.5",
+                "serialNumber": f"urn:uuid:{uuid.uuid4()}", "version": 1,
+                "metadata": metadata, "components": comps}
+
+
+def build_inventory(pages) -> ComponentInventory:
+    """巡回結果の pages（list でも crawl.jsonl の遅延ビューでも）を 1 回だけ走査して台帳を作る。"""
+    inv = ComponentInventory()
+    for page in pages:
+        inv.add_page(page)
+    return inv
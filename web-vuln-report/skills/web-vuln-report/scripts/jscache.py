@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+jscache.py - 取得した JS バンドルの内容ハッシュ単位の解析結果キャッシュ（診断をまたいで永続）
+
+同じベンダーバンドルはキャッシュバスタ付きの別 URL（app.js?v=123 / app.js?v=124）で何度も
+現れる。checks は JS 本文を sha256 で識別し、解析（秘密走査・sourceMappingURL 参照・ライブラリ
+版数の目印）を内容ごとに 1 回だけ行って、その結果をここへ保存する。
+
+  - 実行内: 同じ内容の 2 件目以降は解析しない（取得件数の上限も消費しない）
+  - 実行間: path を渡すと JSON ファイルに保存し、次の診断では解析済みの内容は取得 1 回・解析なし
+
+キャッシュは解析規則の識別子（rules）ごとに無効化する（秘密パターン等を変えたら使い回さない）。
+保存は checkpoint.write_atomic（一時ファイル→rename）で行い、件数は max_entries で LRU に縛る。
+値には秘密の生値を含めない（検出ラベル・参照先・ライブラリ名と版数のみ）。
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+import checkpoint as checkpoint_mod
+
+DEFAULT_MAX_ENTRIES = 4096
+
+
+def default_path() -> Path:
+    """既定の保存先（$XDG_CACHE_HOME か ~/.cache の下）。"""
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "web-vuln-report" / "js-analysis.json"
+
+
+class BundleCache:
+    """sha256（16 進）-> 解析結果（dict）の LRU。path が None なら実行内だけのキャッシュ。"""
+
+    def __init__(self, path: str | Path | None = None, rules: str = "",
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = Path(path) if path else None
+        self.rules = rules
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._dirty = False
+        self.loaded = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        data = checkpoint_mod.read(self.path)
+        if data and data.get("rules") == rules and isinstance(data.get("entries"), dict):
+            for digest, record in data["entries"].items():
+                if isinstance(record, dict):
+                    self._entries[digest] = record
+            self.loaded = len(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, digest: str) -> dict | None:
+        record = self._entries.get(digest)
+        if record is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return record
+
+    def put(self, digest: str, record: dict) -> None:
+        self._entries[digest] = record
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.stores += 1
+        self._dirty = True
+
+    def save(self) -> None:
+        """変更があれば path へアトミックに書く（書けなくても診断は続ける）。"""
+        if self.path is None or not self._dirty:
+            return
+        try:
+            checkpoint_mod.write_atomic(self.path, {"rules": self.rules,
+                                                    "entries": dict(self._entries)})
+            self._dirty = False
+        except OSError:
+            pass
+
+    def summary(self) -> dict:
+        """findings.json の assessment["js_bundles"]["cache"] に載せる記録。"""
+        return {"path": str(self.path) if self.path else None, "entries": len(self._entries),
+                "loaded": self.loaded, "hits": self.hits, "misses": self.misses,
+                "stores": self.stores}
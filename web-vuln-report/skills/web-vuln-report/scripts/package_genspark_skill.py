@@ -28,7 +28,7 @@ SKILL_DIR_DEFAULT = Path(__file__).resolve().parent.parent  # skills/web-vuln-re
 # examples はリポジトリ閲覧用の重いサンプル（PDF 等）なので可搬バンドルからは除外し、
 # 実行に必要な scripts/templates/references + SKILL.md に絞る。
 EXCLUDE_DIRS = {"__pycache__", "tests", ".pytest_cache", ".omc", "examples"}
-EXCLUDE_SUFFIXES = {".pyc", ".pyo"}
+EXCLUDE_SUFFIXES = {".pyc", ".pyo", ".sigidx"}   # .sigidx は署名DBの索引キャッシュ（実行時に再生成）
 # OS/エディタのゴミファイル（バンドルに混入させない）
 EXCLUDE_NAMES = {".DS_Store", "Thumbs.db", ".gitignore"}
 # Claude Code 用の絶対起点 → バンドル内相対へ
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+pageview.py - checks の受動ページルールが共有する 1 応答ビュー（ヘッダ正規化・タグ分解は 1 回）
+
+旧実装の run_checks はページごとに `_headers_lower(r)` を 3 回作り、SRI・冗長エラーがそれぞれ
+本文を独自に走査し、混在コンテンツはページを取得し直していた。ここでは 1 応答につき
+  - ヘッダの小文字化（dict 化）を 1 回
+  - 本文の文字列化を 1 回（必要になった時点で）
+  - ルールが必要とするタグ（script / link 等）の切り出しを 1 回（全ルールの要求タグの和で 1 パス）
+だけ行い、checks の受動ルール表（PAGE_RULES）の全ルールへ同じビューを渡す。
+
+タグの切り出しは各ルールの従来の正規表現（`<(?:script|link)\\b[^>]*>` 等）と同じ規則で行うため、
+単体の check_* 関数とルール表で所見は一致する。
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+
+
+@lru_cache(maxsize=32)
+def _tag_re(names: tuple[str, ...]) -> re.Pattern:
+    alt = "|".join(re.escape(n) for n in names)
+    return re.compile(rf"<({alt})\b[^>]*>", re.I)
+
+
+def find_tags(html: str | None, names: tuple[str, ...]) -> list[tuple[str, str]]:
+    """html から names の開始タグを出現順に (タグ名(小文字), 生のタグ文字列) で返す。"""
+    if not html or not names:
+        return []
+    return [(m.group(1).lower(), m.group(0)) for m in _tag_re(names).finditer(html)]
+
+
+class PageView:
+    """1 ページ応答の共有ビュー。headers は小文字キーの dict（_headers_lower と同じ形）。
+
+    tag_names はこのビューで切り出すタグ名の集合（ルール表の要求の和）。tags() の初回呼び出しで
+    1 回だけ本文を走査し、以降は同じ結果をルール間で共有する。"""
+
+    __slots__ = ("url", "page", "headers", "status", "tag_names", "_resp", "_html", "_tags")
+
+    def __init__(self, page: dict, headers: dict[str, str], html: str | None = None,
+                 status: int | None = None, tag_names: tuple[str, ...] = (), resp=None):
+        self.url = page["url"]
+        self.page = page
+        self.headers = headers
+        self.status = status
+        self.tag_names = tuple(sorted({n.lower() for n in tag_names}))
+        self._resp = resp
+        self._html = html
+        self._tags: list[tuple[str, str]] | None = None
+
+    @classmethod
+    def from_response(cls, page: dict, resp, tag_names: tuple[str, ...] = ()) -> "PageView":
+        headers = {k.lower(): v for k, v in resp.headers.items()}
+        return cls(page, headers, status=resp.status_code, tag_names=tag_names, resp=resp)
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("content-type", "")
+
+    @property
+    def is_html(self) -> bool:
+        """応答の Content-Type が text/html か（従来の受動ループの判定と同じ）。"""
+        return "text/html" in self.content_type
+
+    @property
+    def html(self) -> str:
+        """応答本文の文字列（初回のみ復号）。"""
+        if self._html is None:
+            self._html = self._resp.text if self._resp is not None else ""
+        return self._html
+
+    def tags(self, *names: str) -> list[str]:
+        """names の開始タグ（生の文字列）を出現順に返す。names は tag_names に含まれること。"""
+        if self._tags is None:
+            self._tags = find_tags(self.html, self.tag_names)
+        want = {n.lower() for n in names}
+        return [raw for name, raw in self._tags if name in want]
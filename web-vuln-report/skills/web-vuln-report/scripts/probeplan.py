@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+probeplan.py - 巡回で見たディレクトリの木（trie）から存在確認プローブの計画を立てる
+
+旧実装では check_exposed_files と check_auth_routes はサイトのルート直下だけを固定の一覧で
+確かめ、check_directory_listing は全ページの親ディレクトリを checked 集合だけで 1 件ずつ
+取りに行っていた。/app1/ のようなサブアプリの下に置かれた .env や管理画面は見ず、
+ページ数が増えると一覧表示の確認が上限なく増える。ここでは
+
+  - ページ URL・外部 JS（script src）・フォームの送信先から、見たディレクトリをすべて
+    （途中の祖先も含めて）オリジンごとの trie にまとめる
+  - 対象オリジンのアプリ接頭辞（ルートと、ページ/フォームのある深さ prefix_depth までの
+    ディレクトリ）ごとに、機微ファイルと認証必須ルートのプローブを置く
+  - soft-404 の指紋（soft404.Soft404Model）は接頭辞ごとに 1 つだけ作り、その下の全プローブで
+    共有する（見本の取得数 soft404.SAMPLES を要求数に数える）
+  - 一覧表示の確認は trie の全ディレクトリに 1 回ずつ
+  - 合計の要求数を budget で縛る（ルートの組は常に含め、残りは浅い順・出現の多い順に詰める）
+
+判定（署名・soft-404 の比較・一覧表示の目印）は checks 側に残し、ここは (ディレクトリ, プローブ)
+の組を重複なく並べるだけを行う。
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+from soft404 import SAMPLES as SOFT404_SAMPLES
+
+# 既定の要求数上限（ルート直下の組は上限を超えても常に実施する）
+DEFAULT_PROBE_BUDGET = 400
+# アプリ接頭辞とみなすディレクトリの深さ（/app1/ = 1, /app1/admin/ = 2）
+APP_PREFIX_DEPTH = 2
+
+
+class _Node:
+    __slots__ = ("children", "pages", "assets")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.pages = 0    # このディレクトリ直下で見たページ・フォーム送信先の数
+        self.assets = 0   # このディレクトリ直下で見た外部 JS の数
+
+
+def _origin(url: str) -> tuple[str, str] | None:
+    p = urlparse(url)
+    if p.scheme not in ("http", "https") or not p.netloc:
+        return None
+    return f"{p.scheme}://{p.netloc.lower()}", (p.hostname or "").lower()
+
+
+class DirectoryTrie:
+    """オリジン -> ディレクトリの木。hosts を渡すとその host の URL だけを受け付ける。"""
+
+    def __init__(self, hosts: set[str] | None = None):
+        self._roots: dict[str, _Node] = {}
+        self._hosts = {h.lower() for h in hosts} if hosts else None
+
+    def add(self, url: str, asset: bool = False) -> None:
+        """url の親ディレクトリ（と祖先）を木に足す。"""
+        got = _origin(url)
+        if got is None or (self._hosts is not None and got[1] not in self._hosts):
+            return
+        node = self._roots.setdefault(got[0], _Node())
+        for seg in urlparse(url).path.split("/")[1:-1]:
+            if seg:
+                node = node.children.setdefault(seg, _Node())
+        if asset:
+            node.assets += 1
+        else:
+            node.pages += 1
+
+    def origins(self) -> list[str]:
+        return list(self._roots)
+
+    def directories(self, origin: str | None = None) -> list[tuple[str, str, int, int, int]]:
+        """(オリジン, ディレクトリのパス, 深さ, 配下のページ数, 配下の出現数) の列（木の前順）。"""
+        out: list[tuple[str, str, int, int, int]] = []
+        for org, root in self._roots.items():
+            if origin is not None and org != origin:
+                continue
+            self._walk(org, "/", 0, root, out)
+        return out
+
+    def _walk(self, origin: str, path: str, depth: int, node: _Node,
+              out: list) -> tuple[int, int]:
+        at = len(out)
+        out.append(None)
+        pages, seen = node.pages, node.pages + node.assets
+        for seg in sorted(node.children):
+            p, s = self._walk(origin, f"{path}{seg}/", depth + 1, node.children[seg], out)
+            pages += p
+            seen += s
+        out[at] = (origin, path, depth, pages, seen)
+        return pages, seen
+
+
+def build_trie(pages, forms=(), hosts: set[str] | None = None) -> DirectoryTrie:
+    """巡回結果（pages の url と script_srcs・forms の action）からディレクトリの木を作る。"""
+    trie = DirectoryTrie(hosts)
+    for page in pages:
+        trie.add(page.get("url", ""))
+        for src in page.get("script_srcs", []):
+            trie.add(src, asset=True)
+    for form in forms or ():
+        trie.add(form.get("action", ""))
+    return trie
+
+
+@dataclass
+class ProbePlan:
+    """(ディレクトリ URL, パス) の組。パスは checks の一覧のキー（先頭 / 付き）のまま持ち、
+    URL は probe_url() で作る。prefixes は soft-404 の指紋を作る接頭辞（先頭がルート）。"""
+    exposed: list[tuple[str, str]] = field(default_factory=list)
+    auth: list[tuple[str, str]] = field(default_factory=list)
+    listing: list[str] = field(default_factory=list)
+    prefixes: list[str] = field(default_factory=list)
+    budget: int | None = None
+    dropped: int = 0
+
+    @staticmethod
+    def probe_url(directory: str, path: str) -> str:
+        return directory.rstrip("/") + path
+
+    @property
+    def requests(self) -> int:
+        return (len(self.exposed) + len(self.auth) + len(self.listing)
+                + len(self.prefixes) * SOFT404_SAMPLES)
+
+    def summary(self) -> dict:
+        """findings.json の assessment["probe_plan"] に載せる記録。"""
+        return {"prefixes": len(self.prefixes), "listing_dirs": len(self.listing),
+                "requests": self.requests, "budget": self.budget, "dropped": self.dropped}
+
+
+def plan_probes(trie: DirectoryTrie, target: str, sensitive_paths, auth_paths,
+                budget: int | None = DEFAULT_PROBE_BUDGET,
+                prefix_depth: int = APP_PREFIX_DEPTH) -> ProbePlan:
+    """trie から (ディレクトリ, プローブ) の組を重複なく並べる。
+
+    target のオリジンのルートには機微ファイル・認証必須ルート・soft-404 の指紋を常に置く
+    （target が空なら置かない）。それ以外の単位（接頭辞の組・一覧表示の確認）は浅い順・
+    出現の多い順に、budget（None で無制限）に収まるものだけを採る。"""
+    sensitive = list(dict.fromkeys(sensitive_paths))
+    auth = list(dict.fromkeys(auth_paths))
+    plan = ProbePlan(budget=budget)
+    got = _origin(target) if target else None
+    units: list[tuple] = []
+    if got is not None:
+        root = got[0] + "/"
+        _add_prefix(plan, root, sensitive, auth)
+        for origin, path, depth, pages, seen in trie.directories(got[0]):
+            if 0 < depth <= prefix_depth and pages:
+                units.append((depth, -seen, origin + path, 1, "prefix"))
+    for origin, path, depth, _pages, seen in trie.directories():
+        units.append((depth, -seen, origin + path, 0, "listing"))
+    bundle = SOFT404_SAMPLES + len(sensitive) + len(auth)
+    left = None if budget is None else budget - plan.requests
+    for _depth, _seen, directory, _order, kind in sorted(units):
+        cost = bundle if kind == "prefix" else 1
+        if left is not None and cost > left:
+            plan.dropped += 1
+            continue
+        if kind == "prefix":
+            _add_prefix(plan, directory, sensitive, auth)
+        else:
+            plan.listing.append(directory)
+        if left is not None:
+            left -= cost
+    return plan
+
+
+def _add_prefix(plan: ProbePlan, directory: str, sensitive: list[str], auth: list[str]) -> None:
+    plan.prefixes.append(directory)
+    plan.exposed.extend((directory, p) for p in sensitive)
+    plan.auth.extend((directory, p) for p in auth)
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+ratelimit.py - ホスト単位のトークンバケット（crawl / checks 共用のレート制御）
+
+`--rate`（req/s）を「リクエスト間の固定 sleep」ではなく**発射時刻の予約**として強制する。
+容量 1（バースト無し）のバケットなので、並行ワーカーが何本あっても同一ホストへの送出は
+厳密に rate 以下に収まる。予約（reserve）は同期・非同期どちらの呼び出し側からも使えるよう
+スレッドセーフな純計算とし、待機は呼び出し側（time.sleep / asyncio.sleep）が行う。
+
+AdaptiveRateLimiter は --rate を上限（天井）とする AIMD 制御を加える。429 / 503 / タイムアウトで
+ホストのレートを乗算的に下げ、Retry-After の間はそのホストへの送出を止め、応答遅延が健全な間は
+加算的に天井まで戻す。crawl と checks の _SafeClient が同じインスタンスを共有する。
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# AIMD の既定値
+DECREASE_FACTOR = 0.5      # 429/503/タイムアウト 1 回あたりのレート乗数
+INCREASE_FRACTION = 0.1    # 健全な応答 1 件あたりの加算幅（天井に対する比率）
+FLOOR_FRACTION = 0.05      # 下限（天井に対する比率。ただし 0.1 req/s は下回らない）
+MAX_RETRY_AFTER = 60.0     # Retry-After による一時停止の上限（秒）。巨大値で診断が止まらないように
+SLOW_LATENCY_FACTOR = 2.0  # 平滑化した応答時間のこの倍を超えたら「遅い」（加算しない）
+MIN_SLOW_LATENCY = 0.25    # 速い対象でのゆらぎを遅延と誤認しない下限（秒）
+MAX_EVENTS = 200           # scope に残すレート変更ログの上限（超過分は件数のみ）
+_THROTTLE_STATUSES = {429, 503}
+
+
+class TokenBucket:
+    """単一ホストのトークンバケット。rate<=0 は無制限（テスト・ローカル用）。"""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = float(rate or 0.0)
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float) -> None:
+        """レートを変更する（それまでの経過分は旧レートで補充してから切り替える）。"""
+        with self._lock:
+            now = time.monotonic()
+            if self.rate > 0:
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self.rate = float(rate)
+
+    def pause(self, seconds: float) -> None:
+        """seconds 秒間は送出させない（Retry-After）。"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def reserve(self) -> float:
+        """トークンを 1 つ予約し、送出までに待つべき秒数を返す（0 なら即時）。
+
+        トークンが足りない場合も負債として先取りするため、待機中の他の呼び出し側とは
+        到着順に 1/rate 間隔で整列する（待機中にロックを保持しない）。"""
+        with self._lock:
+            now = time.monotonic()
+            paused = max(0.0, self._paused_until - now)
+            if self.rate <= 0:
+                return paused
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return paused
+            return max(paused, -self._tokens / self.rate)
+
+    def acquire(self) -> None:
+        """同期呼び出し用: 予約して必要なら sleep する。"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """asyncio 呼び出し用: 予約して必要なら await で待つ（イベントループは塞がない）。"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class HostRateLimiter:
+    """ホスト名ごとに TokenBucket を払い出す。同一ホストは同一バケットを共有する。"""
+
+    def __init__(self, rate: float):
+        self.rate = float(rate or 0.0)
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url_or_host: str) -> TokenBucket:
+        host = (urlparse(url_or_host).hostname if "://" in url_or_host else url_or_host) or ""
+        host = host.lower()
+        with self._lock:
+            b = self._buckets.get(host)
+            if b is None:
+                b = self._buckets[host] = TokenBucket(self.rate)
+            return b
+
+    def acquire(self, url: str) -> None:
+        self.bucket(url).acquire()
+
+    async def acquire_async(self, url: str) -> None:
+        await self.bucket(url).acquire_async()
+
+
+def _retry_after_seconds(value: str | None) -> float | None:
+    """Retry-After（秒数 or HTTP 日付）を秒に直す。解釈できなければ None。"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    """ホスト単位の AIMD レート制御。ceiling（--rate）を超えることはない。
+
+    送出前に acquire()/acquire_async()、応答後に observe() を呼ぶ。ceiling<=0（無制限）の
+    ときはレートを持たないため AIMD は行わず、Retry-After による一時停止だけを守る。
+    limit_host() でホスト単位の天井を下げられる（robots.txt の Crawl-delay）。"""
+
+    def __init__(self, ceiling: float, decrease: float = DECREASE_FACTOR,
+                 increase: float | None = None, floor: float | None = None):
+        super().__init__(ceiling)
+        self.ceiling = self.rate
+        self.decrease = decrease
+        self.increase = increase if increase is not None else self.ceiling * INCREASE_FRACTION
+        self.floor = floor if floor is not None else min(
+            self.ceiling, max(self.ceiling * FLOOR_FRACTION, 0.1))
+        self._latency: dict[str, float] = {}    # host -> 平滑化した応答時間
+        self._last_cut: dict[str, float] = {}   # host -> 直近の引き下げ時刻
+        self._host_ceiling: dict[str, float] = {}   # host -> ceiling より低い天井（Crawl-delay）
+        self._t0 = time.monotonic()
+        self.events: list[dict] = []
+        self.events_dropped = 0
+        self.counts = {"cuts": 0, "increases": 0, "retry_after_pauses": 0}
+        self.min_rate = self.ceiling
+
+    def _log(self, host: str, rate: float, reason: str) -> None:
+        if len(self.events) < MAX_EVENTS:
+            self.events.append({"t": round(time.monotonic() - self._t0, 3), "host": host,
+                                "rate": round(rate, 3), "reason": reason})
+        else:
+            self.events_dropped += 1
+
+    def rate_of(self, url_or_host: str) -> float:
+        return self.bucket(url_or_host).rate
+
+    def limit_host(self, url_or_host: str, max_rate: float, reason: str = "crawl-delay") -> None:
+        """ホストの天井を max_rate 以下にする（無制限の ceiling に対しても効く）。"""
+        if max_rate <= 0:
+            return
+        bucket = self.bucket(url_or_host)
+        host = (urlparse(url_or_host).hostname if "://" in url_or_host else url_or_host) or ""
+        host = host.lower()
+        with self._lock:
+            cur = self._ceiling_of(host)
+            new = max_rate if cur <= 0 else min(cur, max_rate)
+            self._host_ceiling[host] = new
+            if bucket.rate <= 0 or bucket.rate > new:
+                bucket.set_rate(new)
+                self._log(host, new, reason)
+
+    def _ceiling_of(self, host: str) -> float:
+        return self._host_ceiling.get(host, self.ceiling)
+
+    def observe(self, url: str, status: int | None = None, headers=None,
+                latency: float | None = None, timed_out: bool = False) -> None:
+        """応答（またはタイムアウト）を 1 件反映する。headers は httpx.Headers / dict。"""
+        bucket = self.bucket(url)
+        host = (urlparse(url).hostname or "").lower()
+        throttled = timed_out or status in _THROTTLE_STATUSES
+        with self._lock:
+            if throttled and status in _THROTTLE_STATUSES:
+                wait = _retry_after_seconds(_header(headers, "retry-after"))
+                if wait:
+                    wait = min(wait, MAX_RETRY_AFTER)
+                    bucket.pause(wait)
+                    self.counts["retry_after_pauses"] += 1
+                    self._log(host, bucket.rate, f"retry-after {wait:g}s")
+            ceiling = self._ceiling_of(host)
+            if ceiling <= 0:
+                return
+            floor = min(self.floor, ceiling) if self.floor > 0 else min(
+                ceiling, max(ceiling * FLOOR_FRACTION, 0.1))
+            increase = self.increase if self.increase > 0 else ceiling * INCREASE_FRACTION
+            now = time.monotonic()
+            if throttled:
+                # 同時に飛んでいた要求の 429 で何段も下げないよう、1 送出間隔に 1 回だけ下げる
+                if now - self._last_cut.get(host, -1e9) < 1.0 / bucket.rate:
+                    return
+                new = max(floor, bucket.rate * self.decrease)
+                self._last_cut[host] = now
+                reason = "timeout" if timed_out else str(status)
+                if new < bucket.rate:
+                    bucket.set_rate(new)
+                    self.counts["cuts"] += 1
+                    self.min_rate = min(self.min_rate, new)
+                    self._log(host, new, reason)
+                return
+            if latency is None or status is None:
+                return
+            base = self._latency.get(host)
+            self._latency[host] = latency if base is None else 0.8 * base + 0.2 * latency
+            slow = base is not None and latency > max(SLOW_LATENCY_FACTOR * base, MIN_SLOW_LATENCY)
+            if slow or bucket.rate >= ceiling:
+                return
+            new = min(ceiling, bucket.rate + increase)
+            bucket.set_rate(new)
+            self.counts["increases"] += 1
+            self._log(host, new, "healthy")
+
+    def summary(self) -> dict:
+        """scope / findings.json に載せるレート制御の記録。"""
+        with self._lock:
+            hosts = {h: round(b.rate, 3) for h, b in self._buckets.items()}
+        return {"ceiling": self.ceiling, "floor": self.floor, "min_rate": round(self.min_rate, 3),
+                "final": hosts, "host_ceilings": dict(self._host_ceiling), **self.counts, "events": list(self.events),
+                "events_dropped": self.events_dropped}
+
+
+def _header(headers, name: str) -> str | None:
+    if headers is None:
+        return None
+    value = headers.get(name)
+    if value is None and isinstance(headers, dict):
+        value = {k.lower(): v for k, v in headers.items()}.get(name)
+    return value
@@ -197,21 +197,26 @@ def merge_findings(findings: list[dict]) -> list[dict]:
     （1課題 + 該当資産の列挙）に合わせる。確度は最も高いものを採用。
     """
     grouped: dict[tuple, dict] = {}
+    seen: dict[tuple, tuple[set, set]] = {}   # key -> (affected, 証跡) の既出集合（線形探索を避ける）
     order: list[tuple] = []
     for f in findings:
         key = (f.get("check_id"), f.get("title"))
         if key not in grouped:
             g = dict(f)
-            g["affected"] = list(f.get("affected", []))
+            g["affected"] = []
             g["_evidence"] = []
             grouped[key] = g
+            seen[key] = (set(), set())
             order.append(key)
         g = grouped[key]
+        seen_aff, seen_ev = seen[key]
         for a in f.get("affected", []):
-            if a not in g["affected"]:
+            if a not in seen_aff:
+                seen_aff.add(a)
                 g["affected"].append(a)
         ev = f.get("evidence", "")
-        if ev and ev not in g["_evidence"]:
+        if ev and ev not in seen_ev:
+            seen_ev.add(ev)
             g["_evidence"].append(ev)
         if _CONF_RANK.get(f.get("confidence"), 0) > _CONF_RANK.get(g.get("confidence"), 0):
             g["confidence"] = f.get("confidence")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+secretscan.py - 複数パターンの秘密走査エンジン（リテラル前段フィルタ＋チャンク逐次走査）
+
+旧実装の check_js_secrets は秘密パターン（AWS / Stripe / GitHub / Slack / PEM / GCP）と
+keyword 付随の汎用パターンを、JS 本文 1 件ごとに 1 本ずつ全文へ finditer していた（汎用パターンは
+大文字小文字無視の選択で特に遅い）。また本文は取得時に 2MB で切り詰められ、巨大な webpack
+バンドル末尾の秘密は見えなかった。ここでは
+
+  - 各ルールの固定接頭辞（AKIA / sk_live_ / ghp_ / xox / -----BEGIN / "private_key"、汎用は
+    keyword の先頭 secret / token / api / passw / access）を str.find で探して候補位置だけを得る
+    （大文字小文字無視のルールは本文を 1 回 lower() した写しで探す）
+  - 重い正規表現（と汎用パターンのエントロピー判定）は候補位置への anchored match だけで行い、
+    ルールごとに最初の採用一致で打ち切る（全ルール検出済みなら残りは読まない）
+  - 本文はチャンク単位で feed() し、末尾 max_match 文字だけを次のチャンクと重ねて保持する
+    （バンドルの大きさに関わらずメモリは チャンク＋max_match 程度で一定）
+
+判定は旧実装（ルールごとの finditer）と同じ: 各ルールの一致は非重複に左から数え、除外値
+（example 鍵・公開鍵接頭辞・低エントロピー）でない一致が 1 つでもあればそのルールを検出とする。
+max_match 文字を超える一致はチャンク境界で切れうる（秘密トークンとしては非現実的な長さ）。
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import heapq
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+DEFAULT_MAX_MATCH = 4096       # 1 つの一致として扱う最大文字数（チャンク間の重ね幅）
+
+
+@dataclass(frozen=True)
+class SecretRule:
+    """秘密パターン 1 件。regex の一致は必ず literals のいずれかで始まること（前段フィルタの前提）。
+
+    ignore_case=True は literals を小文字で与え、本文の小文字化した写しで探す。
+    accept が偽を返す一致（example 鍵・低エントロピー等）は検出としない。"""
+    label: str
+    literals: tuple[str, ...]
+    regex: re.Pattern
+    accept: Callable[[re.Match], bool] = lambda m: True
+    ignore_case: bool = False
+
+
+class SecretScanner:
+    """ルール表の走査器（状態は ScanSession 側に持つため、1 インスタンスをスレッド間で共有できる）。"""
+
+    def __init__(self, rules: Iterable[SecretRule], max_match: int = DEFAULT_MAX_MATCH):
+        self.rules = tuple(rules)
+        self.max_match = max_match
+        # lower() で長さが変わる本文（一部の非 ASCII 文字）向けのフォールバック
+        self._fallback = [re.compile("|".join(re.escape(x) for x in r.literals), re.I)
+                          if r.ignore_case else None for r in self.rules]
+
+    def session(self) -> "ScanSession":
+        return ScanSession(self)
+
+    def scan(self, text: str) -> list[str]:
+        """text 全体を走査し、検出したルールのラベルをルール表の順で返す。"""
+        s = self.session()
+        s.feed(text or "")
+        return s.close()
+
+    def scan_chunks(self, chunks: Iterable[str]) -> list[str]:
+        s = self.session()
+        for chunk in chunks:
+            s.feed(chunk)
+            if s.complete:
+                break
+        return s.close()
+
+
+class ScanSession:
+    """1 本文分の逐次走査状態。feed() を繰り返し、close() で検出ラベルを得る。"""
+
+    def __init__(self, scanner: SecretScanner):
+        self.sc = scanner
+        self._buf = ""
+        self._offset = 0        # _buf[0] の本文内位置
+        self._pos = 0           # 次に候補を探す _buf 内位置
+        n = len(scanner.rules)
+        self._last_end = [0] * n    # ルールごとの直前の一致の終端（本文内位置・非重複判定用）
+        self._hit = [False] * n
+        self.chars_scanned = 0
+        self.candidates = 0
+
+    @property
+    def complete(self) -> bool:
+        """全ルールを検出済み（以降を走査しても結果は変わらない）か。"""
+        return all(self._hit)
+
+    def feed(self, chunk: str) -> None:
+        if not chunk:
+            return
+        self.chars_scanned += len(chunk)
+        self._buf += chunk
+        limit = len(self._buf) - self.sc.max_match
+        if limit <= self._pos:
+            return
+        self._scan(limit)
+        # 末尾 max_match 文字（未走査の候補位置以降）だけを残す
+        self._buf = self._buf[limit:]
+        self._offset += limit
+        self._pos = 0
+
+    def close(self) -> list[str]:
+        self._scan(len(self._buf))
+        self._buf = ""
+        return [r.label for r, hit in zip(self.sc.rules, self._hit) if hit]
+
+    def _scan(self, limit: int) -> None:
+        """_buf の候補位置 [_pos, limit) を処理する（一致自体は limit を越えて読んでよい）。"""
+        buf, base = self._buf, self._offset
+        lowered: str | None = None
+        for i, rule in enumerate(self.sc.rules):
+            if self._hit[i]:
+                continue
+            if rule.ignore_case:
+                if lowered is None:
+                    lowered = buf.lower()
+                if len(lowered) == len(buf):
+                    positions = _find_all(lowered, rule.literals, self._pos, limit)
+                else:
+                    positions = (m.start() for m in _overlapping(self.sc._fallback[i], buf,
+                                                                 self._pos, limit))
+            else:
+                positions = _find_all(buf, rule.literals, self._pos, limit)
+            for p in positions:
+                self.candidates += 1
+                if base + p < self._last_end[i]:
+                    continue
+                mm = rule.regex.match(buf, p)
+                if mm is None:
+                    continue
+                self._last_end[i] = base + mm.end()
+                if rule.accept(mm):
+                    self._hit[i] = True
+                    break
+        self._pos = limit
+
+
+def _find_all(text: str, literals: tuple[str, ...], start: int, limit: int) -> Iterator[int]:
+    """literals のいずれかが始まる位置（start 以上 limit 未満）を昇順に返す（重なりも含む）。"""
+    def one(lit: str) -> Iterator[int]:
+        end = limit + len(lit) - 1
+        p = text.find(lit, start, end)
+        while p != -1:
+            yield p
+            p = text.find(lit, p + 1, end)
+    if len(literals) == 1:
+        return one(literals[0])
+    return heapq.merge(*(one(lit) for lit in literals))
+
+
+def _overlapping(rx: re.Pattern, text: str, start: int, limit: int) -> Iterator[re.Match]:
+    m = rx.search(text, start)
+    while m is not None and m.start() < limit:
+        yield m
+        m = rx.search(text, m.start() + 1)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+sigindex.py - JS 脆弱性署名DB（retire.js 形式）のコンパイル済み区間索引
+
+旧実装の check_js_known_cve は、抽出した lib+版数ごとにその lib の全署名を線形に走査し、
+毎回 `below` の文字列を解析し直していた。curated サブセットなら問題ないが、retire.js 規模
+（lib ごとに数十〜数百の範囲）の DB では照合が支配的になる。ここでは DB を 1 回コンパイルして
+
+  - 署名の範囲 [atOrAbove, below) を解析済みの版数タプルで持ち
+  - lib ごとに全境界（atOrAbove / below）を昇順に並べ、隣り合う境界の間（素区間）ごとに
+    該当する署名の番号を前計算する
+  - 照合は bisect で素区間を引くだけ（O(log 境界数)）
+
+コンパイル結果は JSON の隣（既定 `<名前>.sigidx`）に marshal 形式で保存し、JSON の
+mtime・サイズが一致すればそのまま使う。mtime だけが変わった場合は sha256 を比べて再利用し、
+内容が変わっていれば作り直す（保存できなくても照合は続ける）。
+
+入力は curated 形式（signatures: lib -> [{below, atOrAbove?, cve[], severity, note}]）のほか、
+retire.js 本来の形式（lib -> {vulnerabilities: [{below, atOrAbove?, identifiers: {CVE, summary},
+severity}]}）も受け付ける。below の無い署名は照合対象にしない（旧実装と同じ）。CVE の無い署名も
+旧実装と同じく照合し、CVE 番号の無い所見（重大度と説明のみ）として出す。atOrAbove は旧実装では
+見ていなかったが、ここでは範囲の下限として扱う（下限未満の版数は該当しない）。
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import marshal
+import os
+import re
+from bisect import bisect_right
+from pathlib import Path
+
+FORMAT = 2   # 2: CVE の無い署名も素区間に含める
+CACHE_SUFFIX = ".sigidx"
+
+
+def parse_version(s: str) -> tuple:
+    """'1.12.4' / '3.0.0-rc1' 等を比較用の 3 要素タプルにする（数字以外は捨てる）。"""
+    parts = ((s or "").split(".") + ["0", "0", "0"])[:3]
+    return tuple(int(re.sub(r"\D", "", p) or 0) for p in parts)
+
+
+def _normalize_entries(entries) -> list[dict]:
+    """lib 1 件分の署名を curated 形式の dict 列へそろえる。"""
+    if isinstance(entries, dict):   # retire.js 形式
+        out = []
+        for v in entries.get("vulnerabilities", []):
+            ids = v.get("identifiers", {}) or {}
+            sig = {"below": v.get("below"), "cve": list(ids.get("CVE", [])),
+                   "severity": v.get("severity", "medium"), "note": ids.get("summary", "")}
+            if v.get("atOrAbove"):
+                sig["atOrAbove"] = v["atOrAbove"]
+            out.append(sig)
+        return out
+    return [e for e in entries or [] if isinstance(e, dict)]
+
+
+class SignatureIndex:
+    """lib -> 素区間の境界（版数タプルの昇順）と、素区間ごとの該当署名番号。"""
+
+    def __init__(self, snapshot_date: str, signatures: dict[str, list[dict]],
+                 bounds: dict[str, list[tuple]], segments: dict[str, list[tuple[int, ...]]]):
+        self.snapshot_date = snapshot_date
+        self.signatures = signatures
+        self._bounds = bounds
+        self._segments = segments
+
+    @property
+    def db(self) -> dict:
+        """旧来の DB dict と同じ形（snapshot_date / signatures）。"""
+        return {"snapshot_date": self.snapshot_date, "signatures": self.signatures}
+
+    @classmethod
+    def compile(cls, db: dict) -> "SignatureIndex":
+        raw = db.get("signatures")
+        if raw is None:   # retire.js の配布ファイルは lib 名が最上位
+            raw = {k: v for k, v in db.items() if isinstance(v, dict) and "vulnerabilities" in v}
+        signatures: dict[str, list[dict]] = {}
+        bounds: dict[str, list[tuple]] = {}
+        segments: dict[str, list[tuple[int, ...]]] = {}
+        for lib, entries in raw.items():
+            sigs = _normalize_entries(entries)
+            ranges = [(parse_version(s["atOrAbove"]) if s.get("atOrAbove") else None,
+                       parse_version(s["below"]) if s.get("below") else None) for s in sigs]
+            points = sorted({p for r in ranges for p in r if p is not None})
+            # 先頭の () はどの版数タプルよりも小さい（最初の境界より前の素区間）
+            lib_bounds = [()] + points
+            lib_segments = []
+            for start in lib_bounds:
+                lib_segments.append(tuple(
+                    j for j, (lo, hi) in enumerate(ranges)
+                    if hi is not None and start < hi and (lo is None or lo <= start)))
+            signatures[lib] = sigs
+            bounds[lib] = lib_bounds
+            segments[lib] = lib_segments
+        return cls(db.get("snapshot_date", ""), signatures, bounds, segments)
+
+    def __contains__(self, lib: str) -> bool:
+        return lib in self._bounds
+
+    def match(self, lib: str, ver: tuple) -> list[dict]:
+        """lib の版数 ver に該当する署名を DB の記載順で返す。"""
+        lib_bounds = self._bounds.get(lib)
+        if not lib_bounds:
+            return []
+        sigs = self.signatures[lib]
+        return [sigs[j] for j in self._segments[lib][bisect_right(lib_bounds, ver) - 1]]
+
+    def _state(self) -> dict:
+        return {"snapshot_date": self.snapshot_date, "signatures": self.signatures,
+                "bounds": self._bounds, "segments": self._segments}
+
+    @classmethod
+    def _from_state(cls, state: dict) -> "SignatureIndex":
+        return cls(state["snapshot_date"], state["signatures"], state["bounds"], state["segments"])
+
+
+def load(path: str | Path, cache_path: str | Path | None = None) -> SignatureIndex:
+    """署名DB（JSON）を索引として読む。cache_path（既定は JSON の隣の .sigidx）が有効なら
+    JSON を解析せずに使い、無効なら JSON からコンパイルして保存し直す。"""
+    path = Path(path)
+    cache_path = Path(cache_path) if cache_path else path.with_suffix(CACHE_SUFFIX)
+    st = path.stat()
+    cached = _read_cache(cache_path)
+    if cached and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+        return SignatureIndex._from_state(cached["index"])
+    raw = path.read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    if cached and cached["sha256"] == digest:
+        index = SignatureIndex._from_state(cached["index"])
+    else:
+        index = SignatureIndex.compile(json.loads(raw.decode("utf-8")))
+    _write_cache(cache_path, {"format": FORMAT, "mtime_ns": st.st_mtime_ns, "size": st.st_size,
+                              "sha256": digest, "index": index._state()})
+    return index
+
+
+def _read_cache(cache_path: Path) -> dict | None:
+    try:
+        data = marshal.loads(cache_path.read_bytes())
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
+    if not isinstance(data, dict) or data.get("format") != FORMAT:
+        return None
+    if not {"mtime_ns", "size", "sha256", "index"} <= set(data):
+        return None
+    return data
+
+
+def _write_cache(cache_path: Path, data: dict) -> None:
+    tmp = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_bytes(marshal.dumps(data))
+        tmp.replace(cache_path)
+    except (OSError, ValueError):
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+siteindex.py - robots.txt / sitemap の共有サービス（ホスト単位キャッシュ・Crawl-delay・逐次解析）
+
+旧実装は crawl の _load_robots()（起点ホストのみ・都度 httpx.Client）、差分巡回の sitemap 読み込み、
+checks の _collect_robots_sitemap_paths()（auth-routes 用・sitemap は本文全体への正規表現）が
+それぞれ robots.txt / sitemap.xml を取得していた。ここでは 1 回の診断で 1 つの SiteIndex を共有し、
+オリジン（scheme://host:port）ごとに robots.txt と sitemap を 1 回だけ取得する。
+
+  - robots(): Disallow / Sitemap 行 / Crawl-delay を解析して保持（RobotFileParser 互換の判定付き）
+  - sitemap(): robots の Sitemap 行（無ければ /sitemap.xml）から <loc> → <lastmod> を収集する。
+    sitemapindex は 1 段だけ辿る。本文は XMLPullParser（iterparse の逐次版）へチャンク単位で流し、
+    gzip（.xml.gz）は先頭のマジックで判別して逐次展開する（巨大な索引でも全体を保持しない）
+  - 取得は GET のみ。limiter（AdaptiveRateLimiter）を渡すと巡回・チェックと同じレート制御に従う
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import threading
+import time
+import urllib.robotparser
+import xml.etree.ElementTree as ET
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from urllib.parse import urldefrag, urljoin, urlparse
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - 取得には httpx が必要
+    httpx = None
+
+MAX_SITEMAP_URLS = 5000            # 1 オリジンから収集する <loc> の上限
+MAX_SITEMAP_FILES = 5              # 取得する sitemap ファイル数の上限（索引 1 + 子）
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024  # 1 ファイルの展開後サイズ上限（sitemaps.org の上限と同じ）
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def origin_of(url: str) -> str:
+    """URL のオリジン（scheme://netloc）。ホスト名だけが渡された場合は https とみなす。"""
+    if "://" not in url:
+        url = "https://" + url
+    p = urlparse(url)
+    return f"{p.scheme.lower()}://{p.netloc.lower()}"
+
+
+def parse_lastmod(value: str | None) -> datetime | None:
+    """sitemap の W3C Datetime（日付のみ / 時刻付き）を UTC の datetime にする。"""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+@dataclass
+class HostRobots:
+    """1 オリジンの robots.txt 解析結果。取得できない・HTML が返る場合は全許可。"""
+    origin: str
+    status: int | None = None
+    parser: urllib.robotparser.RobotFileParser = field(
+        default_factory=urllib.robotparser.RobotFileParser)
+    disallow: list[str] = field(default_factory=list)   # 全 UA 分の Disallow パス（出現順）
+    sitemaps: list[str] = field(default_factory=list)   # Sitemap: 行
+    crawl_delay: float | None = None                    # 自 UA（無ければ *）の Crawl-delay
+
+
+class SiteIndex:
+    """robots.txt / sitemap のオリジン単位キャッシュ。crawl と checks が同じインスタンスを使う。
+
+    スレッドセーフ（同一オリジンへの同時要求は 1 回の取得にまとめる）。"""
+
+    def __init__(self, user_agent: str, timeout: float = 10.0, limiter=None,
+                 max_urls: int = MAX_SITEMAP_URLS, max_files: int = MAX_SITEMAP_FILES):
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.limiter = limiter
+        self.max_urls = max_urls
+        self.max_files = max_files
+        self._robots: dict[str, HostRobots] = {}
+        self._sitemaps: dict[str, dict[str, datetime | None]] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._client: httpx.Client | None = None
+        self.stats = {"robots_fetches": 0, "sitemap_fetches": 0, "sitemap_bytes": 0}
+
+    # ---- 取得 ----
+
+    def _http(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(timeout=self.timeout, follow_redirects=False,
+                                            headers={"User-Agent": self.user_agent})
+            return self._client
+
+    def _origin_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _acquire(self, url: str) -> float:
+        if self.limiter is not None:
+            self.limiter.acquire(url)
+        return time.monotonic()
+
+    def _observe(self, url: str, resp, t0: float) -> None:
+        if self.limiter is not None:
+            self.limiter.observe(url, resp.status_code, resp.headers, time.monotonic() - t0)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    def __enter__(self) -> "SiteIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---- robots.txt ----
+
+    def robots(self, url: str) -> HostRobots:
+        """url のオリジンの robots.txt（初回のみ取得）。"""
+        origin = origin_of(url)
+        cached = self._robots.get(origin)
+        if cached is not None:
+            return cached
+        with self._origin_lock("robots " + origin):
+            if origin not in self._robots:
+                self._robots[origin] = self._fetch_robots(origin)
+        return self._robots[origin]
+
+    def _fetch_robots(self, origin: str) -> HostRobots:
+        info = HostRobots(origin)
+        lines: list[str] = []
+        robots_url = origin + "/robots.txt"
+        try:
+            t0 = self._acquire(robots_url)
+            r = self._http().get(robots_url)
+            self._observe(robots_url, r, t0)
+            self.stats["robots_fetches"] += 1
+            info.status = r.status_code
+            # robots が無い・HTML（ソフト 404）が返る場合は全許可
+            if r.status_code == 200 and "html" not in r.headers.get("content-type", "").lower():
+                lines = r.text.splitlines()
+        except Exception:
+            pass
+        info.parser.set_url(robots_url)
+        info.parser.parse(lines)
+        for line in lines:
+            key, _, value = line.partition(":")
+            key, value = key.strip().lower(), value.split("#", 1)[0].strip()
+            if key == "disallow" and value:
+                info.disallow.append(value)
+            elif key == "sitemap" and value:
+                info.sitemaps.append(urljoin(origin + "/", value))
+        delay = info.parser.crawl_delay(self.user_agent)
+        try:
+            info.crawl_delay = float(delay) if delay is not None else None
+        except (TypeError, ValueError):
+            info.crawl_delay = None
+        return info
+
+    def has_robots(self, url: str) -> bool:
+        """url のオリジンの robots.txt を取得済みか（未取得なら robots() は通信する）。"""
+        return origin_of(url) in self._robots
+
+    def can_fetch(self, url: str) -> bool:
+        return self.robots(url).parser.can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url: str) -> float | None:
+        return self.robots(url).crawl_delay
+
+    # ---- sitemap ----
+
+    def sitemap(self, url: str) -> dict[str, datetime | None]:
+        """url のオリジンの sitemap の <loc> → <lastmod>（初回のみ取得・失敗時は空）。
+
+        同一オリジンの <loc> だけを返す（スコープ判定は呼び出し側）。"""
+        origin = origin_of(url)
+        cached = self._sitemaps.get(origin)
+        if cached is not None:
+            return cached
+        with self._origin_lock("sitemap " + origin):
+            if origin not in self._sitemaps:
+                self._sitemaps[origin] = self._collect_sitemap(origin)
+        return self._sitemaps[origin]
+
+    def _collect_sitemap(self, origin: str) -> dict[str, datetime | None]:
+        out: dict[str, datetime | None] = {}
+        roots = list(self.robots(origin).sitemaps) or [origin + "/sitemap.xml"]
+        pending = [(u, False) for u in roots]   # (URL, 索引から辿った子か)
+        fetched = 0
+        seen: set[str] = set()
+        while pending and fetched < self.max_files and len(out) < self.max_urls:
+            sm_url, is_child = pending.pop(0)
+            if sm_url in seen or origin_of(sm_url) != origin:
+                continue
+            seen.add(sm_url)
+            fetched += 1
+            try:
+                for kind, loc, lastmod in self._stream_sitemap(sm_url):
+                    if origin_of(loc) != origin:
+                        continue
+                    if kind == "sitemap":
+                        if not is_child:   # 索引は 1 段だけ辿る
+                            pending.append((loc, True))
+                    elif kind == "url":
+                        out[urldefrag(loc)[0]] = parse_lastmod(lastmod)
+                        if len(out) >= self.max_urls:
+                            break
+            except Exception:
+                continue   # 壊れた・取得できない sitemap は飛ばす（それまでの <loc> は残す）
+        return out
+
+    def _stream_sitemap(self, sm_url: str):
+        """1 つの sitemap を取得しながら (要素種別, loc, lastmod) を逐次返す。"""
+        t0 = self._acquire(sm_url)
+        with self._http().stream("GET", sm_url) as r:
+            self._observe(sm_url, r, t0)
+            self.stats["sitemap_fetches"] += 1
+            if r.status_code != 200:
+                return
+            parser = ET.XMLPullParser(events=("start", "end"))
+            root: list[ET.Element] = []
+            inflate = None
+            size = 0
+            for chunk in r.iter_bytes():
+                if inflate is None:
+                    # .xml.gz は Content-Encoding 無しの gzip 本文で届く（先頭のマジックで判別）
+                    inflate = (zlib.decompressobj(16 + zlib.MAX_WBITS)
+                               if chunk.startswith(_GZIP_MAGIC) else False)
+                data = inflate.decompress(chunk) if inflate else chunk
+                size += len(data)
+                self.stats["sitemap_bytes"] += len(data)
+                if size > MAX_SITEMAP_BYTES:
+                    break
+                parser.feed(data)
+                yield from _drain(parser, root)
+            if inflate:
+                parser.feed(inflate.flush())
+            parser.close()
+            yield from _drain(parser, root)
+
+    def summary(self) -> dict:
+        """scope に載せる取得統計と Crawl-delay。"""
+        delays = {o: r.crawl_delay for o, r in self._robots.items() if r.crawl_delay is not None}
+        return {**self.stats, "origins": len(self._robots), "crawl_delay": delays,
+                "sitemap_urls": sum(len(v) for v in self._sitemaps.values())}
+
+
+def _drain(parser: ET.XMLPullParser, root: list[ET.Element]):
+    """<url> / <sitemap> の終了ごとに (種別, loc, lastmod) を返し、処理済みの要素は解放する。
+
+    root は最初の開始要素（urlset / sitemapindex）を保持する入れ物。処理済みの子を根から外し、
+    巨大な sitemap でも木が育たないようにする。"""
+    for event, el in parser.read_events():
+        if event == "start":
+            if not root:
+                root.append(el)
+            continue
+        tag = el.tag.rsplit("}", 1)[-1]
+        if tag not in ("url", "sitemap"):
+            continue
+        loc = lastmod = None
+        for child in el:
+            ctag = child.tag.rsplit("}", 1)[-1]
+            if ctag == "loc":
+                loc = (child.text or "").strip()
+            elif ctag == "lastmod":
+                lastmod = child.text
+        el.clear()
+        if root and el in root[0]:
+            root[0].remove(el)
+        if loc:
+            yield tag, loc, lastmod
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+soft404.py - ディレクトリ接頭辞ごとの soft-404 指紋（存在確認系プローブで共有）
+
+旧実装では check_exposed_files（本文長の差 32 未満）と check_auth_routes（同 64 未満）が
+それぞれ実在しない固定パスを 1 回取得し、本文の**長さ**だけを比べていた。CSRF トークンや
+時刻・要求パスを埋め込む catch-all ページでは長さが揺れて取りこぼし、逆に同じ長さの
+実在ページを soft-404 と誤る。ここでは
+
+  - 接頭辞（/ や /app1/）ごとに実在しない名前を SAMPLES 件（拡張子なし・ドット始まり）取得し、
+    状態・Content-Type（メディア型）・正規化した本文の simhash（64 bit）を指紋として持つ
+  - 正規化では要求パスの反響・数字・長い英数字（トークン・ハッシュ値）を落としてから語に分ける
+  - is_soft_404(応答) は状態とメディア型が一致し、simhash の距離が閾値以内の見本があれば真。
+    閾値は見本どうしの距離（動的部分の揺れ）に合わせて広げる。語の少ない本文は長さで比べる
+  - 指紋は Soft404Cache で実行中 1 回だけ作り（同時の要求は先行の構築を待つ）、path を渡すと
+    JSON に保存して max_age 秒まで次の診断でも使う
+
+通信は呼び出し側が渡す fetch(url) に任せる（checks の部分取得プローブ）。
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import secrets
+import threading
+import time
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+import checkpoint as checkpoint_mod
+
+# 接頭辞あたりの見本数（拡張子なしの名前と、.env / .git 等に近いドット始まりの名前）
+SAMPLES = 2
+# simhash の距離の閾値（下限・上限）。見本どうしの距離 + _SPREAD_MARGIN まで広げる
+_MIN_DISTANCE = 10
+_MAX_DISTANCE = 20
+_SPREAD_MARGIN = 3
+# これより語の少ない本文は simhash が不安定なため本文長で比べる（旧実装と同じ許容差）
+_MIN_TOKENS = 8
+_LENGTH_TOLERANCE = 32
+DEFAULT_MAX_AGE = 86400
+
+_VOLATILE_RE = re.compile(r"[A-Za-z0-9_\-+/=]{24,}|\d+")
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def sample_names() -> list[str]:
+    """見本に使う実在しない名前（毎回ランダム。中間キャッシュに当たらないようにする）。"""
+    tag = secrets.token_hex(6)
+    return [f"vwr-{tag}", f".vwr-{tag}"][:SAMPLES]
+
+
+def _media_type(headers) -> str:
+    return (headers.get("content-type", "") or "").split(";", 1)[0].strip().lower()
+
+
+def _tokens(text: str, url: str = "") -> list[str]:
+    """本文を比較用の語の列にする（要求パスの反響・数字・長いトークンを落とす）。"""
+    text = text or ""
+    if url:
+        path = urlparse(url).path
+        for echo in sorted({path, unquote(path), path.rsplit("/", 1)[-1]}, key=len, reverse=True):
+            if len(echo) > 1:
+                text = text.replace(echo, " ")
+    return _TOKEN_RE.findall(_VOLATILE_RE.sub(" ", text).lower())
+
+
+def simhash(tokens: list[str]) -> int:
+    """語の 2-gram（語が 1 つなら語そのもの）による 64 bit simhash。"""
+    grams = [f"{a} {b}" for a, b in zip(tokens, tokens[1:])] or tokens
+    weights = [0] * 64
+    for g in grams:
+        h = int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(64):
+            weights[i] += 1 if h >> i & 1 else -1
+    return sum(1 << i for i in range(64) if weights[i] > 0)
+
+
+def _distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _fingerprint(resp) -> dict:
+    tokens = _tokens(resp.text, str(getattr(resp, "url", "") or ""))
+    length = getattr(resp, "length", None)
+    return {"status": resp.status_code, "ctype": _media_type(resp.headers),
+            "simhash": simhash(tokens), "tokens": len(tokens),
+            "length": length if length is not None else len(resp.text or "")}
+
+
+class Soft404Model:
+    """接頭辞 1 つ分の soft-404 指紋（見本ごとの状態・メディア型・simhash・語数・本文長）。"""
+
+    def __init__(self, samples: list[dict], threshold: int | None = None):
+        self.samples = samples
+        if threshold is None:
+            hashed = [s["simhash"] for s in samples if s["tokens"] >= _MIN_TOKENS]
+            spread = max((_distance(a, b) for i, a in enumerate(hashed) for b in hashed[i + 1:]),
+                         default=0)
+            threshold = min(_MAX_DISTANCE, max(_MIN_DISTANCE, spread + _SPREAD_MARGIN))
+        self.threshold = threshold
+
+    @classmethod
+    def build(cls, directory: str, fetch) -> "Soft404Model":
+        """directory（末尾 / の URL）の下の実在しない名前を fetch で取得して指紋を作る。
+        取得に失敗した見本は捨てる（全滅なら何も soft-404 とみなさない空の指紋）。"""
+        samples = []
+        for name in sample_names():
+            try:
+                samples.append(_fingerprint(fetch(directory + name)))
+            except Exception:
+                continue
+        return cls(samples)
+
+    @property
+    def catch_all(self) -> bool:
+        """実在しない名前に 200 を返す（SPA/カスタム 404 の catch-all）か。"""
+        return any(s["status"] == 200 for s in self.samples)
+
+    def is_soft_404(self, resp) -> bool:
+        """resp（状態・ヘッダ・本文を持つ応答）が見本のどれかと同じページか。"""
+        if not self.samples:
+            return False
+        fp = _fingerprint(resp)
+        for s in self.samples:
+            if s["status"] != fp["status"] or s["ctype"] != fp["ctype"]:
+                continue
+            if min(s["tokens"], fp["tokens"]) < _MIN_TOKENS:
+                if abs(s["length"] - fp["length"]) < _LENGTH_TOLERANCE:
+                    return True
+            elif _distance(s["simhash"], fp["simhash"]) <= self.threshold:
+                return True
+        return False
+
+    def to_dict(self) -> dict:
+        return {"samples": self.samples, "threshold": self.threshold}
+
+
+class Soft404Cache:
+    """接頭辞 URL -> Soft404Model。実行中は 1 接頭辞 1 回だけ構築し、path があれば保存する。"""
+
+    def __init__(self, path: str | Path | None = None, max_age: float = DEFAULT_MAX_AGE):
+        self.path = Path(path) if path else None
+        self.max_age = max_age
+        self._models: dict[str, Soft404Model] = {}
+        self._built_at: dict[str, float] = {}
+        self._building: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.built = 0
+        self.hits = 0
+        self.loaded = 0
+        data = checkpoint_mod.read(self.path)
+        now = time.time()
+        for directory, rec in (data or {}).get("models", {}).items():
+            try:
+                if now - rec["built_at"] > max_age:
+                    continue
+                self._models[directory] = Soft404Model(rec["samples"], rec["threshold"])
+                self._built_at[directory] = rec["built_at"]
+            except (KeyError, TypeError):
+                continue
+        self.loaded = len(self._models)
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def model(self, directory: str, fetch) -> Soft404Model:
+        with self._lock:
+            got = self._models.get(directory)
+            if got is not None:
+                self.hits += 1
+                return got
+            building = self._building.setdefault(directory, threading.Lock())
+        with building:
+            with self._lock:
+                got = self._models.get(directory)
+                if got is not None:
+                    self.hits += 1
+                    return got
+            got = Soft404Model.build(directory, fetch)
+            with self._lock:
+                self._models[directory] = got
+                self._built_at[directory] = time.time()
+                self.built += 1
+                self._dirty = True
+            return got
+
+    def save(self) -> None:
+        """構築した指紋があれば path へアトミックに書く（書けなくても診断は続ける）。"""
+        if self.path is None or not self._dirty:
+            return
+        with self._lock:
+            models = {d: {**m.to_dict(), "built_at": self._built_at[d]}
+                      for d, m in self._models.items()}
+        try:
+            checkpoint_mod.write_atomic(self.path, {"models": models})
+            self._dirty = False
+        except OSError:
+            pass
+
+    def summary(self) -> dict:
+        """findings.json の assessment["soft404"] に載せる記録。"""
+        with self._lock:
+            catch_all = sum(m.catch_all for m in self._models.values())
+            return {"path": str(self.path) if self.path else None, "prefixes": len(self._models),
+                    "catch_all": catch_all, "built": self.built, "loaded": self.loaded,
+                    "hits": self.hits}
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+bench_checks.py - 受動ページチェックの再生ベンチ（旧: チェック別の走査 / 新: ルール表の単一パス）
+
+合成サイト N ページ（既定 10,000）を ResponseArchive に記録し、再生（ReplayClient）で
+  - legacy: 旧 run_checks 相当。ページごとに _headers_lower を 3 回作り、security-headers /
+            csp / sri / verbose-error を個別に実行し、mixed-content はページを取得し直す
+  - single: PagePass（PAGE_RULES）で 1 応答 1 ビューの単一パス
+を比較し、pages/sec・アーカイブ参照回数・所見件数と所見の一致を表示する。通信はしない。
+single ではヘッダ/CSP 群を構成（ヘッダの組・CSP 文字列）ごとに 1 回だけ評価するため、
+所見件数はページ数でなく構成の種類数に比例する。
+
+実行:
+    uv run --with httpx python scripts/tests/bench_checks.py [--pages 10000]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_SCRIPTS = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_SCRIPTS))
+
+import httpx  # noqa: E402
+
+import checks as checks_mod  # noqa: E402
+from archive import ResponseArchive, ReplayClient  # noqa: E402
+
+_HEADER_VARIANTS = [
+    {"content-type": "text/html; charset=utf-8", "server": "nginx/1.18.0"},
+    {"content-type": "text/html", "x-content-type-options": "nosniff",
+     "content-security-policy": "default-src 'self'; script-src 'self' 'unsafe-inline'",
+     "strict-transport-security": "max-age=31536000", "referrer-policy": "no-referrer"},
+    {"content-type": "text/html", "content-security-policy": "default-src 'none'",
+     "x-frame-options": "DENY", "permissions-policy": "camera=()",
+     "cross-origin-opener-policy": "same-origin", "x-xss-protection": "1; mode=block"},
+    {"content-type": "application/json", "x-powered-by": "Express"},
+]
+
+
+def synthetic_body(i: int) -> str:
+    """ページ番号で内容が変わる合成 HTML（外部 script・http:// 参照・エラー文言を混ぜる）。"""
+    parts = [f"<!DOCTYPE html><html><head><title>page {i}</title>"]
+    for k in range(20):
+        parts.append(f'<script src="/static/app-{k}.js"></script>')
+    if i % 3 == 0:
+        parts.append('<script src="https://cdn.example.net/lib.js"></script>')
+    if i % 5 == 0:
+        parts.append('<link rel="stylesheet" href="https://cdn.example.net/a.css" '
+                     'integrity="sha384-x" crossorigin="anonymous">')
+    parts.append("</head><body>")
+    parts.append("".join(f'<div class="row"><a href="/p/{i}/{k}">item {k}</a></div>'
+                         for k in range(150)))
+    if i % 7 == 0:
+        parts.append('<img src="http://img.example.net/x.png">')
+    if i % 97 == 0:
+        parts.append("<pre>Traceback (most recent call last):\n  File x</pre>")
+    parts.append(f"<p>{'lorem ipsum ' * 200}</p></body></html>")
+    return "".join(parts)
+
+
+def build_site(root: Path, n: int) -> list[dict]:
+    """n ページ分の応答をアーカイブに記録し、crawl の pages 相当を返す。"""
+    archive = ResponseArchive(root, compression="none")
+    pages = []
+    for i in range(n):
+        scheme = "https" if i % 2 == 0 else "http"
+        url = f"{scheme}://bench.test/p/{i}"
+        headers = _HEADER_VARIANTS[i % len(_HEADER_VARIANTS)]
+        resp = httpx.Response(200, headers=headers, text=synthetic_body(i),
+                              request=httpx.Request("GET", url))
+        archive.put(url, resp)
+        pages.append({"url": url, "status": 200, "content_type": headers["content-type"]})
+    return pages
+
+
+def legacy(pages: list[dict], client, f) -> None:
+    """旧 run_checks の受動ループ＋mixed-content（ページごとにヘッダを 3 回正規化・再取得あり）。"""
+    hl = checks_mod._headers_lower
+    for page in pages:
+        try:
+            r = client.get(page["url"])
+        except Exception:
+            continue
+        _rl = hl(r)
+        any(k in _rl for k in ("ratelimit-limit", "x-ratelimit-limit", "retry-after"))
+        checks_mod.check_security_headers(page, hl(r), f)
+        checks_mod.check_csp(page["url"], hl(r).get("content-security-policy", ""), f)
+        if "text/html" in r.headers.get("content-type", ""):
+            checks_mod.check_sri(page["url"], r.text, f)
+            checks_mod.check_verbose_error(page["url"], r.text, f)
+    checks_mod.check_mixed_content(pages, client, f)
+
+
+def single(pages: list[dict], client, f) -> None:
+    """ルール表の単一パス（run_checks と同じ順序で deferred 群を出す）。"""
+    pp = checks_mod.PagePass()
+    for page in pages:
+        try:
+            r = client.get(page["url"])
+        except Exception:
+            continue
+        view = pp.view(page, r)
+        any(k in view.headers for k in ("ratelimit-limit", "x-ratelimit-limit", "retry-after"))
+        pp.run(view, f)
+    pp.finish(f)
+    pp.emit("mixed-content", f)
+
+
+def measure(fn, pages: list[dict], archive_root: Path) -> tuple[float, int, list[dict]]:
+    client = ReplayClient(ResponseArchive(archive_root))
+    f = checks_mod.Findings()
+    start = time.perf_counter()
+    fn(pages, client, f)
+    elapsed = time.perf_counter() - start
+    return elapsed, client.hits, f.as_list()
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="受動ページチェックの再生ベンチ")
+    ap.add_argument("--pages", type=int, default=10000, help="合成ページ数")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "archive"
+        t0 = time.perf_counter()
+        pages = build_site(root, args.pages)
+        print(f"archive: {args.pages} pages recorded in {time.perf_counter() - t0:.1f}s")
+        print(f"{'mode':<8} {'seconds':>9} {'pages/sec':>11} {'replays':>9} {'findings':>9}")
+        results = {}
+        for label, fn in (("legacy", legacy), ("single", single)):
+            elapsed, hits, found = measure(fn, pages, root)
+            results[label] = found
+            print(f"{label:<8} {elapsed:>9.2f} {args.pages / elapsed:>11.1f} {hits:>9} {len(found):>9}")
+    # ヘッダ/CSP 群は構成ごとに 1 件へまとまるため、(check_id, 証跡, 確度, URL) に展開して比較する
+    flat = {k: sorted((i["check_id"], i["evidence"], i["confidence"], a)
+                      for i in v for a in i["affected"]) for k, v in results.items()}
+    same = flat["legacy"] == flat["single"]
+    print(f"findings identical (per affected URL): {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+bench_parse.py - crawl の HTML 解析マイクロベンチ（バックエンド別 pages/sec）
+
+1 ページ分の「指紋 + title + マーカー + フォーム + リンク」抽出を繰り返し、旧実装相当
+（BeautifulSoup を 2 回構築）と htmlview の各バックエンド（1 回解析）を比較する。
+入力はフィクスチャ（tests/vuln_app.py の INDEX_HTML）と合成の大きなページ。通信はしない。
+
+実行:
+    uv run --with httpx --with beautifulsoup4 python scripts/tests/bench_parse.py [--seconds 1.0]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+_SCRIPTS = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_SCRIPTS))
+
+import httpx  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+
+import crawl as crawl_mod  # noqa: E402
+from htmlview import available_backends  # noqa: E402
+from tests.vuln_app import INDEX_HTML  # noqa: E402
+
+
+def synthetic_page(links: int = 3000, forms: int = 60, scripts: int = 200) -> str:
+    """大規模カタログ/SPA を模した合成ページ（リンク・フォーム・script・長い inline JS）。"""
+    parts = ["<!DOCTYPE html><html><head><title>Large synthetic page</title>",
+             '<meta name="generator" content="Synth 1.0"><meta name="csrf-token" content="t">']
+    for i in range(scripts):
+        parts.append(f'<script src="/static/chunk-{i}.js?v={i}"></script>')
+    parts.append("<script>const Ziggy = {\"routes\":{")
+    parts.append(",".join(f'"r{i}":{{"uri":"admin/r{i}","methods":["GET"]}}' for i in range(300)))
+    parts.append("}};" + "var x = '/api/v1/items';" * 500 + "</script></head><body>")
+    for i in range(links):
+        parts.append(f'<div class="item"><a href="/item?id={i}">item {i}</a><p>desc {i}</p></div>')
+    for i in range(forms):
+        parts.append(f'<form action="/f{i}" method="post"><input name="a{i}"><input type="hidden" '
+                     f'name="_token" value="x"><textarea name="t{i}"></textarea></form>')
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def _legacy(url: str, html: str, headers: httpx.Headers) -> None:
+    """旧実装相当: 指紋用と抽出用に BeautifulSoup を 2 回構築する。"""
+    BeautifulSoup(html, "html.parser").find_all("script", src=True)
+    soup = BeautifulSoup(html, "html.parser")
+    soup.find_all("a", href=True)
+    soup.find_all("form")
+    soup.find_all("script")
+
+
+def _single(url: str, html: str, headers: httpx.Headers, backend: str) -> None:
+    resp = httpx.Response(200, headers=headers, text=html)
+    crawl_mod._analyze_response(url, resp, backend)
+
+
+def _rate(fn, seconds: float) -> float:
+    n, start = 0, time.perf_counter()
+    while True:
+        fn()
+        n += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return n / elapsed
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="HTML 解析バックエンドのマイクロベンチ")
+    ap.add_argument("--seconds", type=float, default=1.0, help="各計測の実行秒数")
+    args = ap.parse_args(argv)
+
+    headers = httpx.Headers({"content-type": "text/html; charset=utf-8", "server": "Bench/1.0"})
+    inputs = {"fixture(index)": INDEX_HTML, "synthetic(large)": synthetic_page()}
+    url = "http://bench.test/"
+    print(f"{'input':<18} {'backend':<22} {'pages/sec':>12}")
+    for label, html in inputs.items():
+        legacy = _rate(lambda: _legacy(url, html, headers), args.seconds)
+        print(f"{label:<18} {'legacy (2x bs4)':<22} {legacy:>12.1f}")
+        for backend in available_backends():
+            r = _rate(lambda: _single(url, html, headers, backend), args.seconds)
+            print(f"{label:<18} {backend:<22} {r:>12.1f}  (x{r / legacy:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+bench_secrets.py - JS 秘密走査のスループット（MB/s）ベンチ（旧: パターン別 finditer / 新: secretscan）
+
+合成の webpack 風バンドル（既定 32MB・keyword を多数含み、秘密は末尾に 1 件）に対して
+  - legacy: 旧 check_js_secrets 相当（6 パターン＋汎用パターンを 1 本ずつ全文 finditer）
+  - scan:   SecretScanner.scan（前段フィルタ＋候補位置のみ anchored match・全文を一括）
+  - stream: SecretScanner.scan_chunks（64KB チャンク・重ね幅つき逐次走査）
+を比較し、検出ラベルの一致を表示する。通信はしない。
+
+実行:
+    uv run --with httpx python scripts/tests/bench_secrets.py [--mb 32]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+_SCRIPTS = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_SCRIPTS))
+
+import checks as checks_mod  # noqa: E402
+
+_MODULE = ('!function(e){var t={};function n(r){if(t[r])return t[r].exports;var o=t[r]={i:r,l:!1,'
+           'exports:{}};return e[r].call(o.exports,o,o.exports,n),o.l=!0,o.exports}n.m=e,n.c=t;'
+           'const auth={token:null,refreshToken:function(){return fetch("/api/token")}};'
+           'var passwordField=document.querySelector("#password");n.d=function(e,t,r){};'
+           '"production"!==process.env.NODE_ENV&&console.warn("secret store disabled");}([]);\n')
+
+
+def synthetic_bundle(mb: int) -> str:
+    """mb MB 程度の合成バンドル。秘密（ダミー）は末尾にだけ置く（旧実装の 2MB 打ち切りでは見えない）。"""
+    reps = mb * 1024 * 1024 // len(_MODULE)
+    tail = 'var cfg={stripe:"' + "sk_" + "live_" + '0123456789abcdefABCDEFGHIJ"};'
+    return _MODULE * reps + tail
+
+
+def legacy(body: str) -> list[str]:
+    """旧 check_js_secrets の走査部分（パターンごとに全文 finditer）。"""
+    found = []
+    for label, _lit, rx in checks_mod._SECRET_PATTERNS:
+        for m in rx.finditer(body):
+            if m.group(0) in checks_mod._SECRET_EXAMPLE_ALLOW:
+                continue
+            found.append(label)
+            break
+    for m in checks_mod._GENERIC_SECRET_RE.finditer(body):
+        if checks_mod._generic_secret_ok(m):
+            found.append("generic")
+            break
+    return found
+
+
+def _timed(fn) -> tuple[float, list[str]]:
+    start = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - start, out
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="JS 秘密走査のスループットベンチ")
+    ap.add_argument("--mb", type=int, default=32, help="合成バンドルの大きさ（MB）")
+    ap.add_argument("--chunk", type=int, default=65536, help="stream のチャンク文字数")
+    args = ap.parse_args(argv)
+
+    body = synthetic_bundle(args.mb)
+    size_mb = len(body) / (1024 * 1024)
+    scanner = checks_mod._SECRET_SCANNER
+    chunks = lambda: (body[i:i + args.chunk] for i in range(0, len(body), args.chunk))  # noqa: E731
+    runs = {
+        "legacy": lambda: legacy(body),
+        "legacy(2MB)": lambda: legacy(body[:checks_mod._MAX_JS_BYTES]),
+        "scan": lambda: scanner.scan(body),
+        "stream": lambda: scanner.scan_chunks(chunks()),
+    }
+    print(f"bundle: {size_mb:.1f} MB")
+    print(f"{'mode':<12} {'seconds':>9} {'MB/s':>9}  labels")
+    results = {}
+    for label, fn in runs.items():
+        elapsed, found = _timed(fn)
+        results[label] = found
+        scanned = min(size_mb, checks_mod._MAX_JS_BYTES / (1024 * 1024)) if "2MB" in label else size_mb
+        print(f"{label:<12} {elapsed:>9.2f} {scanned / elapsed:>9.1f}  {found}")
+    same = results["legacy"] == results["scan"] == results["stream"]
+    print(f"labels identical: {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
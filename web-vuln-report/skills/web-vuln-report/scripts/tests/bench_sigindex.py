@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+bench_sigindex.py - JS 署名DB 照合のベンチ（旧: lib ごとの線形走査 / 新: コンパイル済み区間索引）
+
+retire.js 規模の合成 DB（既定 40 lib × 200 範囲・atOrAbove 付きを含む）と、合成の
+(lib, 版数) 照会（既定 200,000 件）に対して
+  - legacy: 旧 check_js_known_cve 相当（照会ごとに全署名の below を解析し直して比較）
+  - index:  SignatureIndex.match（bisect で素区間を引く）
+の照会/秒と、JSON 読み込み＋コンパイル / .sigidx 読み込みの時間を表示し、一致を確認する。
+通信はしない。
+
+実行:
+    python scripts/tests/bench_sigindex.py [--libs 40] [--ranges 200] [--queries 200000]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_SCRIPTS = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_SCRIPTS))
+
+import sigindex  # noqa: E402
+from sigindex import SignatureIndex, parse_version  # noqa: E402
+
+
+def synthetic_db(libs: int, ranges: int, rnd: random.Random) -> dict:
+    vers = [f"{a}.{b}.{c}" for a in range(6) for b in range(20) for c in range(10)]
+    sigs = {}
+    for li in range(libs):
+        entries = []
+        for k in range(ranges):
+            lo, hi = sorted(rnd.sample(range(len(vers)), 2))
+            sig = {"below": vers[hi], "cve": [f"CVE-2024-{li:02d}{k:03d}"], "severity": "medium",
+                   "note": "synthetic"}
+            if rnd.random() < 0.6:
+                sig["atOrAbove"] = vers[lo]
+            entries.append(sig)
+        sigs[f"lib{li}"] = entries
+    return {"snapshot_date": "bench", "signatures": sigs}
+
+
+def legacy_match(db: dict, lib: str, ver: tuple) -> list[dict]:
+    """旧照合（atOrAbove は旧実装に無いため同じ条件を線形に足した比較用）。"""
+    return [sig for sig in db["signatures"].get(lib, [])
+            if ver < parse_version(sig.get("below", "0"))
+            and ("atOrAbove" not in sig or parse_version(sig["atOrAbove"]) <= ver)]
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - start, out
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="JS 署名DB 照合のベンチ")
+    ap.add_argument("--libs", type=int, default=40)
+    ap.add_argument("--ranges", type=int, default=200, help="lib あたりの署名範囲数")
+    ap.add_argument("--queries", type=int, default=200000)
+    args = ap.parse_args(argv)
+
+    rnd = random.Random(1)
+    db = synthetic_db(args.libs, args.ranges, rnd)
+    queries = [(f"lib{rnd.randrange(args.libs)}",
+                (rnd.randrange(6), rnd.randrange(20), rnd.randrange(10)))
+               for _ in range(args.queries)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sigs.json"
+        path.write_text(json.dumps(db), encoding="utf-8")
+        t_compile, _ = _timed(lambda: sigindex.load(path))       # JSON 解析＋コンパイル＋保存
+        t_cached, index = _timed(lambda: sigindex.load(path))    # .sigidx から読むだけ
+    print(f"db: {args.libs} libs x {args.ranges} ranges / queries: {args.queries}")
+    print(f"load: json+compile {t_compile * 1000:.1f} ms / cached .sigidx {t_cached * 1000:.1f} ms")
+    # 旧実装は照会件数分を回すと遅すぎるため、先頭 1/20 で照会/秒を測る
+    sample = queries[:max(1, len(queries) // 20)]
+    t_legacy, old = _timed(lambda: [legacy_match(db, lib, v) for lib, v in sample])
+    t_index, new = _timed(lambda: [index.match(lib, v) for lib, v in queries])
+    print(f"{'mode':<8} {'queries':>9} {'seconds':>9} {'queries/s':>12}")
+    print(f"{'legacy':<8} {len(sample):>9} {t_legacy:>9.2f} {len(sample) / t_legacy:>12.0f}")
+    print(f"{'index':<8} {len(queries):>9} {t_index:>9.2f} {len(queries) / t_index:>12.0f}")
+    same = old == new[:len(sample)]
+    print(f"matches identical: {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -57,6 +57,291 @@ def test_crawl_finds_pages_and_forms(crawl_data):
     assert len(crawl_data["cookies"]) >= 1
 
 
+def test_concurrent_crawl_is_deterministic(server, crawl_data):
+    # 並行ワーカー数に関わらず、最終ソート後の pages/forms/params/cookies は同一になる
+    serial = asdict(crawl_mod.crawl(target=server, authorized_by="test-suite", max_pages=20,
+                                    max_depth=2, rate=0, respect_robots=False, concurrency=1))
+    for key in ("pages", "forms", "params", "cookies"):
+        assert serial[key] == crawl_data[key], key
+    # max_pages は並行取得でも超えない（取得前に枠を確保する）
+    small = crawl_mod.crawl(target=server, authorized_by="test-suite", max_pages=2,
+                            max_depth=2, rate=0, respect_robots=False, concurrency=8)
+    assert len(small.pages) == 2
+
+
+def test_stream_parser_matches_soup_backend(server, crawl_data):
+    # タグイベントのみの stream バックエンドでも巡回結果（ページ/フォーム/マーカー）は同一
+    streamed = asdict(crawl_mod.crawl(target=server, authorized_by="test-suite", max_pages=20,
+                                      max_depth=2, rate=0, respect_robots=False, parser="stream"))
+    for key in ("pages", "forms", "params", "cookies"):
+        assert streamed[key] == crawl_data[key], key
+
+
+def test_htmlview_backends_agree_on_extracted_fields():
+    from htmlview import parse_html
+    html = ('<html><head><title> T &amp; co </title><meta name="generator" content="WP 6.1">'
+            '<script src="/a.js"></script><script id="__NEXT_DATA__">{"x":1}</script>'
+            '<script src="">var z=1</script></head><body><div data-page=\'{"url":"/p"}\'>'
+            '<div><form action="/s" method="post"><input name="q"><select name="o"></select>'
+            '</div><input name="outside"></form><a href="/x">x</a><a>no</a>'
+            '<textarea name="t"></textarea></body></html>')
+    soup_v = parse_html(html, "html.parser")
+    stream_v = parse_html(html, "stream")
+    assert soup_v == stream_v
+    assert soup_v.title == "T & co"
+    assert soup_v.links == ["/x"]
+    # </div> でフォームが閉じる（bs4 と同じ入れ子規則）ため、外側の input は拾わない
+    assert [i["name"] for i in soup_v.forms[0]["inputs"]] == ["q", "o"]
+    assert soup_v.next_data and soup_v.data_page == '{"url":"/p"}'
+    assert parse_html("", "stream").links == []
+
+
+def test_jsonl_stream_matches_json_and_feeds_checks(server, crawl_data, findings, tmp_path):
+    from crawlstream import CrawlStream, JsonlWriter, load_crawl, write_json
+    import json
+    path = tmp_path / "crawl.jsonl"
+    with JsonlWriter(path) as sink:
+        res = crawl_mod.crawl(target=server, authorized_by="test-suite", max_pages=20,
+                              max_depth=2, rate=0, respect_robots=False, sink=sink)
+    assert res.pages == [] and res.scope["pages_crawled"] == len(crawl_data["pages"])
+    stream = load_crawl(path)
+    assert isinstance(stream, CrawlStream)
+    assert stream["scope"]["finished_at"] and stream["scope"]["target"] == server
+    # 行順は取得完了順なので集合で比較（params/cookies は書き出し時の重複除去で JSON と一致）
+    key = lambda r: json.dumps(r, sort_keys=True)  # noqa: E731
+    for k in ("pages", "forms", "params", "cookies"):
+        assert sorted(map(key, stream.get(k))) == sorted(map(key, crawl_data[k])), k
+    assert len(stream.get("pages")) == len(crawl_data["pages"])
+    # 遅延ビューをそのまま run_checks に渡しても所見は同一（ヘッダ群の affected はページ順）
+    streamed = checks_mod.run_checks(stream, timeout=10, active=True)
+    assert sorted((f["check_id"], sorted(f["affected"])) for f in streamed) == \
+        sorted((f["check_id"], sorted(f["affected"])) for f in findings)
+    # 後方互換: jsonl から書き出した crawl.json は通常の JSON として読める
+    write_json(stream, tmp_path / "crawl.json")
+    back = json.loads((tmp_path / "crawl.json").read_text(encoding="utf-8"))
+    assert back == stream.to_dict()
+
+
+def test_archive_replay_runs_passive_checks_without_network(server, findings, tmp_path,
+                                                            monkeypatch):
+    import httpx
+    from archive import ResponseArchive
+    arch = ResponseArchive(tmp_path / "archive", compression="gzip")
+    data = asdict(crawl_mod.crawl(target=server, authorized_by="test-suite", max_pages=20,
+                                  max_depth=2, rate=0, respect_robots=False, archive=arch))
+    assert len(arch) == len([p for p in data["pages"] if "status" in p])
+    first = data["pages"][0]["url"]
+    replayed = ResponseArchive(tmp_path / "archive").response(first)
+    assert replayed.status_code == data["pages"][0]["status"]
+
+    # 通信を試みた時点で失敗するクライアントに差し替え、再生だけで受動チェックが回ることを確認
+    def _no_network(req):
+        raise AssertionError(f"unexpected request: {req.url}")
+    monkeypatch.setattr(checks_mod, "_client", lambda timeout: httpx.Client(
+        transport=httpx.MockTransport(_no_network)))
+    ledger = checks_mod.Ledger()
+    offline = checks_mod.run_checks(data, active=False, ledger=ledger,
+                                    replay=tmp_path / "archive", offline=True)
+    passive = {"missing-hsts", "missing-xcto", "missing-csp", "weak-csp", "missing-frame-options",
+               "cookie-insecure", "cookie-no-httponly", "cookie-no-samesite", "sri-missing",
+               "verbose-error", "info-disclosure-banner"}
+    key = lambda fs: sorted((f["check_id"], f["affected"]) for f in fs  # noqa: E731
+                            if f["check_id"] in passive)
+    assert key(offline) and key(offline) == key(findings)
+    assert ledger.assessment["replay"]["misses"] == 0
+    rows = {r["id"]: r for r in ledger.rows()}
+    assert rows["security-headers"]["status"] == "finding"
+    assert rows["cors"]["status"] == "skipped"
+
+
+def test_incremental_crawl_revalidates_with_conditional_get(server, tmp_path):
+    from archive import ResponseArchive
+    kw = dict(target=server, authorized_by="test-suite", max_pages=20, max_depth=2, rate=0,
+              respect_robots=False)
+    first = asdict(crawl_mod.crawl(**kw, archive=ResponseArchive(tmp_path / "w1")))
+    second = asdict(crawl_mod.crawl(**kw, archive=ResponseArchive(tmp_path / "w2"),
+                                    previous=ResponseArchive(tmp_path / "w1")))
+    inc = second["scope"]["incremental"]
+    # フィクスチャは 200 に ETag を付けるため、静的ページは 304 → 前回本文から同じレコードを再構成
+    assert inc["unchanged"] >= 3 and inc["bytes_saved"] > 0
+    assert inc["unchanged"] + inc["refetched"] + inc["new"] == len(second["pages"])
+    by_url = {p["url"]: p for p in second["pages"]}
+    assert by_url[server + "/"]["revalidation"] == "unchanged"
+    assert by_url[server + "/"]["bytes_downloaded"] == 0   # 304 は本文を運ばない
+    for p in first["pages"] + second["pages"]:   # 転送量以外は同一
+        for k in ("revalidation", "bytes_downloaded", "bytes_skipped"):
+            p.pop(k, None)
+    for key in ("pages", "forms", "params", "cookies"):
+        assert second[key] == first[key], key
+    # sitemap の lastmod が前回取得より新しい /files/ は優先投入される（/ は古いので対象外）
+    assert inc["sitemap_prioritized"] == 1
+    # 再構成した応答も今回のアーカイブに記録され、次回の検証子と受動チェックの再生に使える
+    assert ResponseArchive(tmp_path / "w2").validators(server + "/")["If-None-Match"]
+
+
+def test_frontier_canonicalises_dedupes_and_caps_templates():
+    from frontier import Frontier, canonicalize, dedupe_key, template_of
+    assert canonicalize("HTTP://Ex.COM:80?b=2&a=1#frag") == "http://ex.com/?a=1&b=2"
+    assert canonicalize("https://ex.com:443/go?url=/next") == "https://ex.com/go?url=/next"
+    # 末尾スラッシュは取得 URL では保持し、重複判定でのみ同一視する
+    assert canonicalize("http://ex.com/files/") == "http://ex.com/files/"
+    assert dedupe_key("http://ex.com/files/") == dedupe_key("http://ex.com/files")
+    assert template_of("http://ex.com/item/42?id=7") == template_of("http://ex.com/item/9?id=1")
+
+    fr = Frontier(max_per_template=2)
+    assert fr.push("http://ex.com/", 0)
+    assert not fr.push("http://ex.com:80/#top", 0)   # 投入時に O(1) で重複除去
+    for i in range(5):
+        fr.push(f"http://ex.com/item?id={i}", 1)
+    fr.push("http://ex.com/about", 1)
+    fr.push("http://ex.com/search?q=x", 1, score=fr.link_bonus([{"action": "/s"}], []))
+    popped = []
+    while (item := fr.pop()) is not None:
+        popped.append(item[0])
+    assert popped[0] == "http://ex.com/"
+    # 同じ深さでは新規パラメータ＋フォーム由来のリンクが先、カタログ URL はテンプレート上限まで
+    assert popped[1] == "http://ex.com/search?q=x"
+    assert sum("/item?" in u for u in popped) == 2
+    assert fr.summary()["template_capped"] == 3 and fr.summary()["duplicates"] == 1
+
+
+def test_crawl_resumes_from_checkpoint(server, tmp_path, monkeypatch):
+    import shutil
+    import checkpoint as checkpoint_mod
+    from crawl import crawl
+    from dataclasses import asdict
+    kw = dict(max_pages=20, max_depth=2, rate=0, respect_robots=False, concurrency=1)
+    full = asdict(crawl(server, "test-suite", **kw))
+    # 3 ページ目のチェックポイントを退避して「そこで中断した」状態を作る
+    ckpt, saved = tmp_path / "crawl.checkpoint.json", tmp_path / "snapshot.json"
+    real_write, calls = checkpoint_mod.write_atomic, []
+
+    def _write(path, data):
+        real_write(path, data)
+        calls.append(path)
+        if len(calls) == 3:
+            shutil.copy(path, saved)
+    monkeypatch.setattr(checkpoint_mod, "write_atomic", _write)
+    crawl(server, "test-suite", checkpoint=ckpt, checkpoint_every=1, **kw)
+    monkeypatch.undo()
+    assert not ckpt.exists()  # 正常終了時は削除
+    shutil.copy(saved, ckpt)
+    resumed = asdict(crawl(server, "test-suite", checkpoint=ckpt, resume=True, **kw))
+    assert "resumed_at" in resumed["scope"]
+    for key in ("pages", "forms", "params", "cookies"):
+        assert resumed[key] == full[key], key
+
+
+def test_adaptive_rate_limiter_aimd(crawl_data):
+    from ratelimit import AdaptiveRateLimiter
+    lim = AdaptiveRateLimiter(10.0)
+    url = "http://t.example/a"
+    assert lim.rate_of(url) == 10.0
+    lim.observe(url, 200, {}, 0.05)
+    assert lim.rate_of(url) == 10.0            # 天井は超えない
+    lim.observe(url, 429, {}, 0.05)
+    assert lim.rate_of(url) == 5.0             # 乗算的に減速
+    lim.observe(url, 429, {}, 0.05)
+    assert lim.rate_of(url) == 5.0             # 同時発射分の 429 で多段に下げない
+    lim.observe(url, 200, {}, 0.05)
+    assert lim.rate_of(url) == 6.0             # 健全なら加算的に回復
+    lim.observe(url, 200, {}, 5.0)
+    assert lim.rate_of(url) == 6.0             # 遅延の悪化中は上げない
+    lim.observe("http://other.example/", 503, {"Retry-After": "2"}, 0.05)
+    assert lim.rate_of("http://other.example/") == 5.0
+    assert lim.bucket("other.example").reserve() >= 1.5   # Retry-After の間は送出しない
+    assert lim.rate_of(url) == 6.0                          # ホスト単位で独立
+    s = lim.summary()
+    assert s["ceiling"] == 10.0 and s["cuts"] == 2 and s["retry_after_pauses"] == 1
+    assert [e["reason"] for e in s["events"]][:2] == ["429", "healthy"]
+    assert "rate_control" in crawl_data["scope"]
+
+
+def test_token_bucket_enforces_rate():
+    from ratelimit import TokenBucket, HostRateLimiter
+    b = TokenBucket(rate=10)
+    waits = [b.reserve() for _ in range(4)]
+    # 容量 1＝バースト無し: 初回は即時、以降は 1/rate 間隔で発射時刻が予約される
+    assert waits[0] == 0.0
+    for i, w in enumerate(waits[1:], 1):
+        assert abs(w - i * 0.1) < 0.02
+    assert TokenBucket(rate=0).reserve() == 0.0   # rate<=0 は無制限
+    lim = HostRateLimiter(rate=5)
+    assert lim.bucket("https://a.test/x") is lim.bucket("https://A.test/y")
+    assert lim.bucket("https://a.test/") is not lim.bucket("https://b.test/")
+
+
+def test_crawl_streams_bodies_only_for_html(server, crawl_data):
+    from crawl import crawl
+    kw = dict(max_depth=0, rate=0, respect_robots=False)
+    pdf = crawl(server + "/downloads/manual.pdf", "test-suite", **kw)
+    page = pdf.pages[0]
+    assert page["status"] == 200 and page["content_type"] == "application/pdf"
+    assert page["bytes_skipped"] > 200 * 1024            # 本文はほぼ読まずに閉じる
+    assert page["bytes_downloaded"] + page["bytes_skipped"] == 256 * 1024 + 9
+    assert pdf.scope["transfer"]["bodies_skipped"] == 1
+    big = crawl(server + "/big.html", "test-suite", max_body_bytes=4096, **kw)
+    page = big.pages[0]
+    assert page["body_truncated"] and page["title"] == ""
+    assert big.scope["transfer"]["bodies_truncated"] == 1
+    index = next(p for p in crawl_data["pages"] if p["url"] == server + "/")
+    assert index["bytes_skipped"] == 0 and index["bytes_downloaded"] > 0
+
+    # 本文を読んだ XHTML / Content-Type の無い HTML は解析もする（読んだ本文を捨てない）
+    import httpx
+    from crawl import _analyze_response
+    body = b"<html><head><title>T</title></head><body><a href='/next'>n</a></body></html>"
+    for ctype in ("application/xhtml+xml", None):
+        headers = {"content-type": ctype} if ctype else {}
+        page, _forms, _params, _cookies, links = _analyze_response(
+            "https://s/", httpx.Response(200, headers=headers, content=body))
+        assert page["title"] == "T" and links == ["https://s/next"], ctype
+
+
+def test_site_index_shares_robots_and_streams_gzip_sitemaps(server):
+    from crawl import USER_AGENT, crawl
+    from siteindex import SiteIndex
+    from checks import _collect_robots_sitemap_paths
+    with SiteIndex(USER_AGENT) as site:
+        robots = site.robots(server + "/any/page")
+        assert robots.crawl_delay == 1 and robots.disallow == ["/private-area/"]
+        assert not site.can_fetch(server + "/private-area/x") and site.can_fetch(server + "/")
+        # robots の Sitemap 行 → 索引 → 子（gzip 含む）を逐次解析
+        urls = site.sitemap(server)
+        assert {server + "/", server + "/files/", server + "/search?q=hello"} <= set(urls)
+        assert urls[server + "/files/"].year == 2999
+        res = crawl(server, "test-suite", max_pages=2, max_depth=1, rate=0, site=site)
+        assert res.scope["rate_control"]["host_ceilings"] == {"127.0.0.1": 1.0}  # Crawl-delay
+        assert _collect_robots_sitemap_paths(server, site) == []
+        # 巡回・チェック・再呼び出しで robots / sitemap の取得は 1 回ずつ
+        assert site.stats["robots_fetches"] == 1 and site.stats["sitemap_fetches"] == 3
+
+
+def test_crawl_fetches_robots_for_new_origins_off_the_event_loop(server, monkeypatch):
+    import threading
+    import crawl as crawl_mod
+    from siteindex import SiteIndex
+
+    other = server.replace("127.0.0.1", "localhost")   # 同じサーバの別オリジン（スコープ内）
+    analyze = crawl_mod._analyze_response
+
+    def _with_other_origin(url, resp, parser=crawl_mod.DEFAULT_BACKEND):
+        page, forms, params, cookies, links = analyze(url, resp, parser)
+        return page, forms, params, cookies, links + [other + "/"]
+    monkeypatch.setattr(crawl_mod, "_analyze_response", _with_other_origin)
+    fetched = {}
+    real = SiteIndex._fetch_robots
+
+    def _record(self, origin):
+        fetched[origin] = threading.current_thread() is threading.main_thread()
+        return real(self, origin)
+    monkeypatch.setattr(SiteIndex, "_fetch_robots", _record)
+    crawl_mod.crawl(server, "test-suite", max_pages=4, max_depth=1, rate=0,
+                    extra_hosts=["localhost"])
+    # 起点の robots は巡回前に取得し、巡回中に見つけたオリジンの分はスレッドで取得する
+    assert fetched[server] is True and fetched[other] is False
+
+
 def test_detects_missing_security_headers(findings):
     ids = _check_ids(findings)
     assert "missing-hsts" not in ids or True  # http 対象では HSTS 対象外（正しい挙動）
@@ -156,6 +441,54 @@ def test_outdated_library_generic_extraction():
     assert "angular 16" not in ev
 
 
+def test_inventory_feeds_library_checks_and_exports_cyclonedx(crawl_data):
+    import inventory as inventory_mod
+    from checks import (Findings, check_eol_runtime, check_framework_fingerprint,
+                        check_js_known_cve, check_outdated_libraries)
+    pages = [{"url": f"https://s/p{i}", "server": "Apache/2.2.15 (CentOS)",
+              "technologies": ["Server: Apache/2.2.15 OpenSSL/1.0.2k", "X-Powered-By: PHP/7.4.3",
+                               "cf-ray: x", "js: /static/jquery-1.8.3.min.js"],
+              "client_fw": ["vue"],
+              "script_srcs": ["https://cdn/jquery/1.8.3/jquery.min.js",
+                              "https://cdn/angular.js/1.7.8/angular.min.js",
+                              "https://cdn/jquery-ui-1.11.4.min.js"]} for i in range(50)]
+    inv = inventory_mod.build_inventory(pages)
+    # 同じ出所の文字列は 50 ページに載っても正規表現を 1 回だけ当てる（2 回目以降は記憶から引く）
+    assert len(inv._libs_in) == 4
+    jq = inv.get(("library", "jquery", (1, 8, 3)))
+    assert len(jq.pages) == 50 and len(jq.sources) == 2
+    assert ("library", "angularjs", (1, 7, 8)) in inv._components
+    assert ("runtime", "PHP", (7, 4, 3)) in inv._components
+
+    # 台帳を渡しても渡さなくても所見は同じ（4 チェックとも台帳を読む）
+    for run in (lambda f, i: check_outdated_libraries(pages, f, i),
+                lambda f, i: check_js_known_cve(pages, f, inventory=i),
+                lambda f, i: check_framework_fingerprint(pages, [], f, i),
+                lambda f, i: check_eol_runtime(pages, f, i)):
+        a, b = Findings(), Findings()
+        run(a, inv)
+        run(b, None)
+        assert a.as_list() == b.as_list() and a.as_list()
+    f = Findings()
+    check_eol_runtime(pages, f, inv)
+    assert sorted(i["evidence"].split(":")[0] for i in f.as_list()) == [
+        "Apache httpd 2.2", "OpenSSL 1.0.2", "PHP 7.4"]
+
+    bom = inv.to_cyclonedx("https://s/", "2026-01-01T00:00:00Z")
+    assert bom["bomFormat"] == "CycloneDX" and bom["specVersion"] == "1.5"
+    refs = [c["bom-ref"] for c in bom["components"]]
+    assert len(refs) == len(set(refs))
+    byref = {c["bom-ref"]: c for c in bom["components"]}
+    assert byref["pkg:npm/jquery@1.8.3"]["type"] == "library"
+    assert byref["pkg:npm/angular@1.7.8"]["name"] == "angularjs"
+    assert {"location": "https://cdn/jquery/1.8.3/jquery.min.js"} in \
+        byref["pkg:npm/jquery@1.8.3"]["evidence"]["occurrences"]
+
+    # フィクスチャ巡回でも台帳経由で jquery 1.8.3 を検出する
+    fixture = inventory_mod.build_inventory(crawl_data["pages"])
+    assert any(c.name == "jquery" and c.version == (1, 8, 3) for c in fixture.components("library"))
+
+
 # ===== v0.5 A2: 内蔵署名DBによる CVE 相関（非egress） =====
 def test_js_known_cve_matching():
     from checks import check_js_known_cve, Findings
@@ -240,6 +573,62 @@ def test_js_known_cve_uses_shipped_db(findings):
     assert any("CVE-" in f["evidence"] for f in js)
 
 
+def test_signature_index_matches_linear_scan_and_caches_compiled_form(tmp_path):
+    import json
+    import os
+    import random
+    import sigindex
+    from sigindex import SignatureIndex, parse_version
+    rnd = random.Random(3)
+    vers = [f"{a}.{b}.{c}" for a in range(4) for b in range(6) for c in range(3)]
+    entries = []
+    for k in range(300):
+        sig = {"below": rnd.choice(vers), "cve": [f"CVE-2020-{k:04d}"], "severity": "medium"}
+        if k % 10 == 0:
+            sig["cve"] = []   # CVE の無い署名も旧実装と同じく照合する
+        if rnd.random() < 0.5:
+            sig["atOrAbove"] = rnd.choice(vers)
+        entries.append(sig)
+    db = {"snapshot_date": "2026-07", "signatures": {"jquery": entries}}
+    index = SignatureIndex.compile(db)
+    for v in vers + ["9.9.9", "0.0.0"]:
+        ver = parse_version(v)
+        linear = [e for e in entries if ver < parse_version(e["below"])
+                  and ("atOrAbove" not in e or parse_version(e["atOrAbove"]) <= ver)]
+        assert index.match("jquery", ver) == linear, v
+    assert index.match("lodash", (1, 0, 0)) == []
+
+    # retire.js 本来の形式（lib 最上位・identifiers.CVE）も受け付ける
+    retire = {"lodash": {"vulnerabilities": [
+        {"atOrAbove": "4.0.0", "below": "4.17.21", "severity": "high",
+         "identifiers": {"CVE": ["CVE-2021-23337"], "summary": "command injection"}},
+        {"below": "4.0.0", "severity": "low", "identifiers": {"summary": "no cve"}}]}}
+    ri = SignatureIndex.compile(retire)
+    assert [s["cve"] for s in ri.match("lodash", (4, 17, 4))] == [["CVE-2021-23337"]]
+    # atOrAbove 未満は非該当、CVE 無しの署名は該当（旧実装と同じ）
+    assert [(s["cve"], s["note"]) for s in ri.match("lodash", (3, 10, 1))] == [([], "no cve")]
+
+    # コンパイル結果は JSON の隣に保存し、mtime/サイズ一致なら JSON を読まずに使う
+    path = tmp_path / "sigs.json"
+    path.write_text(json.dumps(db), encoding="utf-8")
+    first = sigindex.load(path)
+    cache = path.with_suffix(".sigidx")
+    assert cache.exists() and first.match("jquery", (1, 2, 0)) == index.match("jquery", (1, 2, 0))
+    meta = sigindex._read_cache(cache)
+    path.write_bytes(b"x" * meta["size"])               # 同じ mtime/サイズなら JSON は解析しない
+    os.utime(path, ns=(meta["mtime_ns"], meta["mtime_ns"]))
+    assert sigindex.load(path).db == first.db
+    # 内容が変われば作り直す（mtime だけの変化なら sha256 で再利用）
+    db["signatures"]["jquery"] = entries[:1]
+    path.write_text(json.dumps(db), encoding="utf-8")
+    assert len(sigindex.load(path).signatures["jquery"]) == 1
+    os.utime(path, ns=(1, 1))
+    assert len(sigindex.load(path).signatures["jquery"]) == 1
+    assert sigindex._read_cache(cache)["mtime_ns"] == 1
+    cache.write_bytes(b"garbage")                        # 壊れたキャッシュは無視
+    assert len(sigindex.load(path).signatures["jquery"]) == 1
+
+
 def test_eol_runtime_detection():
     from checks import check_eol_runtime, Findings
     pages = [{"url": "https://s/", "server": "Apache/2.2.15 (CentOS)",
@@ -283,6 +672,129 @@ def test_js_secrets_true_and_false_positives():
         assert leak not in blob  # 生値・公開鍵接頭辞を evidence に載せない
 
 
+def test_secret_scanner_streams_past_fetch_cap_and_matches_legacy():
+    import random
+    from contextlib import contextmanager
+    from checks import (Findings, _GENERIC_SECRET_RE, _SECRET_PATTERNS, _SECRET_SCANNER,
+                        _bounded_fetch_scripts, _generic_secret_ok, check_js_secrets)
+    sk = "sk_" + "live_" + "0123456789abcdefABCDEFGHIJ"
+    gh = "ghp_" + "A1b2C3d4E5f6G7h8I9j0K1l2M3n4O5p6Q7r8"
+    gen = 'api_key: "Zx9Qw8Er7Ty6Ui5Op4As3Df2Gh1Jk0Lm"'
+    ex = "AKIA" + "IOSFODNN7EXAMPLE"
+
+    def legacy(body):
+        out = [lb for lb, _, rx in _SECRET_PATTERNS
+               if any(m.group(0) != ex for m in rx.finditer(body))]
+        return out + (["generic"] if any(_generic_secret_ok(m)
+                                         for m in _GENERIC_SECRET_RE.finditer(body)) else [])
+
+    rnd = random.Random(7)
+    pieces = ["var a=1;", "token", "password=", sk, gh, gen, ex, "xoxb-", "-----BEGIN ", "AKIA",
+              "secret: 'short'", "x" * 50]
+    for _ in range(200):
+        body = "".join(rnd.choice(pieces) for _ in range(rnd.randint(0, 12)))
+        assert _SECRET_SCANNER.scan(body) == legacy(body), body
+        # チャンク境界で分断しても同じ（重ね幅で拾う）
+        step = rnd.randint(1, 9)
+        chunks = [body[i:i + step] for i in range(0, len(body), step)]
+        assert _SECRET_SCANNER.scan_chunks(chunks) == legacy(body), body
+
+    # 2MB の取得上限の後ろにある秘密も、逐次取得＋走査で検出する（返す本文は先頭のみ）
+    big = "/*pad*/" * 400_000 + f'var k="{sk}";'
+
+    class _Resp:
+        status_code, headers = 200, {"content-type": "application/javascript"}
+
+        def iter_text(self):
+            for i in range(0, len(big), 65536):
+                yield big[i:i + 65536]
+
+    class _C:
+        @contextmanager
+        def stream(self, method, url):
+            yield _Resp()
+
+    analyses: dict = {}
+    bodies = _bounded_fetch_scripts(["https://s/app.js"], _C(), {"s"}, analyses=analyses)
+    assert len(bodies[0][1]) == 2_000_000
+    assert analyses["https://s/app.js"]["secrets"] == ["Stripe シークレットキー"]
+    f, f_old = Findings(), Findings()
+    check_js_secrets(bodies, f, {u: a["secrets"] for u, a in analyses.items()})
+    check_js_secrets(bodies, f_old)
+    assert [i["evidence"] for i in f.as_list()] == ["種別: Stripe シークレットキー の疑い / 出所: 外部 JS（生値は非掲載）"]
+    assert f_old.as_list() == []
+
+
+def test_js_bundles_dedupe_by_content_and_reuse_disk_cache(tmp_path, monkeypatch):
+    from contextlib import contextmanager
+    import checks
+    from checks import (Findings, _bounded_fetch_scripts, _js_analysis_rules, check_js_secrets,
+                        check_source_map)
+    from jscache import BundleCache
+    vendor = "/*! jQuery v3.4.1 */ var a=1;\n//# sourceMappingURL=vendor.js.map\n"
+    bodies = {"/vendor.js?v=%d" % i: vendor for i in range(30)}
+    bodies["/app.js"] = 'var k="' + "ghp_" + "A1b2C3d4E5f6G7h8I9j0K1l2M3n4O5p6Q7r8" + '";'
+    sent: list[str] = []
+
+    class _Resp:
+        status_code, headers = 200, {"content-type": "application/javascript"}
+
+        def __init__(self, body):
+            self.body = body
+
+        def iter_text(self):
+            yield self.body
+
+    class _C:
+        @contextmanager
+        def stream(self, method, url):
+            sent.append(url)
+            yield _Resp(bodies[url[len("https://s"):]])
+
+    urls = ["https://s" + p for p in bodies]
+    calls = []
+    real = checks._analyse_script
+    monkeypatch.setattr(checks, "_analyse_script", lambda chunks: calls.append(1) or real(chunks))
+    path = tmp_path / "js-analysis.json"
+
+    # 同じ内容の 30 URL は 1 件として数え、上限 2 件でも別内容の app.js まで届く（解析は内容ごとに 1 回）
+    cache = BundleCache(path, rules=_js_analysis_rules())
+    analyses: dict = {}
+    got = _bounded_fetch_scripts(urls, _C(), {"s"}, limit=2, analyses=analyses, cache=cache)
+    cache.save()
+    assert [u for u, _ in got] == ["https://s/vendor.js?v=0", "https://s/app.js"]
+    assert len(analyses) == 31 and len(calls) == 2
+    assert analyses["https://s/vendor.js?v=7"]["libraries"] == [["jquery", "3.4.1"]]
+    assert analyses["https://s/app.js"]["secrets"] == ["GitHub Personal Access Token"]
+    # source-map は取得時の参照を使う（.map の取得は内容ごとに 1 回）
+    class _Map(_C):
+        def get(self, url):
+            sent.append(url)
+            raise OSError
+    sent.clear()
+    check_source_map(got, _Map(), Findings(), {"s"}, analyses)
+    assert sent == ["https://s/vendor.js.map", "https://s/app.js.map"]
+
+    # 次の診断: ディスクのキャッシュから引き、取得はするが解析しない
+    calls.clear()
+    cache2 = BundleCache(path, rules=_js_analysis_rules())
+    assert len(cache2) == 2
+    again: dict = {}
+    _bounded_fetch_scripts(urls, _C(), {"s"}, limit=2, analyses=again, cache=cache2)
+    assert calls == [] and again == analyses and cache2.hits == 31
+    # 秘密の所見は同じ内容の別 URL（返す本文には含めない app.js?v=2）にも出す
+    bodies["/app.js?v=2"] = bodies["/app.js"]
+    dup: dict = {}
+    got = _bounded_fetch_scripts(["https://s/app.js", "https://s/app.js?v=2"], _C(), {"s"},
+                                 analyses=dup, cache=cache2)
+    assert [u for u, _ in got] == ["https://s/app.js"]
+    fs = Findings()
+    check_js_secrets(got, fs, {u: a["secrets"] for u, a in dup.items()})
+    assert [i["affected"] for i in fs.as_list()] == [["https://s/app.js"], ["https://s/app.js?v=2"]]
+    # 解析規則が変わればキャッシュは使わない
+    assert len(BundleCache(path, rules="other")) == 0
+
+
 def test_detects_source_map_exposure(findings):
     sm = [f for f in findings if f["check_id"] == "sourcemap-exposure"]
     assert sm, "sourcemap-exposure が検出されない"
@@ -361,7 +873,7 @@ def test_auth_routes_detection_and_protection():
             return self._routes.get(_up(url).path, self._default)
 
     routes = {
-        "/vwr-nonexistent-auth-7c3f": _R(404, "nf"),
+        "/vwr-nonexistent-3f9a1c7e": _R(404, "nf"),
         "/admin": _R(200, "<html>admin panel with plenty of unique content here</html>"),
         "/dashboard": _R(302, ""),   # ログインへリダイレクト＝保護
         "/settings": _R(403, ""),    # 認証要求＝保護
@@ -374,6 +886,170 @@ def test_auth_routes_detection_and_protection():
     assert "/settings" not in affected   # 403 は保護
 
 
+def test_probe_reads_only_prefix_with_range_or_early_abort(crawl_data):
+    import httpx
+    from checks import Ledger, _SafeClient, run_checks
+
+    big = bytes(range(256)) * 4096   # 1 MiB
+    sent = []
+
+    def _chunks():
+        for i in range(0, len(big), 16384):
+            sent.append(i)
+            yield big[i:i + 16384]
+
+    def handler(request):
+        rng = request.headers.get("range")
+        if request.url.path == "/ranged" and rng:
+            end = int(rng.rsplit("-", 1)[1])
+            return httpx.Response(206, content=big[:end + 1],
+                                  headers={"content-range": f"bytes 0-{end}/{len(big)}"})
+        if request.url.path == "/ignores":
+            return httpx.Response(200, content=_chunks(),
+                                  headers={"content-length": str(len(big))})
+        if request.url.path == "/no-range":
+            if rng:
+                return httpx.Response(416)
+            return httpx.Response(200, content=b"Index of /", headers={"content-type": "text/html"})
+        return httpx.Response(404, content=b"nf")
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as raw:
+        sc = _SafeClient(raw)
+        p = sc.probe("https://s/ranged", 1024)
+        assert (p.status_code, p.ranged, len(p.content), p.length, p.complete) == \
+            (200, True, 1024, len(big), False)
+        # Range を無視する応答は上限を読んだ時点で閉じる（残りは送られない）
+        p = sc.probe("https://s/ignores", 20000)
+        assert p.content == big[:20000] and p.length == len(big) and not p.complete
+        assert len(sent) < 4
+        # 416 は Range なしで送り直し、読み切った小さな本文は実長を返す
+        p = sc.probe("https://s/no-range", 1024)
+        assert (p.status_code, p.text, p.length, p.complete) == (200, "Index of /", 10, True)
+        st = sc.probe_stats()
+        assert st["probes"] == 4 and st["ranged"] == 1 and st["aborted"] == 2
+        assert st["bytes_saved"] > 2 * len(big) - 64 * 1024
+
+    # 実診断: 存在確認系は部分取得を通り、記録が assessment に残る
+    ledger = Ledger()
+    got = run_checks(crawl_data, timeout=10, active=True, ledger=ledger)
+    assert {"exposed-sensitive-file", "directory-listing"} <= _check_ids(got)
+    assert ledger.assessment["partial_body"]["probes"] > 0
+
+
+def test_probe_plan_covers_app_prefixes_within_budget():
+    import httpx
+    from checks import (_AUTH_SENSITIVE_PATHS, SENSITIVE_PATHS, Findings, _ResponseCache,
+                        _SafeClient, check_auth_routes, check_directory_listing,
+                        check_exposed_files)
+    from probeplan import build_trie, plan_probes
+    from soft404 import SAMPLES, Soft404Cache
+
+    pages = [{"url": "https://s/", "script_srcs": ["https://s/static/js/app.js",
+                                                   "https://cdn.example/x/lib.js"]},
+             {"url": "https://s/app1/index.php"}, {"url": "https://s/app1/sub/deep/page"},
+             {"url": "https://s/blog/2024/post"}]
+    forms = [{"action": "https://s/app2/login"}]
+    trie = build_trie(pages, forms, {"s"})
+    plan = plan_probes(trie, "https://s/", SENSITIVE_PATHS, _AUTH_SENSITIVE_PATHS, budget=None)
+    # 接頭辞: ルート＋ページ/フォームのある深さ 2 までのディレクトリ（資産だけの /static/ は除く）
+    assert plan.prefixes == ["https://s/", "https://s/app1/", "https://s/app2/", "https://s/blog/",
+                             "https://s/app1/sub/", "https://s/blog/2024/"]
+    assert "https://s/static/js/" in plan.listing and "https://s/app1/sub/deep/" in plan.listing
+    assert not any("cdn.example" in d for d in plan.listing)   # スコープ外のホストは木に入れない
+    pairs = plan.exposed + plan.auth
+    assert len(pairs) == len(set(pairs))
+    # 予算内に収め、ルートの組は常に残す（浅い順に詰め、入らない単位は数える）
+    small = plan_probes(trie, "https://s/", SENSITIVE_PATHS, _AUTH_SENSITIVE_PATHS, budget=60)
+    assert small.requests <= 60 and small.dropped > 0
+    assert small.prefixes[0] == "https://s/" and "https://s/app1/" in small.prefixes
+    assert "https://s/app1/sub/" not in small.prefixes
+
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.path)
+        path = request.url.path
+        if path == "/app1/.env":
+            return httpx.Response(200, text="APP_KEY=base64:x\nDB_PASSWORD=pw\n",
+                                  headers={"content-type": "text/plain"})
+        if path == "/app2/admin":
+            return httpx.Response(200, text="<html>" + "admin console " * 40 + "</html>",
+                                  headers={"content-type": "text/html"})
+        if path == "/blog/2024/":
+            return httpx.Response(200, text="<title>Index of /blog/2024/</title>",
+                                  headers={"content-type": "text/html"})
+        return httpx.Response(404, text="nf")
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as raw:
+        sc = _SafeClient(raw, cache=_ResponseCache())
+        f = Findings()
+        shared = Soft404Cache()
+        check_exposed_files("https://s/", sc, f, plan, shared)
+        check_auth_routes("https://s/", pages, sc, f, ["/private"], plan, shared)
+        check_directory_listing(pages, sc, f, plan)
+    affected = {(x["check_id"], a) for x in f.as_list() for a in x["affected"]}
+    assert ("exposed-sensitive-file", "https://s/app1/.env") in affected
+    assert ("unauth-sensitive-route", "https://s/app2/admin") in affected
+    assert ("directory-listing", "https://s/blog/2024/") in affected
+    # soft-404 の指紋は接頭辞ごとに 1 回（2 群で共有）・extra_paths はルート直下だけ
+    assert sum(p.startswith(("/app1/vwr-", "/app1/.vwr-")) for p in seen) == SAMPLES
+    assert "/private" in seen and "/app1/private" not in seen
+    assert len(seen) == plan.requests + 1
+
+
+def test_soft404_model_ignores_dynamic_catch_all_and_persists(tmp_path):
+    import random
+    from types import SimpleNamespace
+    from urllib.parse import urlparse as _up
+    from checks import Findings, check_auth_routes, check_exposed_files
+    from soft404 import SAMPLES, Soft404Cache
+
+    rnd = random.Random(3)
+    requested = []
+
+    def catch_all(url):
+        # SPA の catch-all: 要求パス・CSRF トークン・時刻を埋め込み、本文長が毎回揺れる
+        token = "".join(rnd.choice("abcdef0123456789") for _ in range(rnd.randrange(32, 96)))
+        return ("<html><head><title>Acme Portal</title><meta name=csrf content=%s></head>"
+                "<body><nav>Home Products Support Contact</nav><h1>Page not found</h1>"
+                "<p>The page %s could not be found. Request id %d at %d.</p>"
+                "<footer>Acme Corporation all rights reserved</footer></body></html>"
+                % (token, _up(url).path, rnd.randrange(10 ** 9), rnd.randrange(10 ** 12)))
+
+    class _C:
+        def __init__(self, routes):
+            self.routes = routes
+
+        def get(self, url):
+            requested.append(_up(url).path)
+            body, ctype = self.routes.get(_up(url).path, (catch_all(url), "text/html"))
+            return SimpleNamespace(status_code=200, text=body, url=url,
+                                   headers={"content-type": ctype})
+
+    routes = {"/users": ("<html><body><table>" + "".join(
+        f"<tr><td>user{i}</td><td>role admin editor viewer</td></tr>" for i in range(20))
+        + "</table></body></html>", "text/html")}
+    cache = Soft404Cache(tmp_path / "soft404.json")
+    f = Findings()
+    check_exposed_files("https://spa.test/", _C(routes), f, soft404=cache)
+    check_auth_routes("https://spa.test/", [], _C(routes), f, soft404=cache)
+    affected = {a for x in f.as_list() for a in x["affected"]}
+    # 長さの揺れる catch-all は露出としない・内容の異なる実在ページだけを検出する
+    assert affected == {"https://spa.test/users"}
+    assert sum("vwr-" in p for p in requested) == SAMPLES     # 2 群で指紋を共有
+    model = cache.model("https://spa.test/", None)
+    assert model.catch_all and model.is_soft_404(_C({}).get("https://spa.test/other/path"))
+    cache.save()
+
+    # 次の診断は保存した指紋を使い、見本を取得し直さない
+    requested.clear()
+    again = Soft404Cache(tmp_path / "soft404.json")
+    check_auth_routes("https://spa.test/", [], _C(routes), Findings(), soft404=again)
+    assert again.loaded == 1 and not any("vwr-" in p for p in requested)
+    # 期限切れの指紋は読まない
+    assert len(Soft404Cache(tmp_path / "soft404.json", max_age=-1)) == 0
+
+
 def test_route_disclosure_filters_and_aggregates():
     from checks import check_route_disclosure, Findings
     pages = [{"url": "https://s/login", "route_markers": {
@@ -558,6 +1234,86 @@ def test_header_supplements_coop_and_xss_legacy():
     assert "missing-coop" not in ids2 and "xss-protection-legacy" not in ids2
 
 
+def test_page_pass_matches_individual_checks():
+    import httpx
+    from checks import (Findings, PagePass, check_csp, check_mixed_content, check_security_headers,
+                        check_sri, check_verbose_error, _headers_lower)
+
+    bodies = [
+        '<script src="https://cdn.example.net/a.js"></script><img src="http://x.example/i.png">',
+        '<link rel="stylesheet" href="https://cdn.example.net/a.css" integrity="sha384-x">'
+        "<pre>Traceback (most recent call last):</pre>",
+        '{"ok": true}',
+    ]
+    heads = [{"content-type": "text/html", "content-security-policy": "script-src *"},
+             {"content-type": "text/html; charset=utf-8", "server": "nginx/1.2"},
+             {"content-type": "application/json"}]
+    pages, resps = [], {}
+    for i, (b, h) in enumerate(zip(bodies, heads)):
+        url = f"https://s.example/p{i}"
+        pages.append({"url": url, "status": 200, "content_type": h["content-type"]})
+        resps[url] = httpx.Response(200, headers=h, text=b, request=httpx.Request("GET", url))
+
+    class _C:
+        def __init__(self):
+            self.calls = 0
+
+        def get(self, url):
+            self.calls += 1
+            return resps[url]
+
+    old, c_old = Findings(), _C()
+    for page in pages:
+        r = c_old.get(page["url"])
+        check_security_headers(page, _headers_lower(r), old)
+        check_csp(page["url"], _headers_lower(r).get("content-security-policy", ""), old)
+        if "text/html" in r.headers.get("content-type", ""):
+            check_sri(page["url"], r.text, old)
+            check_verbose_error(page["url"], r.text, old)
+    check_mixed_content(pages, c_old, old)
+
+    new, c_new, pp = Findings(), _C(), PagePass()
+    for page in pages:
+        pp.run(pp.view(page, c_new.get(page["url"])), new)
+    assert not any(i["check_id"] == "mixed-content" for i in new.as_list())   # deferred
+    pp.finish(new)
+    pp.emit("mixed-content", new)
+    # ヘッダ/CSP 群は構成ごとに 1 件（affected に該当 URL を列挙）。展開すれば個別実行と同一
+    flat = lambda fs: sorted((i["check_id"], i["evidence"], i["confidence"], a)  # noqa: E731
+                             for i in fs.as_list() for a in i["affected"])
+    assert flat(new) == flat(old)
+    assert len(new.as_list()) < len(old.as_list())
+    assert c_new.calls == len(pages) < c_old.calls
+    assert {i["check_id"] for i in new.as_list()} >= {"missing-sri", "verbose-error", "mixed-content"}
+
+
+def test_header_fingerprint_groups_pages_and_merge_is_linear():
+    import httpx
+    from checks import Findings, PagePass, _analyze_csp
+    from scoring import merge_findings
+    heads = [{"content-type": "text/html"},
+             {"content-type": "text/html", "content-security-policy": "script-src 'unsafe-inline'"}]
+    pp, f = PagePass(), Findings()
+    for i in range(300):
+        url = f"https://s.example/p{i}"
+        r = httpx.Response(200, headers=heads[i % 2], text="<p>x</p>",
+                           request=httpx.Request("GET", url))
+        pp.run(pp.view({"url": url, "status": 200, "content_type": "text/html"}, r), f)
+    pp.finish(f)
+    # security-headers / csp-analysis は構成 2 種×2 群の 4 回だけ評価（sri/verbose は毎ページ）
+    assert pp.evaluations == 4 + 300 * 2
+    items = f.as_list()
+    hsts = [i for i in items if i["check_id"] == "missing-hsts"]
+    assert len(hsts) == 1 and len(hsts[0]["affected"]) == 300
+    # 2 つの構成をまたいで統合した affected もページを見た順（ページごとに出した順と同じ）
+    assert hsts[0]["affected"] == [f"https://s.example/p{i}" for i in range(300)]
+    assert [len(i["affected"]) for i in items if i["check_id"] == "csp-bypassable"] == [150]
+    assert _analyze_csp.cache_info().hits >= 0 and _analyze_csp("default-src 'none'") == ()
+    merged = merge_findings(items + items)
+    assert len(merged) == len({(i["check_id"], i["title"]) for i in items})
+    assert len(next(m for m in merged if m["check_id"] == "missing-hsts")["affected"]) == 300
+
+
 # ===== v0.5 A1: サブドメインテイクオーバー（dangling CNAME・単一組織スコープ） =====
 class _TakeoverResp:
     def __init__(self, text):
@@ -659,6 +1415,77 @@ def test_check_dnssec_with_fake_resolver():
     assert not f2.as_list()
 
 
+def test_dns_resolver_caches_by_ttl_and_resolves_chains_in_parallel():
+    import threading
+    import time
+    from checks import (Findings, _resolve_cname_chain, _resolve_cname_chains, check_dns,
+                        check_subdomain_takeover)
+    from dnscache import DnsResolver
+
+    now = [0.0]
+    calls = []
+
+    def lookup(name, rdtype):
+        calls.append((name, rdtype))
+        if name == "down.example.com":
+            raise OSError("timeout")
+        if rdtype == "TXT" and name == "example.com":
+            return ["v=spf1 -all"], 60
+        return [], None          # 不在（負のキャッシュ・既定 TTL）
+
+    r = DnsResolver(lookup=lookup, clock=lambda: now[0])
+    assert r("Example.com.", "txt") == ["v=spf1 -all"] and r("example.com", "TXT")
+    assert r("_dmarc.example.com", "TXT") == [] and r("_dmarc.example.com", "TXT") == []
+    with pytest.raises(OSError):
+        r("down.example.com", "A")
+    with pytest.raises(OSError):     # 障害は保持せず照会し直す
+        r("down.example.com", "A")
+    assert len(calls) == 4
+    now[0] = 61                      # TTL 切れの正の応答だけ照会し直す
+    r("example.com", "TXT")
+    r("_dmarc.example.com", "TXT")
+    assert len(calls) == 5
+    st = r.summary()
+    assert st["hits"] == 1 and st["negative_hits"] == 2 and st["errors"] == 2
+
+    # query= のフェイクを包んでもチェックの結果は同じ
+    fake = lambda n, t: ["v=spf1 -all"] if (n, t) == ("example.com", "TXT") else []  # noqa: E731
+    f1, f2 = Findings(), Findings()
+    check_dns("https://example.com/", f1, query=fake)
+    check_dns("https://example.com/", f2, query=DnsResolver(query=fake))
+    assert f1.as_list() == f2.as_list()
+
+    # CNAME 鎖: 段ごとに並行照会し、逐次の鎖と一致する
+    hosts = [f"h{i}.example.com" for i in range(120)]
+    gate = threading.Barrier(4, timeout=5)
+    live = []
+
+    def slow_cname(name, rdtype):
+        live.append(name)
+        if len(live) <= 4:
+            gate.wait()              # 4 件が同時に走っていなければ待ちきれず失敗する
+        time.sleep(0.001)
+        i = int(name.split(".")[0][1:]) if name.startswith("h") else -1
+        if i >= 0 and i % 3 == 0:
+            return [f"s{i}.example.net."]
+        if name.startswith("s") and name.endswith(".example.net"):
+            return ["x.github.io."] if name.startswith("s3.") else [name + "."]
+        return []
+
+    chains = _resolve_cname_chains(hosts, DnsResolver(query=slow_cname, workers=8))
+    assert chains == {h: _resolve_cname_chain(h, slow_cname) for h in hosts}
+    assert chains["h3.example.com"] == ["s3.example.net", "x.github.io"]
+    assert chains["h6.example.com"] == ["s6.example.net"]   # 自己参照で止まる
+
+    pages = [{"url": f"https://{h}/", "script_srcs": []} for h in hosts]
+    client = _TakeoverClient("There isn't a GitHub Pages site here")
+    f = Findings()
+    check_subdomain_takeover("https://h0.example.com/", pages, [], client, f,
+                             query=DnsResolver(query=slow_cname))
+    assert [a for x in f.as_list() for a in x["affected"]] == ["h3.example.com"]
+    assert client.requested == ["https://h3.example.com/"]
+
+
 def test_classify_cert_error():
     from checks import _classify_cert_error
     assert "ホスト名不一致" in _classify_cert_error("Hostname mismatch, certificate is not valid for 'x'")
@@ -693,6 +1520,51 @@ def test_check_cert_validity_emits_on_verification_error():
     assert not f3.as_list()
 
 
+def test_tls_inspector_one_parallel_round_per_host():
+    import ssl
+    import threading
+    from checks import (Findings, _probe_old_tls, _tls_targets, check_cert_expiry,
+                        check_cert_validity)
+    from tlsinspect import TlsInspector
+
+    calls = []
+    gate = threading.Barrier(6, timeout=5)   # 2 ホスト × 3 ハンドシェイクが同時に走る
+
+    def fake(host, port, version, timeout):
+        calls.append((host, port, version))
+        gate.wait()
+        if host == "bad.test" and version is None:
+            raise ssl.SSLCertVerificationError(1, "certificate verify failed: self-signed "
+                                                  "certificate")
+        if version == "TLSv1":
+            raise ssl.SSLError("unsupported protocol")
+        return {"notAfter": "Jan  1 00:00:00 2000 GMT"} if version is None else {}
+
+    tls = TlsInspector(handshake=fake)
+    got = tls.inspect_many([("ok.test", 443), ("bad.test", 8443)])
+    assert len(calls) == 6
+    assert got[("ok.test", 443)].protocols == {"TLS 1.0": False, "TLS 1.1": True}
+    # 3 群は結果を読むだけ（再接続しない）
+    f = Findings()
+    _probe_old_tls("ok.test", 443, f, "https://ok.test/", tls)
+    check_cert_expiry("https://ok.test/", f, tls)
+    check_cert_validity("https://ok.test/", f, inspector=tls)
+    check_cert_validity("https://bad.test:8443/", f, inspector=tls)
+    with pytest.raises(ssl.SSLCertVerificationError):   # 検証失敗は期限確認では従来どおり送出
+        check_cert_expiry("https://bad.test:8443/", f, tls)
+    assert len(calls) == 6 and tls.summary()["hits"] == 5
+    ids = {(x["check_id"], a) for x in f.as_list() for a in x["affected"]}
+    assert ids == {("tls-weak-protocol", "https://ok.test/"),
+                   ("tls-cert-expiring", "https://ok.test/"),
+                   ("tls-cert-invalid", "https://bad.test:8443/")}
+
+    pages = [{"url": "https://ok.test/a"}, {"url": "https://api.ok.test/"},
+             {"url": "http://plain.ok.test/"}, {"url": "https://other.test/"}]
+    assert _tls_targets("https://ok.test/login", pages, {"ok.test", "api.ok.test",
+                                                         "plain.ok.test"}) == \
+        ["https://ok.test/login", "https://api.ok.test/"]
+
+
 def test_safe_methods_enforced_in_code():
     from checks import _SafeClient, UnsafeMethodError
     sc = _SafeClient(client=None, delay=0)  # ガードは送信前に効くため _c は不要
@@ -701,6 +1573,66 @@ def test_safe_methods_enforced_in_code():
             sc.request(bad, "http://example.test/")
 
 
+def test_safe_client_response_cache_coalesces_and_exempts_origin(crawl_data):
+    import threading
+    import time
+    from checks import _ResponseCache, _SafeClient
+
+    class _R:
+        def __init__(self, n):
+            self.status_code, self.headers, self.content = 200, {}, b"x"
+            self.n = n
+
+    class _C:
+        def __init__(self):
+            self.calls = []
+            self.gate = threading.Event()
+
+        def get(self, url, **kw):
+            self.calls.append((url, kw))
+            self.gate.wait(5)
+            return _R(len(self.calls))
+
+    raw = _C()
+    cache = _ResponseCache(max_entries=2)
+    sc = _SafeClient(raw, cache=cache)
+    # 同時の同一要求は 1 回の送信に合流する
+    out = []
+    ts = [threading.Thread(target=lambda: out.append(sc.get("https://s/a"))) for _ in range(4)]
+    for t in ts:
+        t.start()
+    while cache.counts["misses"] + cache.counts["coalesced"] < 4:
+        time.sleep(0.01)
+    raw.gate.set()
+    for t in ts:
+        t.join()
+    assert len(raw.calls) == 1 and len({id(r) for r in out}) == 1
+    assert sc.get("https://s/a") is out[0]
+    # 要求ヘッダはキーに含む・Origin プローブと cache=False は常に送信する
+    sc.get("https://s/a", headers={"Accept": "text/plain"})
+    sc.get("https://s/a", headers={"Origin": "https://evil.example"})
+    sc.get("https://s/a", headers={"Origin": "https://evil.example"})
+    sc.get("https://s/a", cache=False)
+    assert len(raw.calls) == 5
+    # LRU: 上限 2 件を超えると最も古いものから追い出す
+    sc.get("https://s/b")
+    sc.get("https://s/a")
+    assert len(raw.calls) == 7
+    st = sc.cache_stats()
+    assert st["coalesced"] == 3 and st["hits"] == 1 and st["bypassed"] == 3
+    assert st["evictions"] >= 1 and st["entries"] == 2
+
+    # 実診断: soft-404 ベースライン等の重複取得がヒットし、件数が assessment に残る
+    from checks import Ledger, run_checks
+    ledger = Ledger()
+    base = run_checks(crawl_data, timeout=10, active=True, cache_size=0)
+    assert run_checks(crawl_data, timeout=10, active=True, ledger=ledger) == base
+    rc = ledger.assessment["response_cache"]
+    assert rc["misses"] > 0 and rc["entries"] > 0
+    # soft-404 の見本は指紋の共有で 1 接頭辞 1 回（応答キャッシュでなく Soft404Cache がまとめる）
+    assert ledger.assessment["soft404"]["hits"] >= 1
+
+
 def test_active_auth_client_guard():
     # 能動認証 client は POST 限定・login URL 限定。ガードは送信前に効くため下位 client は不要。
     from checks import _ActiveAuthClient, ActiveAuthViolation
@@ -1007,6 +1939,141 @@ def test_coverage_ledger_statuses(crawl_data):
     assert rows2["exposed-files"]["status"] == "skipped"
 
 
+def test_run_checks_resume_skips_completed_groups(crawl_data, tmp_path, monkeypatch):
+    import checks
+    ckpt = tmp_path / "checks.checkpoint.json"
+    ledger = checks.Ledger()
+    first = checks.run_checks(crawl_data, timeout=5, active=False, ledger=ledger, checkpoint=ckpt)
+
+    def _no_network(*a, **kw):
+        raise AssertionError("完了済みグループを再実行した")
+    monkeypatch.setattr(checks._SafeClient, "get", _no_network)
+    ledger2 = checks.Ledger()
+    again = checks.run_checks(crawl_data, timeout=5, active=False, ledger=ledger2,
+                              checkpoint=ckpt, resume=True)
+    assert again == first
+
+    def _status(rows):   # perf は実行ごとの計測値（再開で飛ばした群は None）
+        return [{k: v for k, v in r.items() if k != "perf"} for r in rows]
+    assert _status(ledger2.rows()) == _status(ledger.rows())
+
+
+def test_run_checks_resume_reruns_failed_groups(crawl_data, tmp_path, monkeypatch):
+    import checks
+    ckpt = tmp_path / "checks.checkpoint.json"
+    real_cors = checks.check_cors
+
+    def _dropped(target, client, f):
+        f.add("cors-misconfig", target, "partial")   # 回線断の前に出た途中の所見
+        raise ConnectionError("vpn dropped")
+    monkeypatch.setattr(checks, "check_cors", _dropped)
+    ledger = checks.Ledger()
+    checks.run_checks(crawl_data, timeout=10, active=True, ledger=ledger, checkpoint=ckpt)
+    assert {r["id"]: r for r in ledger.rows()}["cors"]["status"] != "clean"
+
+    # 再開では失敗した群だけを実行し直し、途中の所見は捨てる（成功した群は実行しない）
+    calls = []
+
+    def _cors(target, client, f):
+        calls.append(target)
+        real_cors(target, client, f)
+    monkeypatch.setattr(checks, "check_cors", _cors)
+
+    def _done(*a, **kw):
+        raise AssertionError("完了済みグループを再実行した")
+    monkeypatch.setattr(checks, "check_exposed_files", _done)
+    ledger2 = checks.Ledger()
+    again = checks.run_checks(crawl_data, timeout=10, active=True, ledger=ledger2,
+                              checkpoint=ckpt, resume=True)
+    rows = {r["id"]: r for r in ledger2.rows()}
+    assert len(calls) == 1 and rows["cors"]["status"] in ("clean", "finding")
+    assert "ConnectionError" not in rows["cors"]["note"]
+    assert not any(i["evidence"] == "partial" for i in again)
+    assert [i["id"] for i in again] == [f"VWR-{n:03d}" for n in range(1, len(again) + 1)]
+
+
+def test_parallel_active_jobs_match_serial_and_isolate_errors(crawl_data, findings, monkeypatch):
+    import checks
+    serial_ledger = checks.Ledger()
+    serial = checks.run_checks(crawl_data, timeout=10, active=True, ledger=serial_ledger, workers=1)
+    assert serial == findings   # 並行（既定）と逐次で所見・ID・順序が同一
+
+    def _boom(target, client, f):
+        f.add("cors-misconfig", target, "partial")   # 例外前の所見は逐次実行時と同じく残る
+        raise RuntimeError("probe failed")
+    monkeypatch.setattr(checks, "check_cors", _boom)
+    ledger = checks.Ledger()
+    out = checks.run_checks(crawl_data, timeout=10, active=True, ledger=ledger, workers=8)
+    rows = {r["id"]: r for r in ledger.rows()}
+    assert rows["cors"]["status"] == "finding" and "RuntimeError" in rows["cors"]["note"]
+    serial_row = {r["id"]: r for r in serial_ledger.rows()}["exposed-files"]
+    assert {**rows["exposed-files"], "perf": None} == {**serial_row, "perf": None}
+    # 共有キャッシュの先着は並行時に入れ替わりうるため、送信とヒットの和で比べる
+    par, ser = rows["exposed-files"]["perf"], serial_row["perf"]
+    assert par["requests"] + par["cache_hits"] == ser["requests"] + ser["cache_hits"]
+    assert [i["id"] for i in out] == [f"VWR-{n:03d}" for n in range(1, len(out) + 1)]
+
+
+def test_ledger_records_per_group_cost_and_profiles(crawl_data, tmp_path):
+    import httpx
+    from checks import Ledger, _ResponseCache, _SafeClient, run_checks
+    from groupstats import measure
+
+    ledger = Ledger()
+    prof = tmp_path / "prof"
+    run_checks(crawl_data, timeout=10, active=True, ledger=ledger, profile_dir=prof)
+    rows = {r["id"]: r for r in ledger.rows()}
+    exposed = rows["exposed-files"]["perf"]
+    assert exposed["requests"] > 0 and exposed["bytes_received"] > 0 and exposed["wall_s"] >= 0
+    assert rows["cookies"]["perf"]["requests"] == 0   # 受動群は送信しない
+    assert rows["login-rate-limit"]["perf"] is None   # 未実施の群はコストなし
+    perf = ledger.assessment["perf"]
+    assert perf["units"]["passive-pages"]["requests"] > 0
+    assert perf["total"]["requests"] >= exposed["requests"] + perf["units"]["passive-pages"]["requests"]
+    assert (prof / "exposed-files.prof").exists() and (prof / "passive-pages.prof").exists()
+
+    # キャッシュで済んだ要求はヒットに、416 による Range なしの送り直しは再送に数える
+    def handler(request):
+        if request.headers.get("range"):
+            return httpx.Response(416)
+        return httpx.Response(200, text="x" * 100)
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as raw:
+        sc = _SafeClient(raw, cache=_ResponseCache(8))
+        with measure("g") as st:
+            sc.get("https://s/a")
+            sc.get("https://s/a")
+            sc.probe("https://s/b", 64)
+    got = st.as_dict()
+    assert got["requests"] == 3 and got["cache_hits"] == 1 and got["retries"] == 1
+    assert got["bytes_sent"] > 0 and got["bytes_received"] >= 100 + 64
+
+    # 本文の読み取り中の時間切れは 1 件の要求として数え、レート制御にも 1 回だけ伝える
+    class _Stall(httpx.SyncByteStream):
+        def __iter__(self):
+            yield b"x" * 10
+            raise httpx.ReadTimeout("stalled")
+
+    class _Limiter:
+        def __init__(self):
+            self.seen = []
+
+        def acquire(self, url):
+            pass
+
+        def observe(self, url, status=None, headers=None, latency=None, timed_out=False):
+            self.seen.append(timed_out)
+
+    lim = _Limiter()
+    with httpx.Client(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, stream=_Stall()))) as raw:
+        sc = _SafeClient(raw, limiter=lim)
+        with measure("g") as st:
+            with pytest.raises(httpx.ReadTimeout):
+                sc.probe("https://s/slow", 64)
+    assert st.as_dict()["requests"] == 1 and lim.seen == [False]
+
+
 def test_coverage_ledger_no_html_is_skipped_not_clean():
     # ページ応答が無い（＝HTML 検査が一度も走らない）とき、ページ依存の受動群を
     # 「問題なし(clean)」にせず「未実施(skipped)」とする（未検査を沈黙で合格にしない）。
@@ -1197,6 +2264,123 @@ def test_reflected_input_ignores_non_html():
     assert "reflected-input" in {i["check_id"] for i in fh.as_list()}
 
 
+def test_batched_param_probes_match_single_probes_with_fewer_requests():
+    from urllib.parse import parse_qsl, urlparse
+    from checks import (Findings, REFLECT_MARKER, REFLECT_PAYLOAD, _REDIRECT_MARKER,
+                        _single_probe, check_open_redirect, check_reflected_input)
+    from html import escape
+
+    class _R:
+        def __init__(self, status, text="", ctype="text/html", location=None):
+            self.status_code, self.text = status, text
+            self.headers = {"content-type": ctype, **({"location": location} if location else {})}
+
+    def app(url):
+        p = urlparse(url)
+        q = dict(parse_qsl(p.query))
+        if p.path == "/search":   # q は生で反射・他はエスケープして hidden に持ち回す
+            hidden = "".join(f'<input type="hidden" name="{k}" value="{escape(v)}">'
+                             for k, v in q.items() if k != "q")
+            return _R(200, f"<p>{q.get('q', '')}</p>{hidden}")
+        if p.path == "/list":     # page が不正なら q を表示しないエラー画面（q は生で反射）
+            if not q.get("page", "1").isdigit():
+                return _R(200, "<p>invalid page</p>")
+            return _R(200, f"<p>{q.get('q', '')}</p>")
+        if p.path == "/err":      # 最初の不正値（数字以外）だけを生で表示するエラーページ
+            bad = next((k for k in ("a", "b", "c") if not q.get(k, "0").isdigit()), None)
+            return _R(200, f"invalid {bad}: {q[bad]}" if bad else "ok")
+        if p.path == "/api":      # JSON エコー（XSS ではない）
+            return _R(200, str(q), ctype="application/json")
+        if p.path == "/login":    # next を優先（無検証）し、無ければ url（無検証）
+            dest = q.get("next") or q.get("url")
+            return _R(302, location=dest) if dest else _R(200, "login")
+        if p.path == "/jump":     # go と dest はどちらも無検証で go を優先
+            return _R(302, location=q.get("go") or q.get("dest") or "/")
+        if p.path == "/page":     # リダイレクトしない
+            return _R(200, "page")
+        return _R(404, "nf")
+
+    class _C:
+        def __init__(self):
+            self.sent = []
+
+        def get(self, url):
+            self.sent.append(url)
+            return app(url)
+
+    names = ["q", "title"] + [f"f{i}" for i in range(10)]
+    params = ([{"url": "https://s/search?q=hi&page=1", "name": n} for n in names]
+              + [{"url": "https://s/err?a=1&b=2&c=3", "name": n} for n in ("a", "b", "c")]
+              + [{"url": "https://s/list?q=x&page=1", "name": n} for n in ("q", "page")]
+              + [{"url": "https://s/api?x=1&y=2", "name": n} for n in ("x", "y")]
+              + [{"url": "https://s/login?next=%2Fhome&url=%2F", "name": n} for n in ("next", "url")]
+              + [{"url": "https://s/login?next=&url=", "name": n} for n in ("next", "url")]
+              + [{"url": "https://s/jump?go=%2F&dest=%2F", "name": n} for n in ("go", "dest")]
+              + [{"url": "https://s/page?next=a", "name": n} for n in ("next", "return", "r", "u")]
+              + [{"url": "https://s/search?q=hi&page=1", "name": "q"}])   # 重複
+
+    def legacy_reflect(client, f):
+        seen = set()
+        for param in params:
+            key = (param["url"], param["name"])
+            if key in seen:
+                continue
+            seen.add(key)
+            probe = _single_probe(param["url"], param["name"], REFLECT_PAYLOAD)
+            r = client.get(probe)
+            if "text/html" in r.headers.get("content-type", "") and f"{REFLECT_MARKER}<" in r.text:
+                f.add("reflected-input", probe,
+                      f"パラメータ '{param['name']}' の値が無害化されず反射（マーカー検出）",
+                      confidence="Medium")
+
+    def legacy_redirect(client, f):
+        seen = set()
+        for param in params:
+            if param["name"] not in ("next", "url", "go", "dest", "return", "r", "u"):
+                continue
+            probe = _single_probe(param["url"], param["name"], _REDIRECT_MARKER)
+            if probe in seen:
+                continue
+            seen.add(probe)
+            r = client.get(probe)
+            loc = r.headers.get("location", "")
+            if r.status_code in (301, 302, 303, 307, 308) and loc.startswith(_REDIRECT_MARKER):
+                f.add("open-redirect", probe,
+                      f"パラメータ '{param['name']}' がリダイレクト先に反映（Location={loc}）",
+                      confidence="Medium")
+
+    for new, old in ((check_reflected_input, legacy_reflect),
+                     (check_open_redirect, legacy_redirect)):
+        c_new, c_old, f_new, f_old = _C(), _C(), Findings(), Findings()
+        new(params, c_new, f_new)
+        old(c_old, f_old)
+        assert f_new.as_list() == f_old.as_list() and f_new.as_list()
+        # リダイレクトは 1 回の 3xx で 1 パラメータしか確定できないため、件数の削減は反射のみ
+        if new is check_reflected_input:
+            assert len(c_new.sent) < len(c_old.sent)
+    c = _C()
+    f = Findings()
+    check_reflected_input(params, c, f)
+    # search の 12 パラメータは全マーカーが現れるため 1 回で確定、err は先頭だけ表示のため
+    # 1 件ずつ確定（3 回）、JSON は曖昧として単独送信（2 回）
+    assert sum("/search" in u for u in c.sent) == 1
+    # list は page の不正値で q を表示しない画面に変わる。マーカーの現れない一括応答は非反射と
+    # せず単独送信に戻すため、page を元の値のままにした q のプローブで反射を検出する
+    assert sum("/list" in u for u in c.sent) == 3
+    assert sorted(i["affected"][0].split("?")[0] for i in f.as_list()) == [
+        "https://s/err", "https://s/err", "https://s/err", "https://s/list", "https://s/search"]
+    # リダイレクトしない一括応答（200）は曖昧として 4 件を単独送信に戻す。マーカーへの 3xx は
+    # Location に載った next だけを確定し、優先されて隠れた url は改めて確かめる（空の next は
+    # 単独プローブで落ちるため、next=&url= の url は反映として検出される）
+    c = _C()
+    f = Findings()
+    check_open_redirect(params, c, f)
+    assert sum("/page" in u for u in c.sent) == 5 and sum("/login" in u for u in c.sent) == 4
+    assert sum("/jump" in u for u in c.sent) == 2
+    assert sorted(i["evidence"].split("'")[1] for i in f.as_list()
+                  if "/login" in i["affected"][0]) == ["next", "next", "url"]
+
+
 def test_no_finding_leaks_raw_secret_values(findings):
     # 検出はするが、evidence にパスワード平文をそのまま載せない（署名/存在のみ）
     blob = " ".join(f["evidence"] for f in findings)
@@ -11,11 +11,14 @@ vuln_app.py - テスト用の意図的に脆弱なローカル HTTP サーバ
   - 反射型入力（/search?q= を無害化せず反射）
   - オープンリダイレクト（/go?url=）
   - 古い JS ライブラリ参照（jquery-1.8.3）
+200 応答には本文ハッシュの ETag を付け、If-None-Match 一致時は 304 を返す（差分巡回の検証用）。
 
 Copyright (c) 2026 haboshi / MIT License.
 """
 from __future__ import annotations
 
+import gzip
+import hashlib
 import threading
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from urllib.parse import urlparse, parse_qs, quote
@@ -59,7 +62,16 @@ class VulnHandler(BaseHTTPRequestHandler):
 
     def _send(self, code=200, body="", ctype="text/html; charset=utf-8", cookies=False):
         data = body.encode("utf-8")
+        etag = '"' + hashlib.sha1(data).hexdigest()[:16] + '"'
+        if code == 200 and self.command == "GET" and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Server", "TestServer/1.2.3")
+            self.end_headers()
+            return
         self.send_response(code)
+        if code == 200:
+            self.send_header("ETag", etag)
         self.send_header("Content-Type", ctype)
         self.send_header("Content-Length", str(len(data)))
         self.send_header("Server", "TestServer/1.2.3")  # バージョン露出
@@ -98,6 +110,43 @@ class VulnHandler(BaseHTTPRequestHandler):
         elif path == "/files/":
             self._send(200, "<html><head><title>Directory listing for /files/</title></head>"
                             "<body><h1>Index of /files/</h1><ul><li>a.txt</li></ul></body></html>")
+        elif path == "/sitemap.xml":
+            # 差分巡回の優先度付け用: /files/ は常に「前回以降に更新」（lastmod が未来）
+            self._send(200, '<?xml version="1.0" encoding="UTF-8"?>'
+                            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                            f'<url><loc>http://{self.headers.get("Host")}/</loc>'
+                            '<lastmod>2000-01-01</lastmod></url>'
+                            f'<url><loc>http://{self.headers.get("Host")}/files/</loc>'
+                            '<lastmod>2999-01-01T00:00:00Z</lastmod></url></urlset>',
+                       ctype="application/xml")
+        elif path == "/robots.txt":
+            # Crawl-delay とサイトマップ索引（SiteIndex の検証用。Disallow は機微語を含まないパス）
+            self._send(200, "User-agent: *\nCrawl-delay: 1\nDisallow: /private-area/\n"
+                            f"Sitemap: http://{self.headers.get('Host')}/sitemap_index.xml\n",
+                       ctype="text/plain")
+        elif path == "/sitemap_index.xml":
+            host = self.headers.get("Host")
+            self._send(200, '<?xml version="1.0" encoding="UTF-8"?>'
+                            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                            f'<sitemap><loc>http://{host}/sitemap.xml</loc></sitemap>'
+                            f'<sitemap><loc>http://{host}/sitemap-extra.xml.gz</loc></sitemap>'
+                            '</sitemapindex>', ctype="application/xml")
+        elif path == "/sitemap-extra.xml.gz":
+            # Content-Encoding 無しの gzip 本文（.xml.gz の一般的な配信形態）
+            data = gzip.compress(('<?xml version="1.0" encoding="UTF-8"?>'
+                                  '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                                  f'<url><loc>http://{self.headers.get("Host")}/search?q=hello</loc>'
+                                  '</url></urlset>').encode("utf-8"))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-gzip")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif path == "/downloads/manual.pdf":
+            # 本文を読まずに閉じる対象（非 HTML の大きな応答・どこからもリンクしない）
+            self._send(200, "%PDF-1.4\n" + "0" * 256 * 1024, ctype="application/pdf")
+        elif path == "/big.html":
+            self._send(200, "<html><body>" + "x" * 64 * 1024 + "</body></html>")
         elif path == "/.git/HEAD":
             self._send(200, "ref: refs/heads/main\n", ctype="text/plain")
         elif path == "/.env":
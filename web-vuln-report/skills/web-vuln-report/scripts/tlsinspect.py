@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+tlsinspect.py - ホストごとの TLS 検査結果（証明書・検証結果・旧プロトコル受入）を 1 回で集める
+
+旧実装では check_cert_expiry（証明書の取得）・check_cert_validity（_verify_cert で検証）・
+_probe_old_tls（TLS 1.0 / 1.1 を 1 つずつ）がそれぞれ同じ host:port へ TCP+TLS 接続を張り、
+互いに直列で待っていた（最大 10 + 10 + 8 + 8 秒）。ここでは
+
+  - 検証つきのハンドシェイク 1 回で、証明書（getpeercert）と検証結果（成功 /
+    SSLCertVerificationError）を同時に得る
+  - TLS 1.0 / 1.1 の受入確認は検証なしのハンドシェイクで、上と同時に並行で行う
+  - 結果は (host, port) ごとに実行中保持し（同時の要求は先行の検査を待つ）、
+    inspect_many で複数ホストをまとめて 1 巡の並行ハンドシェイクで済ませる
+
+旧プロトコルの確認は「サーバがハンドシェイクを受理するか」だけを見るため、その接続に限り
+check_hostname / verify を無効化する（データ送受信は行わない）。
+
+Copyright (c) 2026 haboshi / MIT License.
+"""
+from __future__ import annotations
+
+import socket
+import ssl
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+DEFAULT_WORKERS = 8
+_TIMEOUT = 10.0
+# 受入を確かめる旧プロトコル（表示名, ssl.TLSVersion の属性名）
+OLD_PROTOCOLS = (("TLS 1.0", "TLSv1"), ("TLS 1.1", "TLSv1_1"))
+
+
+def handshake(host: str, port: int, version: str | None, timeout: float) -> dict:
+    """TLS ハンドシェイクして証明書（getpeercert の dict）を返す。version が None なら既定の
+    検証つきコンテキスト（検証失敗は ssl.SSLCertVerificationError）、指定時はその版だけを
+    許す検証なしのコンテキスト（受理されなければ例外）。"""
+    if version is None:
+        ctx = ssl.create_default_context()
+    else:
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        ctx.check_hostname = False   # プロトコル受入のみ検査（証明書検証は version=None 側）
+        ctx.verify_mode = ssl.CERT_NONE
+        ver = getattr(ssl.TLSVersion, version)
+        ctx.minimum_version = ver
+        ctx.maximum_version = ver
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        with ctx.wrap_socket(sock, server_hostname=host) as ssock:
+            return ssock.getpeercert() or {}
+
+
+@dataclass
+class TlsReport:
+    """(host, port) 1 件分の結果。cert は検証に成功したときの証明書、verify_error は検証失敗、
+    error は接続等の検証以外の失敗（どちらも無ければ検証成功）。protocols は旧版の受入有無。"""
+    host: str
+    port: int
+    cert: dict | None = None
+    verify_error: ssl.SSLCertVerificationError | None = None
+    error: Exception | None = None
+    protocols: dict[str, bool] = field(default_factory=dict)
+
+    def raise_for_handshake(self) -> None:
+        """検証つきハンドシェイクの失敗（検証失敗を含む）をそのまま送出する。"""
+        if self.verify_error is not None:
+            raise self.verify_error
+        if self.error is not None:
+            raise self.error
+
+
+class _Pending:
+    __slots__ = ("done", "report")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.report: TlsReport | None = None
+
+
+class TlsInspector:
+    """(host, port) -> TlsReport の実行内キャッシュ。handshake は (host, port, version, timeout)
+    -> 証明書 dict の呼び出し可能（テストでフェイクを注入）。"""
+
+    def __init__(self, handshake=handshake, workers: int = DEFAULT_WORKERS,
+                 timeout: float = _TIMEOUT, old_protocols=OLD_PROTOCOLS):
+        self._handshake = handshake
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self._old = [(label, ver) for label, ver in old_protocols
+                     if hasattr(ssl, "TLSVersion") and hasattr(ssl.TLSVersion, ver)]
+        self._reports: dict[tuple[str, int], _Pending] = {}
+        self._lock = threading.Lock()
+        self.counts = {"hosts": 0, "handshakes": 0, "hits": 0}
+
+    def inspect(self, host: str, port: int = 443) -> TlsReport:
+        return self.inspect_many([(host, port)])[(host, port)]
+
+    def inspect_many(self, pairs) -> dict[tuple[str, int], TlsReport]:
+        """未検査の (host, port) の全ハンドシェイクを 1 つのスレッドプールで並行に行う。"""
+        pairs = list(dict.fromkeys((h, int(p)) for h, p in pairs))
+        owned: list[tuple[tuple[str, int], _Pending]] = []
+        waiting: dict[tuple[str, int], _Pending] = {}
+        with self._lock:
+            for key in pairs:
+                pending = self._reports.get(key)
+                if pending is None:
+                    pending = self._reports[key] = _Pending()
+                    owned.append((key, pending))
+                    self.counts["hosts"] += 1
+                else:
+                    self.counts["hits"] += 1
+                waiting[key] = pending
+        if owned:
+            self._run(owned)
+        for pending in waiting.values():
+            pending.done.wait()
+        return {key: pending.report for key, pending in waiting.items()}
+
+    def _run(self, owned) -> None:
+        jobs = [(key, None) for key, _ in owned]
+        jobs += [(key, ver) for key, _ in owned for _, ver in self._old]
+        with self._lock:
+            self.counts["handshakes"] += len(jobs)
+
+        def _one(job):
+            (host, port), version = job
+            try:
+                return self._handshake(host, port, version, self.timeout), None
+            except Exception as e:
+                return None, e
+
+        results: dict = {}
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(jobs)),
+                                    thread_name_prefix="vwr-tls") as pool:
+                results = dict(zip(jobs, pool.map(_one, jobs)))
+        finally:   # 失敗しても待っている呼び出し側を解放する
+            for key, pending in owned:
+                pending.report = self._report(key, results)
+                pending.done.set()
+
+    def _report(self, key: tuple[str, int], results: dict) -> TlsReport:
+        report = TlsReport(*key)
+        cert, err = results.get((key, None), (None, RuntimeError("TLS 検査未完了")))
+        if isinstance(err, ssl.SSLCertVerificationError):
+            report.verify_error = err
+        elif err is not None:
+            report.error = err
+        else:
+            report.cert = cert
+        for label, ver in self._old:
+            res = results.get((key, ver))
+            report.protocols[label] = res is not None and res[1] is None
+        return report
+
+    def summary(self) -> dict:
+        """findings.json の assessment["tls"] に載せる記録。"""
+        with self._lock:
+            return dict(self.counts)